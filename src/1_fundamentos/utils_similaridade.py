@@ -0,0 +1,215 @@
+"""
+Similaridade vetorizada e busca top-k em lote.
+
+Os labs 1.2 a 2.0 reimplementam a similaridade de cosseno comparando um
+par de vetores por chamada (`calcular_similaridade`, `cos_sim`,
+`cosine_sim`, `cosine_similarity`). Para comparar muitas queries com muitos
+documentos, um loop Python vira o gargalo.
+
+Este módulo centraliza esse cálculo:
+- Matriz de embeddings float32, contígua e (opcionalmente) pré-normalizada
+- Pontuação query × corpus em uma única multiplicação de matrizes (BLAS)
+- Métricas: cosseno, produto escalar e distância L2
+- Top-k com `argpartition` em blocos de memória limitada
+- Modo paralelo opcional (threads; o NumPy libera o GIL no BLAS)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+METRICS = ('cosine', 'dot', 'l2')
+
+ArrayLike = Union[np.ndarray, Sequence[Sequence[float]], Sequence[float]]
+
+
+def as_matrix(vectors: ArrayLike) -> np.ndarray:
+    """
+    Converte vetores para uma matriz float32 contígua (n, d).
+
+    Um único vetor 1-D vira uma matriz de uma linha.
+    """
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2:
+        raise ValueError(f"Esperado vetor ou matriz 2-D, recebido shape {matrix.shape}")
+    return matrix
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza cada linha para norma 1 (linhas nulas continuam nulas)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def pairwise_scores(queries: ArrayLike, corpus: ArrayLike, metric: str = 'cosine') -> np.ndarray:
+    """
+    Calcula a matriz de scores entre todas as queries e todos os documentos.
+
+    Args:
+        queries: Vetores de consulta (nq, d) ou um vetor (d,)
+        corpus: Vetores do corpus (n, d) ou um vetor (d,)
+        metric: 'cosine', 'dot' ou 'l2' (distância euclidiana)
+
+    Returns:
+        Matriz (nq, n). Para 'l2' valores menores são melhores.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrica inválida: {metric}. Use uma de {METRICS}")
+    q = as_matrix(queries)
+    c = as_matrix(corpus)
+    if metric == 'cosine':
+        return normalize_rows(q) @ normalize_rows(c).T
+    if metric == 'dot':
+        return q @ c.T
+    return _l2_distances(q, c, (c * c).sum(axis=1))
+
+
+def _l2_distances(q: np.ndarray, c: np.ndarray, c_sq_norms: np.ndarray) -> np.ndarray:
+    """Distância L2 via ||q||² + ||c||² - 2·q·c (uma multiplicação de matrizes)."""
+    q_sq = (q * q).sum(axis=1, keepdims=True)
+    sq = q_sq + c_sq_norms[None, :] - 2.0 * (q @ c.T)
+    np.maximum(sq, 0.0, out=sq)
+    return np.sqrt(sq)
+
+
+def cosine_similarity(v1: ArrayLike, v2: ArrayLike) -> Union[float, np.ndarray]:
+    """
+    Similaridade de cosseno compatível com as funções dos labs.
+
+    Com dois vetores 1-D retorna um float (como `calcular_similaridade`);
+    com matrizes retorna a matriz de similaridades.
+    """
+    scores = pairwise_scores(v1, v2, 'cosine')
+    if np.ndim(v1) == 1 and np.ndim(v2) == 1:
+        return float(scores[0, 0])
+    return scores
+
+
+class EmbeddingMatrix:
+    """
+    Corpus de embeddings pronto para busca em lote.
+
+    Os vetores são guardados uma única vez como float32 contíguo. Para a
+    métrica de cosseno guardamos a versão normalizada, então cada busca é
+    apenas um produto de matrizes.
+    """
+
+    def __init__(self, vectors: ArrayLike, metric: str = 'cosine'):
+        """
+        Args:
+            vectors: Embeddings do corpus (n, d)
+            metric: Métrica padrão das buscas ('cosine', 'dot' ou 'l2')
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Métrica inválida: {metric}. Use uma de {METRICS}")
+        self.metric = metric
+        matrix = as_matrix(vectors)
+        self.matrix = normalize_rows(matrix) if metric == 'cosine' else matrix
+        self._sq_norms = (self.matrix * self.matrix).sum(axis=1) if metric == 'l2' else None
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos vetores."""
+        return self.matrix.nbytes
+
+    def _prepare_queries(self, queries: ArrayLike) -> np.ndarray:
+        q = as_matrix(queries)
+        if q.shape[1] != self.dim:
+            raise ValueError(f"Dimensão da query ({q.shape[1]}) diferente do corpus ({self.dim})")
+        return normalize_rows(q) if self.metric == 'cosine' else q
+
+    def _block_scores(self, q: np.ndarray, start: int, stop: int) -> np.ndarray:
+        block = self.matrix[start:stop]
+        if self.metric == 'l2':
+            return _l2_distances(q, block, self._sq_norms[start:stop])
+        return q @ block.T
+
+    def scores(self, queries: ArrayLike) -> np.ndarray:
+        """
+        Scores de todas as queries contra todo o corpus.
+
+        Returns:
+            Matriz (nq, n). Para 'l2' valores menores são melhores.
+        """
+        return self._block_scores(self._prepare_queries(queries), 0, len(self))
+
+    def _top_k_block(self, q: np.ndarray, start: int, stop: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k local de um bloco do corpus (índices globais)."""
+        scores = self._block_scores(q, start, stop)
+        kk = min(k, stop - start)
+        # argpartition escolhe os k melhores em O(n), sem ordenar o bloco
+        if self.metric == 'l2':
+            idx = np.argpartition(scores, kk - 1, axis=1)[:, :kk]
+        else:
+            idx = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        return np.take_along_axis(scores, idx, axis=1), idx + start
+
+    def top_k(
+        self,
+        queries: ArrayLike,
+        k: int = 4,
+        block_size: int = 65_536,
+        n_threads: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna os k documentos mais próximos de cada query.
+
+        O corpus é percorrido em blocos de `block_size` linhas, então a
+        memória extra é de no máximo nq × block_size floats por thread.
+
+        Args:
+            queries: Vetores de consulta (nq, d) ou um vetor (d,)
+            k: Número de resultados por query
+            block_size: Linhas do corpus por bloco
+            n_threads: Se > 1, processa blocos em paralelo
+
+        Returns:
+            (scores, índices), ambos (nq, k), ordenados do melhor para o pior
+        """
+        if k <= 0:
+            raise ValueError("k deve ser positivo")
+        q = self._prepare_queries(queries)
+        n = len(self)
+        k = min(k, n)
+        bounds = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+        if n_threads and n_threads > 1 and len(bounds) > 1:
+            with ThreadPoolExecutor(max_workers=n_threads) as pool:
+                partials = list(pool.map(lambda b: self._top_k_block(q, b[0], b[1], k), bounds))
+        else:
+            partials = [self._top_k_block(q, start, stop, k) for start, stop in bounds]
+
+        cand_scores = np.concatenate([p[0] for p in partials], axis=1)
+        cand_idx = np.concatenate([p[1] for p in partials], axis=1)
+
+        order = np.argsort(cand_scores, axis=1, kind='stable')
+        if self.metric != 'l2':
+            order = order[:, ::-1]
+        order = order[:, :k]
+        return np.take_along_axis(cand_scores, order, axis=1), np.take_along_axis(cand_idx, order, axis=1)
+
+    def search(self, query: ArrayLike, k: int = 4, labels: Optional[List] = None) -> List[Tuple]:
+        """
+        Atalho para uma única query: retorna [(índice ou rótulo, score), ...].
+
+        Args:
+            query: Vetor de consulta (d,)
+            k: Número de resultados
+            labels: Rótulos opcionais dos documentos (ex: textos)
+        """
+        scores, idx = self.top_k(query, k=k)
+        return [
+            (labels[i] if labels is not None else int(i), float(s))
+            for i, s in zip(idx[0], scores[0])
+        ]
@@ -0,0 +1,255 @@
+"""
+Busca Matryoshka em dois estágios com FAISS.
+
+O Lab 1.3 mostra que embeddings Matryoshka mantêm a estrutura de
+similaridade quando cortados pelo prefixo. Aqui isso vira um modo de
+índice:
+
+    query ──► [FAISS com prefixo de d dims] ──► top (k × oversample)
+          ──► [rescoring com vetores completos em disco (memmap)] ──► top k
+
+- Só o prefixo truncado (ex: 128 ou 256 de 768 dims) fica no índice FAISS
+  em memória
+- Os vetores completos ficam em um arquivo `.npy` mapeado em memória; só
+  as linhas dos candidatos são lidas no rescoring
+- `evaluate_truncation_levels` mede recall@k e latência por nível de corte
+
+Modelos com suporte Matryoshka: `nomic-embed-text`, `embeddinggemma`,
+`text-embedding-004`, `text-embedding-3-*`.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+FULL_VECTORS_FILE = "full_vectors.npy"
+COARSE_INDEX_FILE = "coarse.faiss"
+META_FILE = "matryoshka.json"
+
+
+def _normalized(vectors: Union[np.ndarray, Sequence[Sequence[float]]]) -> np.ndarray:
+    """Cópia float32 contígua com linhas de norma 1."""
+    matrix = np.array(vectors, dtype=np.float32, order='C', ndmin=2)
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+class MatryoshkaIndex:
+    """
+    Índice de dois estágios: prefixo truncado no FAISS + rescoring completo.
+
+    Os scores são similaridade de cosseno (produto interno de vetores
+    normalizados), então valores maiores são melhores.
+    """
+
+    def __init__(
+        self,
+        coarse_dim: int = 256,
+        oversample: int = 4,
+        store_dir: Optional[Union[str, Path]] = None,
+    ):
+        """
+        Args:
+            coarse_dim: Dimensões do prefixo usado no primeiro estágio
+            oversample: Candidatos buscados por resultado final (k × oversample)
+            store_dir: Diretório dos vetores completos (memmap). Se None,
+                os vetores completos ficam em memória
+        """
+        if coarse_dim <= 0 or oversample < 1:
+            raise ValueError("coarse_dim deve ser positivo e oversample >= 1")
+        self.coarse_dim = coarse_dim
+        self.oversample = oversample
+        self.store_dir = Path(store_dir) if store_dir is not None else None
+        self.coarse_index: Optional[faiss.Index] = None
+        self.full_vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return 0 if self.coarse_index is None else self.coarse_index.ntotal
+
+    @property
+    def full_dim(self) -> Optional[int]:
+        return None if self.full_vectors is None else self.full_vectors.shape[1]
+
+    def build(self, vectors: Union[np.ndarray, Sequence[Sequence[float]]]) -> 'MatryoshkaIndex':
+        """
+        Constrói o índice a partir dos embeddings completos (n, D).
+
+        O prefixo é renormalizado antes de ir para o FAISS: um vetor
+        Matryoshka cortado é um embedding válido, mas não tem norma 1.
+        """
+        full = _normalized(vectors)
+        if self.coarse_dim > full.shape[1]:
+            raise ValueError(f"coarse_dim ({self.coarse_dim}) maior que a dimensão ({full.shape[1]})")
+
+        if self.store_dir is not None:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            path = self.store_dir / FULL_VECTORS_FILE
+            np.save(path, full)
+            self.full_vectors = np.load(path, mmap_mode='r')
+        else:
+            self.full_vectors = full
+
+        self.coarse_index = faiss.IndexFlatIP(self.coarse_dim)
+        self.coarse_index.add(_normalized(full[:, :self.coarse_dim]))
+        return self
+
+    def search(
+        self,
+        queries: Union[np.ndarray, Sequence[float], Sequence[Sequence[float]]],
+        k: int = 4,
+        oversample: Optional[int] = None,
+        rescore: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k vizinhos mais próximos de cada query.
+
+        Args:
+            queries: Embeddings completos das queries (nq, D) ou (D,)
+            k: Número de resultados
+            oversample: Sobrescreve o fator de over-fetch do índice
+            rescore: Se False, retorna apenas o primeiro estágio (prefixo)
+
+        Returns:
+            (scores, ids), ambos (nq, k), ordenados do melhor para o pior.
+            Posições sem resultado têm id -1.
+        """
+        if self.coarse_index is None:
+            raise RuntimeError("Índice vazio: chame build() primeiro")
+        q_full = _normalized(queries)
+        q_coarse = _normalized(q_full[:, :self.coarse_dim])
+
+        if not rescore:
+            return self.coarse_index.search(q_coarse, k)
+
+        n_candidates = min(k * (oversample or self.oversample), len(self))
+        _, candidates = self.coarse_index.search(q_coarse, n_candidates)
+
+        scores = np.full((len(q_full), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(q_full), k), -1, dtype=np.int64)
+        for i, cand in enumerate(candidates):
+            cand = cand[cand >= 0]
+            # Leitura ordenada das linhas do memmap (acesso sequencial no disco)
+            cand = np.sort(cand)
+            cand_scores = self.full_vectors[cand] @ q_full[i]
+            top = np.argsort(-cand_scores)[:k]
+            scores[i, :len(top)] = cand_scores[top]
+            ids[i, :len(top)] = cand[top]
+        return scores, ids
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes do índice em memória (prefixo) e do armazenamento completo."""
+        n = len(self)
+        return {
+            'coarse_bytes': n * self.coarse_dim * 4,
+            'full_bytes': n * (self.full_dim or 0) * 4,
+        }
+
+    def save(self, directory: Union[str, Path]) -> Path:
+        """Salva o índice do primeiro estágio, os vetores completos e a configuração."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.coarse_index, str(directory / COARSE_INDEX_FILE))
+        full_path = directory / FULL_VECTORS_FILE
+        if self.store_dir is None or self.store_dir.resolve() != directory.resolve():
+            np.save(full_path, np.asarray(self.full_vectors))
+        (directory / META_FILE).write_text(json.dumps({
+            'coarse_dim': self.coarse_dim,
+            'oversample': self.oversample,
+            'full_dim': self.full_dim,
+            'ntotal': len(self),
+        }, indent=2))
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> 'MatryoshkaIndex':
+        """Carrega um índice salvo; os vetores completos são abertos como memmap."""
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        index = cls(meta['coarse_dim'], meta['oversample'], store_dir=directory)
+        index.coarse_index = faiss.read_index(str(directory / COARSE_INDEX_FILE))
+        index.full_vectors = np.load(directory / FULL_VECTORS_FILE, mmap_mode='r')
+        return index
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    """Fração dos ids esperados (top-k exato) presentes nos ids encontrados."""
+    k = expected.shape[1]
+    hits = sum(len(set(f[:k]) & set(e)) for f, e in zip(found, expected))
+    return hits / expected.size
+
+
+def evaluate_truncation_levels(
+    vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+    queries: Union[np.ndarray, Sequence[Sequence[float]]],
+    dims: Sequence[int] = (64, 128, 256, 512),
+    k: int = 10,
+    oversample: int = 4,
+    store_dir: Optional[Union[str, Path]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compara a busca exata com a busca Matryoshka em cada nível de corte.
+
+    A referência é um `IndexFlatIP` com as dimensões completas. Para cada
+    nível são medidos o recall@k só com o prefixo, o recall@k após o
+    rescoring e a latência média por query.
+
+    Args:
+        vectors: Embeddings completos do corpus (n, D)
+        queries: Embeddings completos das queries (nq, D)
+        dims: Níveis de corte a avaliar (maiores que D são ignorados)
+        k: Tamanho do top-k
+        oversample: Fator de over-fetch do primeiro estágio
+        store_dir: Diretório para os memmaps (um subdiretório por nível)
+
+    Returns:
+        Lista de dicionários, um por nível (o primeiro é a referência exata)
+    """
+    full = _normalized(vectors)
+    q_full = _normalized(queries)
+    n, full_dim = full.shape
+    nq = len(q_full)
+
+    exact = faiss.IndexFlatIP(full_dim)
+    exact.add(full)
+    start = time.perf_counter()
+    _, expected = exact.search(q_full, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / nq
+
+    results = [{
+        'dim': full_dim,
+        'recall_coarse': 1.0,
+        'recall_rescored': 1.0,
+        'latency_coarse_ms': exact_ms,
+        'latency_rescored_ms': exact_ms,
+        'index_mb': n * full_dim * 4 / 1024 ** 2,
+        'memory_ratio': 1.0,
+    }]
+
+    for dim in dims:
+        if dim >= full_dim:
+            continue
+        level_dir = Path(store_dir) / f"d{dim}" if store_dir is not None else None
+        index = MatryoshkaIndex(dim, oversample, store_dir=level_dir).build(full)
+
+        start = time.perf_counter()
+        _, coarse_ids = index.search(q_full, k, rescore=False)
+        coarse_ms = (time.perf_counter() - start) * 1000 / nq
+
+        start = time.perf_counter()
+        _, rescored_ids = index.search(q_full, k)
+        rescored_ms = (time.perf_counter() - start) * 1000 / nq
+
+        results.append({
+            'dim': dim,
+            'recall_coarse': recall_at_k(coarse_ids, expected),
+            'recall_rescored': recall_at_k(rescored_ids, expected),
+            'latency_coarse_ms': coarse_ms,
+            'latency_rescored_ms': rescored_ms,
+            'index_mb': index.memory_usage()['coarse_bytes'] / 1024 ** 2,
+            'memory_ratio': full_dim / dim,
+        })
+    return results
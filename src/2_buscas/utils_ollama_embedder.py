@@ -0,0 +1,244 @@
+"""
+Cliente de embeddings do Ollama para ingestão em alto volume.
+
+Evolução da classe `OllamaEmbedder` do Lab 2.0:
+- Envia listas de textos no campo `input` do `/api/embed` (batch nativo)
+- Reutiliza conexões HTTP (keep-alive) com um `requests.Session` em pool
+- Processa vários batches em paralelo (ThreadPoolExecutor)
+- Ajusta o tamanho do batch conforme a latência observada
+- Preserva a ordem dos textos de entrada
+- Retorna estatísticas de throughput por batch
+"""
+
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaEmbedder:
+    """
+    Wrapper para gerar embeddings via Ollama.
+
+    Características:
+    - Usa API nativa do Ollama (`/api/embed`)
+    - Batch nativo: um request por lote de textos
+    - Conexões reaproveitadas entre requests (pool keep-alive)
+    - Concorrência configurável (`max_workers`)
+    - Batch adaptativo: cresce enquanto a latência fica abaixo de
+      `target_latency_ms` e diminui quando passa do alvo
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        model: str = 'nomic-embed-text',
+        timeout: int = 30,
+        batch_size: int = 32,
+        max_workers: int = 4,
+        adaptive: bool = True,
+        min_batch_size: int = 1,
+        max_batch_size: int = 512,
+        target_latency_ms: float = 1000.0,
+    ):
+        """
+        Args:
+            api_url: URL base do Ollama (ex: http://localhost:11434)
+            model: Nome do modelo de embeddings
+            timeout: Timeout de cada request em segundos
+            batch_size: Tamanho inicial do batch
+            max_workers: Número de requests simultâneos
+            adaptive: Se True, ajusta o batch_size pela latência observada
+            min_batch_size: Menor batch permitido no modo adaptativo
+            max_batch_size: Maior batch permitido no modo adaptativo
+            target_latency_ms: Latência alvo por batch no modo adaptativo
+        """
+        if batch_size <= 0 or max_workers <= 0:
+            raise ValueError("batch_size e max_workers devem ser positivos")
+
+        self.api_url = api_url.rstrip('/')
+        self.endpoint = f"{self.api_url}/api/embed"
+        self.model = model
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.adaptive = adaptive
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency_ms = target_latency_ms
+        self.total_tokens = 0
+
+        # Pool de conexões: uma conexão keep-alive por worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+
+    def _post(self, inputs: Any) -> Dict[str, Any]:
+        """Envia um request ao `/api/embed` usando a sessão compartilhada."""
+        response = self.session.post(
+            self.endpoint,
+            json={'model': self.model, 'input': inputs},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na API Ollama ({response.status_code}): {response.text}")
+        data = response.json()
+        with self._lock:
+            self.total_tokens += data.get('prompt_eval_count', 0) or 0
+        return data
+
+    def embed_query(self, text: str, return_metadata: bool = False) -> Tuple[List[float], Optional[Dict]]:
+        """
+        Gera embedding para um texto único.
+
+        Args:
+            text: Texto para embeddar
+            return_metadata: Retornar info de latência e dimensão
+
+        Returns:
+            (embedding, metadata) onde metadata é {'dim': int, 'latency_ms': float}
+        """
+        start_time = time.perf_counter()
+        data = self._post(text)
+        embedding = data['embeddings'][0]
+
+        if return_metadata:
+            return embedding, {
+                'dim': len(embedding),
+                'latency_ms': (time.perf_counter() - start_time) * 1000,
+                'model': self.model,
+            }
+        return embedding, None
+
+    def _embed_one_batch(self, batch_num: int, batch: List[str]) -> Tuple[List[List[float]], Dict[str, Any]]:
+        """Embeda um batch com um único request e mede a latência."""
+        start_time = time.perf_counter()
+        data = self._post(batch)
+        embeddings = data['embeddings']
+        if len(embeddings) != len(batch):
+            raise RuntimeError(
+                f"Batch {batch_num}: {len(embeddings)} embeddings para {len(batch)} textos"
+            )
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        return embeddings, {
+            'batch_num': batch_num,
+            'texts_in_batch': len(batch),
+            'latency_ms': latency_ms,
+            'avg_latency_per_text': latency_ms / len(batch),
+            'texts_per_sec': len(batch) / (latency_ms / 1000) if latency_ms > 0 else float('inf'),
+        }
+
+    def _adjust_batch_size(self, wave_stats: List[Dict[str, Any]]) -> None:
+        """Aumenta ou reduz o batch conforme a latência mediana da última rodada."""
+        median_latency = statistics.median(s['latency_ms'] for s in wave_stats)
+        if median_latency < self.target_latency_ms / 2:
+            new_size = min(self.batch_size * 2, self.max_batch_size)
+        elif median_latency > self.target_latency_ms:
+            new_size = max(self.batch_size // 2, self.min_batch_size)
+        else:
+            return
+        if new_size != self.batch_size:
+            logger.debug(
+                "Batch size %d -> %d (latência mediana %.0fms)",
+                self.batch_size, new_size, median_latency,
+            )
+            self.batch_size = new_size
+
+    def embed_batch(self, texts: List[str], return_metadata: bool = False) -> Tuple[List[List[float]], Optional[List[Dict]]]:
+        """
+        Gera embeddings para múltiplos textos com batches concorrentes.
+
+        Os batches são enviados em "rodadas" de até `max_workers` requests
+        simultâneos. Entre rodadas o batch_size pode ser ajustado.
+
+        Args:
+            texts: Lista de textos
+            return_metadata: Retornar estatísticas por batch
+
+        Returns:
+            ([embeddings], [metadata]) com embeddings na mesma ordem de `texts`
+        """
+        embeddings: List[List[float]] = []
+        metadata_list: List[Dict[str, Any]] = []
+        position = 0
+        batch_num = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while position < len(texts):
+                # Monta uma rodada de batches com o tamanho atual
+                wave = []
+                for _ in range(self.max_workers):
+                    if position >= len(texts):
+                        break
+                    batch_num += 1
+                    wave.append((batch_num, texts[position:position + self.batch_size]))
+                    position += self.batch_size
+
+                wave_start = time.perf_counter()
+                futures = [executor.submit(self._embed_one_batch, num, batch) for num, batch in wave]
+                wave_stats = []
+                for future in futures:  # ordem de submissão = ordem dos textos
+                    batch_embeddings, stats = future.result()
+                    embeddings.extend(batch_embeddings)
+                    wave_stats.append(stats)
+
+                wave_ms = (time.perf_counter() - wave_start) * 1000
+                wave_texts = sum(s['texts_in_batch'] for s in wave_stats)
+                logger.info(
+                    "Batches %d-%d: %d textos em %.0fms (%.1f textos/s)",
+                    wave[0][0], wave[-1][0], wave_texts, wave_ms,
+                    wave_texts / (wave_ms / 1000) if wave_ms > 0 else float('inf'),
+                )
+                metadata_list.extend(wave_stats)
+
+                if self.adaptive:
+                    self._adjust_batch_size(wave_stats)
+
+        if return_metadata:
+            return embeddings, metadata_list
+        return embeddings, None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Atalho compatível com a interface `Embeddings` do LangChain."""
+        return self.embed_batch(texts)[0]
+
+    @staticmethod
+    def throughput_summary(metadata_list: List[Dict[str, Any]], wall_time_s: Optional[float] = None) -> Dict[str, float]:
+        """
+        Resume as estatísticas por batch retornadas por `embed_batch`.
+
+        Args:
+            metadata_list: Lista de metadados por batch
+            wall_time_s: Tempo total medido por fora (inclui concorrência)
+
+        Returns:
+            Dicionário com total de textos, batches, latências e throughput
+        """
+        if not metadata_list:
+            return {}
+        latencies = sorted(m['latency_ms'] for m in metadata_list)
+        total_texts = sum(m['texts_in_batch'] for m in metadata_list)
+        summary = {
+            'batches': len(metadata_list),
+            'texts': total_texts,
+            'avg_batch_size': total_texts / len(metadata_list),
+            'p50_batch_latency_ms': statistics.median(latencies),
+            'max_batch_latency_ms': latencies[-1],
+            'avg_latency_per_text_ms': sum(latencies) / total_texts,
+        }
+        if wall_time_s:
+            summary['texts_per_sec'] = total_texts / wall_time_s
+        return summary
+
+    def close(self) -> None:
+        """Fecha as conexões do pool."""
+        self.session.close()
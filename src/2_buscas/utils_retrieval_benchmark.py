@@ -0,0 +1,215 @@
+"""
+Benchmark de qualidade × velocidade de índices FAISS.
+
+O `compare_models` do Lab 2.3 re-embeda os textos e reconstrói o índice
+a cada modelo, e o Lab 2.1 embeda os mesmos textos duas vezes (L2 e
+cosseno). Aqui os embeddings são calculados UMA vez por modelo e salvos
+em disco (`.npy`); todas as variantes de índice partem dessa matriz:
+
+- Flat (busca exata, referência do recall)
+- IVF com vários `nlist` × `nprobe`
+- HNSW com vários `M` × `efSearch`
+- Cada uma em L2 e cosseno
+
+Parâmetros de busca (`nprobe`, `efSearch`) não exigem reconstruir o
+índice: cada índice é construído uma vez e consultado com cada valor.
+
+Métricas por variante: recall@k contra a busca exata, QPS, tempo de build
+e memória do índice serializado.
+"""
+
+import hashlib
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+METRICS = ('l2', 'cosine')
+
+
+def corpus_key(texts: Sequence[str], model_name: str) -> str:
+    """Chave do cache de embeddings: hash do modelo + textos."""
+    digest = hashlib.sha256(model_name.encode('utf-8'))
+    for text in texts:
+        digest.update(b'\x00' + text.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def embed_corpus(
+    texts: Sequence[str],
+    embeddings: Embeddings,
+    model_name: str,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> np.ndarray:
+    """
+    Embeda o corpus uma única vez e reutiliza a matriz salva em disco.
+
+    Args:
+        texts: Textos do corpus
+        embeddings: Modelo de embeddings (interface LangChain)
+        model_name: Nome do modelo (parte da chave do cache)
+        cache_dir: Diretório dos arquivos `.npy` (None = sem cache)
+
+    Returns:
+        Matriz float32 (n, d)
+    """
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / f"{model_name.replace('/', '_')}_{corpus_key(texts, model_name)}.npy"
+        if path.exists():
+            return np.load(path)
+
+    matrix = np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, matrix)
+    return matrix
+
+
+def default_variants(n: int) -> List[Dict[str, Any]]:
+    """
+    Grade padrão de variantes para um corpus de `n` vetores.
+
+    Cada variante: {'name', 'factory', 'param', 'values'}, onde `param` é o
+    parâmetro de busca varrido sem reconstruir o índice.
+    """
+    variants = [{'name': 'Flat', 'factory': 'Flat', 'param': None, 'values': [None]}]
+
+    # IVF: nlist em torno de √n, com pelo menos ~39 pontos de treino por lista
+    base = max(1, int(math.sqrt(n)))
+    for nlist in sorted({max(1, base // 2), base, base * 2}):
+        if nlist > 1 and n >= nlist * 39:
+            nprobes = sorted({p for p in (1, 4, 16, 64) if p <= nlist} | {nlist})
+            variants.append({'name': f'IVF{nlist}', 'factory': f'IVF{nlist},Flat',
+                             'param': 'nprobe', 'values': nprobes})
+
+    for m in (16, 32):
+        variants.append({'name': f'HNSW{m}', 'factory': f'HNSW{m},Flat',
+                         'param': 'efSearch', 'values': [16, 32, 64, 128]})
+    return variants
+
+
+def _prepare(vectors: np.ndarray, metric: str) -> np.ndarray:
+    x = np.array(vectors, dtype=np.float32, order='C', ndmin=2)
+    if metric == 'cosine':
+        faiss.normalize_L2(x)
+    return x
+
+
+def _faiss_metric(metric: str) -> int:
+    return faiss.METRIC_INNER_PRODUCT if metric == 'cosine' else faiss.METRIC_L2
+
+
+def run_retrieval_benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    variants: Optional[List[Dict[str, Any]]] = None,
+    metrics: Sequence[str] = METRICS,
+    verbose: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Constrói e mede cada variante de índice a partir da mesma matriz.
+
+    Args:
+        vectors: Embeddings do corpus (n, d)
+        queries: Embeddings das consultas (nq, d)
+        k: Tamanho do top-k para o recall
+        variants: Grade de variantes (padrão: `default_variants(n)`)
+        metrics: 'l2' e/ou 'cosine'
+        verbose: Imprime uma linha por resultado
+
+    Returns:
+        Uma linha por (variante, métrica, valor do parâmetro de busca)
+    """
+    n, d = np.shape(vectors)
+    k = min(k, n)
+    variants = variants or default_variants(n)
+    rows = []
+
+    for metric in metrics:
+        x = _prepare(vectors, metric)
+        q = _prepare(queries, metric)
+        exact = faiss.IndexFlat(d, _faiss_metric(metric))
+        exact.add(x)
+        _, expected = exact.search(q, k)
+
+        for variant in variants:
+            start = time.perf_counter()
+            index = faiss.index_factory(d, variant['factory'], _faiss_metric(metric))
+            if not index.is_trained:
+                index.train(x)
+            index.add(x)
+            build_s = time.perf_counter() - start
+            memory_mb = faiss.serialize_index(index).nbytes / 1024 ** 2
+
+            params = faiss.ParameterSpace()
+            for value in variant['values']:
+                if variant['param'] is not None:
+                    params.set_index_parameter(index, variant['param'], value)
+
+                start = time.perf_counter()
+                _, found = index.search(q, k)
+                search_s = time.perf_counter() - start
+
+                hits = sum(len(set(f) & set(e)) for f, e in zip(found, expected))
+                row = {
+                    'index': variant['name'],
+                    'metric': metric,
+                    'param': variant['param'],
+                    'value': value,
+                    f'recall@{k}': hits / expected.size,
+                    'qps': len(q) / search_s if search_s > 0 else float('inf'),
+                    'build_s': build_s,
+                    'memory_mb': memory_mb,
+                }
+                rows.append(row)
+                if verbose:
+                    label = f"{variant['name']}" + (f" {variant['param']}={value}" if variant['param'] else "")
+                    print(f"   {metric:>6} | {label:<22} | recall {row[f'recall@{k}']:.3f} | "
+                          f"{row['qps']:>10.0f} QPS | build {build_s:.2f}s | {memory_mb:.1f} MB")
+    return rows
+
+
+def benchmark_models(
+    texts: Sequence[str],
+    queries: Sequence[str],
+    models: Dict[str, Embeddings],
+    k: int = 10,
+    cache_dir: Optional[Union[str, Path]] = None,
+    variants: Optional[List[Dict[str, Any]]] = None,
+    metrics: Sequence[str] = METRICS,
+    verbose: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Roda `run_retrieval_benchmark` para cada modelo com UM passe de embedding.
+
+    Args:
+        texts: Corpus
+        queries: Consultas
+        models: {nome: instância de Embeddings}
+        k: Tamanho do top-k
+        cache_dir: Diretório do cache de matrizes
+        variants: Grade de variantes
+        metrics: Métricas a avaliar
+        verbose: Imprime progresso
+
+    Returns:
+        Linhas de todos os modelos (com a coluna 'model')
+    """
+    rows = []
+    for name, embeddings in models.items():
+        start = time.perf_counter()
+        corpus_vectors = embed_corpus(texts, embeddings, name, cache_dir)
+        # Consultas via embed_query: modelos assimétricos embedam consulta e documento de formas diferentes
+        query_vectors = np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+        if verbose:
+            print(f"\n🔄 {name}: {corpus_vectors.shape[0]} vetores × {corpus_vectors.shape[1]}D "
+                  f"({time.perf_counter() - start:.1f}s de embedding)")
+        for row in run_retrieval_benchmark(corpus_vectors, query_vectors, k, variants, metrics, verbose):
+            rows.append({'model': name, 'dimensions': corpus_vectors.shape[1], **row})
+    return rows
@@ -0,0 +1,197 @@
+"""
+Perguntas e respostas em lote: embeddings em paralelo + 1 busca por batch.
+
+As chains RAG dos labs 3.4–4.1 respondem uma pergunta por vez: para cada
+pergunta, um round-trip de `embed_query`, uma busca no índice e uma
+chamada ao LLM, tudo em sequência. Em avaliações offline e FAQs em massa
+(centenas ou milhares de perguntas) isso leva horas.
+
+`answer_batch` divide o trabalho em três estágios:
+
+    perguntas ──► [embed_query em paralelo, no máximo `embed_concurrency` por vez]
+              ──► [1 busca matricial no FAISS / 1 query_batch_points no Qdrant]
+              ──► [geração em paralelo, no máximo `max_concurrency` por vez]
+
+- Os resultados voltam na ordem das perguntas
+- Perguntas são embedadas com `embed_query`, não `embed_documents`:
+  modelos assimétricos (prefixo de query/documento) embedam perguntas
+  diferente de chunks
+- Uma falha no embedding ou na geração não derruba o lote: o item vem com `error`
+- Tempo de cada estágio em `timings`
+
+Uso:
+
+    result = answer_batch(questions, embeddings, vectorstore, prompt | llm | StrOutputParser(),
+                          format_docs, k=4, max_concurrency=8)
+    result['results'][0]['answer'], result['timings']
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import get_executor_for_config
+
+
+def embed_queries(
+    embeddings: Embeddings,
+    queries: Sequence[str],
+    max_concurrency: Optional[int] = None,
+) -> List[Any]:
+    """
+    Embeda as perguntas com `embed_query`, em paralelo.
+
+    Args:
+        embeddings: Modelo de embeddings
+        queries: Perguntas
+        max_concurrency: Máximo de embeddings simultâneos (None = padrão do executor)
+
+    Returns:
+        Um vetor por pergunta, na mesma ordem; se o embedding de uma
+        pergunta falhar, a exceção ocupa a posição dela
+    """
+    def embed(query):
+        try:
+            return embeddings.embed_query(query)
+        except Exception as e:
+            return e
+
+    if len(queries) <= 1:
+        return [embed(q) for q in queries]
+    with get_executor_for_config({'max_concurrency': max_concurrency}) as executor:
+        return list(executor.map(embed, queries))
+
+
+def _faiss_batch_search(vectorstore, vectors: np.ndarray, k: int) -> List[List[Document]]:
+    import faiss
+
+    if getattr(vectorstore, '_normalize_L2', False):
+        faiss.normalize_L2(vectors)
+    _, indices = vectorstore.index.search(vectors, k)
+    results = []
+    for row in indices:
+        docs = []
+        for i in row:
+            if i == -1:
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
+def _qdrant_batch_search(vectorstore, vectors: np.ndarray, k: int) -> List[List[Document]]:
+    from qdrant_client import models
+
+    responses = vectorstore.client.query_batch_points(
+        vectorstore.collection_name,
+        requests=[
+            models.QueryRequest(query=v.tolist(), using=vectorstore.vector_name or None, limit=k, with_payload=True)
+            for v in vectors
+        ],
+    )
+    return [
+        [
+            Document(
+                page_content=(p.payload or {}).get(vectorstore.content_payload_key, ''),
+                metadata=(p.payload or {}).get(vectorstore.metadata_payload_key) or {},
+            )
+            for p in response.points
+        ]
+        for response in responses
+    ]
+
+
+def batch_search(index, vectors: Sequence[Sequence[float]], k: int = 4) -> List[List[Document]]:
+    """
+    Busca vários vetores de uma vez no índice.
+
+    Args:
+        index: Vectorstore FAISS (busca matricial `index.search`), `QdrantVectorStore`
+            ou `QdrantBatchRetriever` (`query_batch_points`). Outros vectorstores
+            caem em `similarity_search_by_vector` por vetor
+        vectors: Embeddings das perguntas
+        k: Documentos por pergunta
+
+    Returns:
+        Uma lista de documentos por vetor, na mesma ordem
+    """
+    matrix = np.array(vectors, dtype=np.float32)  # cópia: o FAISS pode normalizar in-place
+    if len(matrix) == 0:
+        return []
+    if hasattr(index, 'search_vectors'):
+        return index.search_vectors(matrix, k)
+    if hasattr(index, 'index') and hasattr(index, 'index_to_docstore_id'):
+        return _faiss_batch_search(index, matrix, k)
+    if hasattr(index, 'client') and hasattr(index, 'collection_name'):
+        return _qdrant_batch_search(index, matrix, k)
+    return [index.similarity_search_by_vector(v.tolist(), k=k) for v in matrix]
+
+
+def answer_batch(
+    questions: Sequence[str],
+    embeddings: Embeddings,
+    index,
+    answer_chain: Runnable,
+    format_docs: Callable[[List[Document]], str],
+    k: int = 4,
+    max_concurrency: int = 8,
+    embed_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Responde um lote de perguntas com embedding e busca em batch.
+
+    Args:
+        questions: Perguntas
+        embeddings: Modelo de embeddings (`embed_query` por pergunta)
+        index: Vectorstore FAISS/Qdrant (ver `batch_search`)
+        answer_chain: Geração a partir de {'context', 'question'}
+            (ex: `prompt | llm | StrOutputParser()`)
+        format_docs: Converte os documentos no texto do contexto
+        k: Documentos recuperados por pergunta
+        max_concurrency: Gerações simultâneas no LLM
+        embed_concurrency: Embeddings simultâneos (padrão: `max_concurrency`)
+
+    Returns:
+        {'results': [{'question', 'answer', 'sources', 'error'}], 'timings': {...}}
+    """
+    questions = list(questions)
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    vectors = embed_queries(embeddings, questions, embed_concurrency or max_concurrency)
+    ok = [i for i, v in enumerate(vectors) if not isinstance(v, Exception)]
+    timings['embed_ms'] = (time.perf_counter() - start) * 1000
+
+    t0 = time.perf_counter()
+    sources: List[List[Document]] = [[] for _ in questions]
+    for i, docs in zip(ok, batch_search(index, [vectors[i] for i in ok], k)):
+        sources[i] = docs
+    timings['search_ms'] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    inputs = [{'context': format_docs(sources[i]), 'question': questions[i]} for i in ok]
+    answers = list(vectors)  # perguntas sem embedding ficam com a exceção
+    generated = answer_chain.batch(inputs, config={'max_concurrency': max_concurrency}, return_exceptions=True)
+    for i, answer in zip(ok, generated):
+        answers[i] = answer
+    timings['generate_ms'] = (time.perf_counter() - t0) * 1000
+
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+    timings['questions'] = len(questions)
+    timings['questions_per_second'] = len(questions) / (timings['total_ms'] / 1000) if questions else 0.0
+
+    results = []
+    for question, docs, answer in zip(questions, sources, answers):
+        failed = isinstance(answer, Exception)
+        results.append({
+            'question': question,
+            'answer': None if failed else answer,
+            'sources': docs,
+            'error': repr(answer) if failed else None,
+        })
+    return {'results': results, 'timings': timings}
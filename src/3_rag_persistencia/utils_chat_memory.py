@@ -0,0 +1,423 @@
+"""
+Histórico de conversas limitado, persistente e com compactação.
+
+No Lab 3.7, `get_session_history` guarda um `InMemoryChatMessageHistory`
+por sessão no dict global `chat_history_store` e nunca remove nenhum, e
+`format_chat_history` remonta e fatia a lista INTEIRA de mensagens a cada
+turno. Com tráfego real a memória cresce sem limite e tudo se perde em um
+restart.
+
+Este módulo oferece:
+
+- `ChatSessionStore`: substitui o `chat_history_store` + `get_session_history`
+  - Backend SQLite append-only: mensagens só são inseridas, nunca reescritas
+  - Em memória ficam só as sessões ativas (LRU + TTL), cada uma com uma
+    janela das últimas N trocas; sessões descartadas continuam no disco
+- `SessionHistory`: histórico de uma sessão (`BaseChatMessageHistory`)
+  - `messages` = resumo da conversa + últimas N trocas (prompt curto)
+  - Mensagens que saem da janela entram na hora em um resumo incremental
+    limitado a `summary_token_budget` tokens (nada some do prompt)
+  - `recent(n)` busca as últimas n trocas em O(n) (índice por sessão)
+- `format_chat_history`: mesma saída do lab, percorrendo só o fim da lista
+
+Uso:
+
+    store = ChatSessionStore("chat_history.sqlite", max_sessions=1000, recent_turns=3)
+    history = store.get_session_history("user_123")
+    history.add_user_message("Quais formações existem?")
+    history.add_ai_message("4-4-2, 4-3-3...")
+    format_chat_history(history.messages)
+"""
+
+import math
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Union
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+_ROLES = {'human': HumanMessage, 'ai': AIMessage, 'system': SystemMessage}
+
+Summarizer = Callable[[str, List[BaseMessage], int], str]
+
+
+def approx_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token, como no lab 3.3)."""
+    return math.ceil(len(text) / 4)
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    text = " ".join(text.split())
+    for end in ('. ', '! ', '? ', '\n'):
+        if end in text:
+            text = text[:text.index(end) + 1]
+            break
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def extractive_summarizer(
+    count_tokens: Callable[[str], int] = approx_tokens,
+) -> Summarizer:
+    """
+    Resumo sem LLM: uma linha por mensagem (primeira frase), descartando as
+    linhas mais antigas quando o resumo passa do orçamento de tokens.
+
+    Args:
+        count_tokens: Função que conta tokens de um texto
+
+    Returns:
+        Função (resumo anterior, mensagens novas, orçamento) → novo resumo
+    """
+    def summarize(previous: str, messages: List[BaseMessage], budget: int) -> str:
+        lines = previous.splitlines() if previous else []
+        for msg in messages:
+            who = "Usuário" if isinstance(msg, HumanMessage) else "Assistente"
+            lines.append(f"- {who}: {_first_sentence(str(msg.content))}")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    return summarize
+
+
+def llm_summarizer(llm, count_tokens: Callable[[str], int] = approx_tokens) -> Summarizer:
+    """
+    Resumo incremental com LLM: atualiza o resumo anterior com as trocas novas.
+
+    Args:
+        llm: Modelo com `.invoke(prompt)` (ex: OllamaLLM)
+        count_tokens: Função que conta tokens (para garantir o orçamento)
+
+    Returns:
+        Função (resumo anterior, mensagens novas, orçamento) → novo resumo
+    """
+    fallback = extractive_summarizer(count_tokens)
+
+    def summarize(previous: str, messages: List[BaseMessage], budget: int) -> str:
+        prompt = (
+            f"Atualize o resumo da conversa com as novas mensagens, em no máximo {budget * 3 // 4} palavras.\n\n"
+            f"RESUMO ATUAL:\n{previous or 'Nenhum.'}\n\n"
+            f"NOVAS MENSAGENS:\n{format_chat_history(messages, max_messages=len(messages))}\n\n"
+            "NOVO RESUMO:"
+        )
+        summary = llm.invoke(prompt)
+        summary = str(getattr(summary, 'content', summary)).strip()
+        # O LLM pode ignorar o limite: nesse caso cai no resumo extrativo
+        return summary if count_tokens(summary) <= budget else fallback(previous, messages, budget)
+
+    return summarize
+
+
+def format_chat_history(messages: Sequence[BaseMessage], max_messages: int = 6) -> str:
+    """
+    Formata o histórico para o prompt (resumo + últimas `max_messages` mensagens).
+
+    Percorre a lista de trás para frente e para ao atingir o limite: o custo
+    não cresce com o tamanho da conversa.
+
+    Args:
+        messages: Mensagens (um `SystemMessage` inicial é tratado como resumo)
+        max_messages: Máximo de mensagens de usuário/assistente exibidas
+
+    Returns:
+        Texto formatado ("Nenhuma conversa anterior." se vazio)
+    """
+    formatted = []
+    for msg in reversed(messages):
+        if len(formatted) == max_messages:
+            break
+        if isinstance(msg, HumanMessage):
+            formatted.append(f"👤 Usuário: {msg.content}")
+        elif isinstance(msg, AIMessage):
+            formatted.append(f"🤖 Assistente: {msg.content}")
+    formatted.reverse()
+
+    if messages and isinstance(messages[0], SystemMessage) and messages[0].content:
+        formatted.insert(0, f"📝 Resumo da conversa anterior:\n{messages[0].content}\n")
+    return "\n".join(formatted) if formatted else "Nenhuma conversa anterior."
+
+
+class SessionHistory(BaseChatMessageHistory):
+    """
+    Histórico de uma sessão: janela recente em memória + SQLite + resumo.
+
+    Criado pelo `ChatSessionStore`; não instancie diretamente.
+    """
+
+    def __init__(self, store: 'ChatSessionStore', session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self.last_access = store.clock()
+
+        window = store.recent_turns * 2
+        self.summary, self.summarized_until, self._count = store._load_session(session_id)
+        # Mensagens posteriores ao resumo: as últimas vão para a janela; as demais
+        # (processo interrompido antes de salvar o resumo) são resumidas agora
+        rows = store._fetch(session_id, after_id=self.summarized_until)
+        split = max(len(rows) - window, 0)
+        self._recent: deque = deque(rows[split:], maxlen=window)  # pares (id, mensagem)
+        self._pending: List[tuple] = rows[:split]  # saíram da janela e ainda não foram resumidas
+        self.compact()
+
+    def __len__(self) -> int:
+        """Total de mensagens da sessão (inclusive as já resumidas)."""
+        return self._count
+
+    @property
+    def messages(self) -> List[BaseMessage]:  # type: ignore[override]
+        """Resumo (como `SystemMessage`) + últimas `recent_turns` trocas."""
+        prefix = [SystemMessage(content=self.summary)] if self.summary else []
+        return prefix + [m for _, m in self._recent]
+
+    def recent(self, n_turns: int) -> List[BaseMessage]:
+        """
+        Últimas `n_turns` trocas, em O(n).
+
+        Dentro da janela vem da memória; além dela, uma consulta com
+        `ORDER BY id DESC LIMIT 2n` no índice (session_id, id).
+        """
+        n = n_turns * 2
+        if n <= len(self._recent):
+            return [m for _, m in list(self._recent)[len(self._recent) - n:]]
+        return [m for _, m in self.store._fetch(self.session_id, limit=n)]
+
+    def all_messages(self) -> List[BaseMessage]:
+        """Todas as mensagens da sessão, lidas do disco (para inspeção)."""
+        return [m for _, m in self.store._fetch(self.session_id)]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """
+        Grava as mensagens (uma transação) e resume as que saíram da janela.
+
+        O resumo é atualizado uma vez por chamada: `add_messages([pergunta,
+        resposta])` custa uma chamada ao resumidor por troca.
+        """
+        messages = list(messages)
+        if not messages:
+            return
+        ids = self.store._append(self.session_id, messages)
+        self._count += len(messages)
+        self.last_access = self.store.clock()
+        for row in zip(ids, messages):
+            if len(self._recent) == self._recent.maxlen:
+                self._pending.append(self._recent[0])
+            self._recent.append(row)
+        self.compact()
+
+    def compact(self) -> None:
+        """Incorpora ao resumo as mensagens que já saíram da janela recente."""
+        if not self._pending:
+            return
+        pending = [m for _, m in self._pending]
+        self.summary = self.store.summarize(self.summary, pending, self.store.summary_token_budget)
+        self.summarized_until = self._pending[-1][0]
+        self._pending = []
+        self.store._save_summary(self.session_id, self.summary, self.summarized_until, self._count)
+
+    def clear(self) -> None:
+        """Apaga a sessão (mensagens e resumo) do disco e da memória."""
+        self.store._delete_session(self.session_id)
+        self._recent.clear()
+        self._pending = []
+        self.summary, self.summarized_until, self._count = "", 0, 0
+
+
+class ChatSessionStore:
+    """
+    Store de históricos por sessão com LRU/TTL em memória e SQLite no disco.
+
+    A memória fica limitada a `max_sessions × 2 × recent_turns` mensagens,
+    independente do número de sessões e do tamanho das conversas.
+
+    Cada sessão tem um único `SessionHistory` por store: se uma sessão
+    sai da memória (LRU/TTL) enquanto alguém ainda guarda o objeto (ex:
+    `chatbot.history`), a próxima chamada reaproveita esse objeto em vez de
+    criar um segundo escritor, cujo resumo sobrescreveria o do primeiro.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = ":memory:",
+        max_sessions: int = 1000,
+        ttl_seconds: Optional[float] = 1800,
+        recent_turns: int = 3,
+        summary_token_budget: int = 256,
+        summarize: Optional[Summarizer] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            db_path: Arquivo SQLite (":memory:" = sem persistência)
+            max_sessions: Sessões mantidas em memória (LRU)
+            ttl_seconds: Sessões ociosas por mais tempo saem da memória (None = sem TTL)
+            recent_turns: Trocas (usuário + assistente) mantidas na íntegra no prompt
+            summary_token_budget: Tamanho máximo do resumo, em tokens
+            summarize: Função de resumo (padrão: `extractive_summarizer()`)
+            clock: Relógio (injetável nos testes)
+        """
+        if max_sessions <= 0:
+            raise ValueError("max_sessions deve ser positivo")
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.recent_turns = recent_turns
+        self.summary_token_budget = summary_token_budget
+        self.summarize = summarize or extractive_summarizer()
+        self.clock = clock
+
+        self._sessions: 'OrderedDict[str, SessionHistory]' = OrderedDict()
+        # Históricos ainda referenciados fora do store (inclusive os já descartados do LRU)
+        self._live: 'weakref.WeakValueDictionary[str, SessionHistory]' = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0, 'expirations': 0}
+
+        if str(db_path) != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                summarized_until INTEGER NOT NULL,
+                message_count INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        """Sessões atualmente em memória."""
+        return len(self._sessions)
+
+    def __call__(self, session_id: str) -> SessionHistory:
+        return self.get_session_history(session_id)
+
+    def get_session_history(self, session_id: str) -> SessionHistory:
+        """
+        Retorna o histórico da sessão (recarrega do disco se saiu da memória).
+
+        Compatível com `RunnableWithMessageHistory(get_session_history=store)`.
+        """
+        with self._lock:
+            self._expire()
+            history = self._sessions.get(session_id)
+            if history is not None:
+                self._sessions.move_to_end(session_id)
+                self.stats['hits'] += 1
+            else:
+                history = self._live.get(session_id)
+                if history is not None:
+                    self.stats['hits'] += 1
+                else:
+                    history = SessionHistory(self, session_id)
+                    self._live[session_id] = history
+                    self.stats['loads'] += 1
+                self._sessions[session_id] = history
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.stats['evictions'] += 1
+            history.last_access = self.clock()
+            return history
+
+    def _expire(self) -> None:
+        if self.ttl_seconds is None:
+            return
+        deadline = self.clock() - self.ttl_seconds
+        # OrderedDict em ordem de acesso: as ociosas estão no início
+        while self._sessions:
+            session_id, history = next(iter(self._sessions.items()))
+            if history.last_access >= deadline:
+                break
+            del self._sessions[session_id]
+            self.stats['expirations'] += 1
+
+    def session_ids(self) -> List[str]:
+        """Todas as sessões gravadas no disco."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT session_id FROM messages").fetchall()
+        return [r[0] for r in rows]
+
+    # ------------------------------------------------------------------
+    # Acesso ao SQLite
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _to_message(role: str, content: str) -> BaseMessage:
+        return _ROLES.get(role, HumanMessage)(content=content)
+
+    def _append(self, session_id: str, messages: Sequence[BaseMessage]) -> List[int]:
+        now = self.clock()
+        with self._lock, self._conn:
+            return [
+                self._conn.execute(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    (session_id, msg.type, str(msg.content), now),
+                ).lastrowid
+                for msg in messages
+            ]
+
+    def _fetch(self, session_id: str, after_id: int = 0, limit: int = -1):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id DESC LIMIT ?"
+                if limit >= 0 else
+                "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (session_id, after_id, limit),
+            ).fetchall()
+        if limit >= 0:
+            rows.reverse()
+        return [(i, self._to_message(role, content)) for i, role, content in rows]
+
+    def _load_session(self, session_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized_until, message_count FROM summaries WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            summary, until, count = row or ("", 0, 0)
+            # Mensagens gravadas depois do último resumo
+            count += self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND id > ?", (session_id, until),
+            ).fetchone()[0]
+        return summary, until, count
+
+    def _save_summary(self, session_id: str, summary: str, until: int, count: int) -> None:
+        with self._lock:
+            # message_count guarda só as mensagens até `until`; o restante é contado no load
+            covered = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND id > ?", (session_id, until),
+            ).fetchone()[0]
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                    (session_id, summary, until, count - covered),
+                )
+
+    def _delete_session(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._live.clear()
+            self._conn.close()
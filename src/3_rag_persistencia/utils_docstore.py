@@ -0,0 +1,459 @@
+"""
+Docstore em SQLite com leitura sob demanda, no lugar do `index.pkl`.
+
+Nos labs 3.1 e 3.2, `save_local`/`load_local` fazem pickle do
+`InMemoryDocstore` inteiro: todos os `Document`, cada um com um dicionário
+de metadados que repete `source_path`, `ingestion_date`, `doc_type`...
+O tempo de carga e a memória (RSS) do processo crescem com o texto total
+do corpus, e a carga exige `allow_dangerous_deserialization=True`.
+
+Este módulo oferece:
+
+- `SQLiteDocstore`: docstore do LangChain (`search`, `add`, `delete`)
+  gravado em um arquivo SQLite
+  - O texto de um documento só é lido quando ele é um dos top-k de uma
+    busca (consulta pela chave primária)
+  - Metadados repetidos são codificados por dicionário: cada par
+    (chave, valor) distinto é gravado uma vez na tabela `metadata_values`
+    e o documento guarda só os IDs; valores únicos por chunk (`chunk_id`,
+    `content_hash`) e textos longos ficam inline
+  - Os valores decodificados são compartilhados entre os documentos
+    devolvidos (a mesma string, não uma cópia por chunk)
+- `save_local_sqlite` / `load_local_sqlite`: `index.faiss` +
+  `index.docstore.sqlite`, sem pickle (dispensa `allow_dangerous_deserialization`)
+  - O índice carregado abre o SQLite em modo somente leitura; o primeiro
+    `add_texts`/`delete` copia o banco para a memória (copy-on-write), então
+    outros processos lendo a mesma pasta nunca veem uma alteração não salva
+  - O docstore guarda o SHA-256 do `index.faiss` com que foi salvo: depois
+    de um `save_local` simples na mesma pasta, `docstore_matches_index`
+    diz que o `.sqlite` ficou velho e a carga usa o `index.pkl`
+
+Esquema (inspirado em `embeddings_metadata` do `data/init-db.sql`):
+
+    documents(id, content, shared, extra)      shared = IDs em metadata_values
+    metadata_values(id, key, value)            valor em JSON, único por (key, value)
+    positions(position, doc_id)                index_to_docstore_id do FAISS
+    meta(key, value)                           distance_strategy, normalize_L2, index_sha256
+
+Uso:
+
+    save_local_sqlite(vector_store, FAISS_PATH)
+    vector_store = load_local_sqlite(FAISS_PATH, embeddings)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import faiss
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+DOCSTORE_SUFFIX = ".docstore.sqlite"
+
+# Chaves com um valor diferente por chunk: ir para o dicionário só o faria crescer
+INLINE_KEYS = ('chunk_id', 'content_hash', 'id')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    shared BLOB,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS metadata_values (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (key, value)
+);
+CREATE TABLE IF NOT EXISTS positions (
+    position INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore do LangChain em SQLite, com metadados codificados por dicionário.
+
+    Pode substituir o `InMemoryDocstore` em qualquer `FAISS`
+    (`add_texts`, `delete` e buscas continuam funcionando).
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        inline_keys: Sequence[str] = INLINE_KEYS,
+        max_intern_length: int = 256,
+        read_only: bool = False,
+    ):
+        """
+        Args:
+            path: Arquivo SQLite (criado se não existir)
+            inline_keys: Chaves gravadas inline em vez de no dicionário
+            max_intern_length: Strings maiores que isso ficam inline
+            read_only: Abre o arquivo sem escrita; a primeira alteração
+                copia o banco para a memória
+        """
+        self.path = str(path)
+        self.inline_keys = frozenset(inline_keys)
+        self.max_intern_length = max_intern_length
+        self.read_only = read_only
+        self._connect()
+        self._lock = threading.Lock()
+        self._value_ids: Dict[Tuple[str, str], int] = {}
+        self._values: Dict[int, Tuple[str, Any]] = {}
+
+    def _connect(self) -> None:
+        """Abre `self.conn` no arquivo (somente leitura se `read_only`)."""
+        if self.read_only:
+            self.conn = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True,
+                                        check_same_thread=False)
+        else:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+
+    def _ensure_writable(self) -> None:
+        """Copy-on-write: troca o arquivo somente leitura por uma cópia em memória."""
+        if self.read_only:
+            memory = sqlite3.connect(":memory:", check_same_thread=False)
+            self.conn.backup(memory)
+            self.conn.close()
+            self.conn, self.path, self.read_only = memory, ":memory:", False
+
+    # ------------------------------------------------------------------
+    # Codificação dos metadados
+    # ------------------------------------------------------------------
+
+    def _should_intern(self, key: str, value: Any) -> bool:
+        if key in self.inline_keys:
+            return False
+        if isinstance(value, str):
+            return len(value) <= self.max_intern_length
+        return value is None or isinstance(value, (bool, int, float))
+
+    def _value_id(self, key: str, value: Any) -> int:
+        encoded = (key, _dumps(value))
+        value_id = self._value_ids.get(encoded)
+        if value_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO metadata_values (key, value) VALUES (?, ?)", encoded)
+            value_id = self.conn.execute(
+                "SELECT id FROM metadata_values WHERE key = ? AND value = ?", encoded).fetchone()[0]
+            self._value_ids[encoded] = value_id
+        return value_id
+
+    def _encode(self, metadata: Dict[str, Any]) -> Tuple[bytes, Optional[str]]:
+        shared = array('I')
+        extra = {}
+        for key, value in metadata.items():
+            if self._should_intern(key, value):
+                shared.append(self._value_id(key, value))
+            else:
+                extra[key] = value
+        return shared.tobytes(), _dumps(extra) if extra else None
+
+    def _decode(self, shared: Optional[bytes], extra: Optional[str]) -> Dict[str, Any]:
+        ids = array('I')
+        if shared:
+            ids.frombytes(shared)
+        missing = [i for i in ids if i not in self._values]
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            for value_id, key, value in self.conn.execute(
+                    f"SELECT id, key, value FROM metadata_values WHERE id IN ({placeholders})", missing):
+                self._values[value_id] = (key, json.loads(value))
+        metadata = dict(self._values[i] for i in ids)
+        if extra:
+            metadata.update(json.loads(extra))
+        return metadata
+
+    # ------------------------------------------------------------------
+    # Interface Docstore / AddableMixin
+    # ------------------------------------------------------------------
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Adiciona documentos (erro se algum ID já existir, como o `InMemoryDocstore`)."""
+        if not texts:
+            return
+        with self._lock:
+            self._ensure_writable()
+            ids = list(texts)
+            existing = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                existing.update(row[0] for row in self.conn.execute(
+                    f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            if existing:
+                raise ValueError(f"Tried to add ids that already exist: {existing}")
+            with self.conn:
+                rows = []
+                for doc_id, doc in texts.items():
+                    shared, extra = self._encode(doc.metadata)
+                    rows.append((doc_id, doc.page_content, shared, extra))
+                self.conn.executemany("INSERT INTO documents (id, content, shared, extra) VALUES (?, ?, ?, ?)", rows)
+
+    def delete(self, ids: List) -> None:
+        """Remove documentos pelo ID."""
+        with self._lock:
+            self._ensure_writable()
+            found = set()
+            for i in range(0, len(ids), 500):
+                chunk = list(ids[i:i + 500])
+                found.update(row[0] for row in self.conn.execute(
+                    f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            missing = set(ids) - found
+            if missing:
+                raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+            with self.conn:
+                self.conn.executemany("DELETE FROM documents WHERE id = ?", [(i,) for i in ids])
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Lê um documento do disco (texto + metadados decodificados)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content, shared, extra FROM documents WHERE id = ?", (search,)).fetchone()
+            if row is None:
+                return f"ID {search} not found."
+            return Document(id=search, page_content=row[0], metadata=self._decode(row[1], row[2]))
+
+    def mget(self, ids: Iterable[str]) -> List[Optional[Document]]:
+        """Lê vários documentos em uma consulta (None para IDs ausentes), na ordem dos IDs."""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = {
+                doc_id: (content, shared, extra)
+                for doc_id, content, shared, extra in self.conn.execute(
+                    f"SELECT id, content, shared, extra FROM documents WHERE id IN ({','.join('?' * len(ids))})", ids)
+            }
+            return [
+                Document(id=i, page_content=rows[i][0], metadata=self._decode(rows[i][1], rows[i][2]))
+                if i in rows else None
+                for i in ids
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Persistência do FAISS
+    # ------------------------------------------------------------------
+
+    def write_positions(self, index_to_docstore_id: Dict[int, str]) -> None:
+        """Grava o `index_to_docstore_id` do FAISS (substitui o anterior)."""
+        with self._lock:
+            self._ensure_writable()
+            with self.conn:
+                self.conn.execute("DELETE FROM positions")
+                self.conn.executemany("INSERT INTO positions (position, doc_id) VALUES (?, ?)",
+                                      sorted(index_to_docstore_id.items()))
+
+    def read_positions(self) -> Dict[int, str]:
+        """Lê o `index_to_docstore_id` gravado por `write_positions`."""
+        with self._lock:
+            return dict(self.conn.execute("SELECT position, doc_id FROM positions"))
+
+    def set_meta(self, values: Dict[str, Any]) -> None:
+        with self._lock:
+            self._ensure_writable()
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                      [(k, _dumps(v)) for k, v in values.items()])
+
+    def get_meta(self) -> Dict[str, Any]:
+        with self._lock:
+            return {k: json.loads(v) for k, v in self.conn.execute("SELECT key, value FROM meta")}
+
+    def stats(self) -> Dict[str, Any]:
+        """Documentos, valores distintos no dicionário e tamanho do arquivo."""
+        with self._lock:
+            documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            values = self.conn.execute("SELECT COUNT(*) FROM metadata_values").fetchone()[0]
+        return {
+            'documents': documents,
+            'metadata_values': values,
+            'cached_values': len(self._values),
+            'file_bytes': os.path.getsize(self.path) if self.path != ":memory:" else 0,
+        }
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def docstore_path(folder_path: Union[str, Path], index_name: str = "index") -> Path:
+    """Caminho do arquivo SQLite do docstore dentro da pasta do índice."""
+    return Path(folder_path) / f"{index_name}{DOCSTORE_SUFFIX}"
+
+
+def _file_sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _index_matches(docstore: SQLiteDocstore, index_path: Path) -> bool:
+    expected = docstore.get_meta().get('index_sha256')
+    return expected is not None and index_path.exists() and _file_sha256(index_path) == expected
+
+
+def docstore_matches_index(folder_path: Union[str, Path], index_name: str = "index") -> bool:
+    """
+    Verifica se o `index.docstore.sqlite` foi salvo junto com o `index.faiss` atual.
+
+    Falso se não houver docstore em SQLite ou se o `index.faiss` tiver sido
+    regravado depois (ex: `save_local` simples, que só atualiza o `index.pkl`).
+    """
+    path = docstore_path(folder_path, index_name)
+    if not path.exists():
+        return False
+    docstore = SQLiteDocstore(path, read_only=True)
+    try:
+        return _index_matches(docstore, Path(folder_path) / f"{index_name}.faiss")
+    finally:
+        docstore.close()
+
+
+def save_local_sqlite(
+    vectorstore: FAISS,
+    folder_path: Union[str, Path],
+    index_name: str = "index",
+    batch_size: int = 1000,
+) -> Path:
+    """
+    Salva o índice FAISS + docstore em SQLite (substitui o `save_local`).
+
+    Os arquivos são escritos em temporários e trocados com `os.replace`:
+    um processo com o índice anterior aberto continua lendo a versão antiga
+    até recarregar (ex: `RetrieverService`; no Windows a troca falha
+    enquanto outro processo mantiver o arquivo aberto). As duas trocas não
+    são atômicas como par: entre elas (ou se o processo cair no meio) a
+    pasta tem o docstore novo e o `index.faiss` antigo. O SHA-256 gravado no
+    docstore detecta isso e `load_local_sqlite` recusa o par até um novo
+    save; para uma troca atômica, use o diretório versionado do
+    `utils_incremental_index`.
+
+    Args:
+        vectorstore: Vectorstore FAISS (com `InMemoryDocstore` ou `SQLiteDocstore`)
+        folder_path: Pasta de destino
+        index_name: Prefixo dos arquivos
+        batch_size: Documentos por transação na conversão
+
+    Returns:
+        Caminho do arquivo do docstore
+    """
+    folder = Path(folder_path)
+    folder.mkdir(parents=True, exist_ok=True)
+    target = docstore_path(folder, index_name)
+    tmp_target = target.with_name(target.name + ".tmp")
+    tmp_target.unlink(missing_ok=True)
+
+    source = vectorstore.docstore
+    if isinstance(source, SQLiteDocstore):
+        with source._lock:
+            dest = sqlite3.connect(str(tmp_target))
+            source.conn.backup(dest)
+            dest.close()
+        store = SQLiteDocstore(tmp_target, inline_keys=source.inline_keys,
+                               max_intern_length=source.max_intern_length)
+    else:
+        store = SQLiteDocstore(tmp_target)
+        ids = [doc_id for _, doc_id in sorted(vectorstore.index_to_docstore_id.items())]
+        for i in range(0, len(ids), batch_size):
+            store.add({doc_id: source.search(doc_id) for doc_id in ids[i:i + batch_size]})
+
+    index_path = folder / f"{index_name}.faiss"
+    tmp_index = index_path.with_name(index_path.name + ".tmp")
+    faiss.write_index(vectorstore.index, str(tmp_index))
+
+    store.write_positions(vectorstore.index_to_docstore_id)
+    store.set_meta({
+        'distance_strategy': vectorstore.distance_strategy.value,
+        'normalize_L2': vectorstore._normalize_L2,
+        'index_sha256': _file_sha256(tmp_index),
+    })
+    store.close()
+
+    # O Windows não troca um arquivo aberto: se o próprio vectorstore lê o
+    # destino (carregado com `load_local_sqlite` e salvo na mesma pasta),
+    # a conexão é fechada antes da troca e reaberta no arquivo novo, que é
+    # uma cópia dele com as posições e o hash atualizados.
+    reopen = (isinstance(source, SQLiteDocstore) and source.read_only
+              and Path(source.path).resolve() == target.resolve())
+    if reopen:
+        with source._lock:
+            source.conn.close()
+            try:
+                os.replace(tmp_target, target)
+            finally:
+                source._connect()
+    else:
+        os.replace(tmp_target, target)
+    os.replace(tmp_index, index_path)
+    return target
+
+
+def load_local_sqlite(
+    folder_path: Union[str, Path],
+    embeddings: Embeddings,
+    index_name: str = "index",
+    cls=FAISS,
+    **kwargs: Any,
+) -> FAISS:
+    """
+    Carrega um índice salvo com `save_local_sqlite`.
+
+    Só o índice FAISS e o mapa posição → ID vão para a memória; textos e
+    metadados são lidos do SQLite quando uma busca os devolve.
+
+    Args:
+        folder_path: Pasta do índice
+        embeddings: Modelo de embeddings
+        index_name: Prefixo dos arquivos
+        cls: Classe do vectorstore (ex: `ApproximateFAISS`)
+        **kwargs: Repassados ao construtor (sobrescrevem os valores salvos)
+
+    Returns:
+        Vectorstore com `SQLiteDocstore`
+
+    Raises:
+        ValueError: Se o `index.faiss` não for o salvo junto com o docstore
+    """
+    path = docstore_path(folder_path, index_name)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    docstore = SQLiteDocstore(path, read_only=True)
+    index_path = Path(folder_path) / f"{index_name}.faiss"
+    if not _index_matches(docstore, index_path):
+        docstore.close()
+        raise ValueError(f"{path.name} não corresponde ao {index_path.name} (salvo depois com save_local?)")
+    meta = docstore.get_meta()
+    if 'distance_strategy' in meta:
+        kwargs.setdefault('distance_strategy', DistanceStrategy(meta['distance_strategy']))
+    if 'normalize_L2' in meta:
+        kwargs.setdefault('normalize_L2', meta['normalize_L2'])
+    index = faiss.read_index(str(index_path))
+    return cls(embeddings, index, docstore, docstore.read_positions(), **kwargs)
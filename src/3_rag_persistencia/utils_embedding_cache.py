@@ -0,0 +1,232 @@
+"""
+Cache persistente de embeddings endereçado por conteúdo.
+
+Este módulo evita re-embedar chunks que não mudaram entre execuções:
+- Chave = (nome do modelo, hash SHA-256 do conteúdo)
+- Armazenamento em SQLite (um único arquivo, sem servidor)
+- Apenas os "misses" são enviados ao modelo (ex: Ollama)
+- Limite de tamanho com despejo LRU e contadores de hit/miss
+
+Uso típico no pipeline do lab 3.6:
+
+    embeddings = CachedEmbeddings(
+        OllamaEmbeddings(model=EMBEDDING_MODEL, base_url=OLLAMA_BASE_URL),
+        cache_path=CACHE_DIR / "embeddings.sqlite",
+    )
+    vectorstore = FAISS.from_documents(enriched_chunks, embeddings)
+    print(embeddings.stats())
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash SHA-256 apenas do conteúdo (mesma regra de `generate_content_hash`).
+
+    Args:
+        text: Texto do chunk
+
+    Returns:
+        Hash SHA-256 de 64 caracteres
+    """
+    return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envolve qualquer `Embeddings` do LangChain com um cache em disco.
+
+    Os vetores são guardados como float32 em um SQLite indexado por
+    (modelo, content_hash). Quando o número de entradas passa de
+    `max_entries`, as menos acessadas recentemente são removidas.
+
+    Queries (`embed_query`) não passam pelo cache: alguns modelos usam
+    prompts diferentes para query e documento.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache_path: Union[str, Path],
+        model_name: Optional[str] = None,
+        max_entries: int = 1_000_000,
+    ):
+        """
+        Args:
+            embeddings: Modelo de embeddings original (ex: OllamaEmbeddings)
+            cache_path: Caminho do arquivo SQLite do cache
+            model_name: Nome do modelo usado na chave. Se None, usa
+                        `embeddings.model` (ou o nome da classe)
+            max_entries: Número máximo de vetores mantidos no cache
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries deve ser positivo")
+
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, 'model', None) or type(embeddings).__name__
+        self.max_entries = max_entries
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, content_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Interface Embeddings
+    # ------------------------------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Retorna os embeddings dos textos, consultando o cache primeiro.
+
+        Textos repetidos dentro do mesmo lote são embedados uma única vez.
+        """
+        if not texts:
+            return []
+
+        hashes = [content_hash(t) for t in texts]
+        cached = self._lookup(set(hashes))
+
+        # Textos únicos que precisam ir ao modelo (preserva a ordem)
+        missing: Dict[str, str] = {}
+        for text, h in zip(texts, hashes):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        with self._lock:
+            self.hits += sum(1 for h in hashes if h in cached)
+            self.misses += sum(1 for h in hashes if h not in cached)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [list(cached[h]) for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Delega diretamente ao modelo original (sem cache)."""
+        return self.embeddings.embed_query(text)
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _lookup(self, hashes: set) -> Dict[str, List[float]]:
+        """Busca vetores no cache e atualiza o `last_access` dos encontrados."""
+        found: Dict[str, List[float]] = {}
+        if not hashes:
+            return found
+
+        keys = list(hashes)
+        now = time.time()
+        with self._lock:
+            # SQLite limita o número de parâmetros por consulta
+            for start in range(0, len(keys), 500):
+                block = keys[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    [self.model_name, *block],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND content_hash = ?",
+                    [(now, self.model_name, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """Grava novos vetores e aplica o limite de tamanho (LRU)."""
+        now = time.time()
+        rows = []
+        for h, vector in vectors.items():
+            arr = np.asarray(vector, dtype=np.float32)
+            rows.append((self.model_name, h, arr.shape[0], arr.tobytes(), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excess = total - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, Union[int, float, str]]:
+        """
+        Retorna estatísticas do cache.
+
+        Returns:
+            Dicionário com hits, misses, hit_rate, evictions e entradas
+        """
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self) -> None:
+        """Remove todos os vetores do modelo atual e zera os contadores."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings WHERE model = ?", (self.model_name,))
+            self._conn.commit()
+        self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        """Fecha a conexão com o SQLite."""
+        with self._lock:
+            self._conn.close()
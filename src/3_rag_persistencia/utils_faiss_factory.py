@@ -0,0 +1,315 @@
+"""
+Índices FAISS aproximados (HNSW / IVF / IVF+PQ) no fluxo do LangChain.
+
+`FAISS.from_texts` / `FAISS.from_documents` sempre criam um `IndexFlatL2`:
+cada busca compara a query com TODOS os vetores. `ApproximateFAISS` é um
+substituto direto que aceita uma string do `faiss.index_factory` ou um
+preset:
+
+| Preset    | Factory          | Parâmetro de busca padrão |
+|-----------|------------------|---------------------------|
+| `flat`    | `Flat`           | —                         |
+| `hnsw32`  | `HNSW32,Flat`    | efSearch=64               |
+| `ivf4096` | `IVF4096,Flat`   | nprobe=32                 |
+| `ivf_pq`  | `IVF4096,PQ32`   | nprobe=32                 |
+| `auto`    | escolhido pelo tamanho do corpus                   |
+
+- Índices que precisam de treino (IVF, PQ) são treinados em uma amostra
+- Os parâmetros de busca (`nprobe`, `efSearch`) são salvos ao lado do
+  índice (`index.params.json`) e podem ser sobrescritos por consulta
+- Continua compatível com `save_local` / `load_local` / `as_retriever`
+
+Uso:
+
+    vectorstore = ApproximateFAISS.from_documents(chunks, embeddings, index_factory='hnsw32')
+    vectorstore.similarity_search("pergunta", k=4, efSearch=128)
+    retriever = vectorstore.as_retriever(search_kwargs={'k': 4, 'efSearch': 128})
+"""
+
+import json
+import logging
+import math
+import operator
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+PRESETS: Dict[str, Tuple[str, Dict[str, int]]] = {
+    'flat': ('Flat', {}),
+    'hnsw32': ('HNSW32,Flat', {'efSearch': 64}),
+    'ivf4096': ('IVF4096,Flat', {'nprobe': 32}),
+    'ivf_pq': ('IVF4096,PQ32', {'nprobe': 32}),
+}
+
+SEARCH_PARAMS = ('nprobe', 'efSearch')
+
+PARAMS_SUFFIX = ".params.json"
+
+# Pontos de treino por centróide recomendados pelo FAISS
+MIN_POINTS_PER_CENTROID = 39
+
+
+def resolve_factory(spec: str, n: int, dim: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+    """
+    Converte um preset (ou string do index_factory) em (factory, parâmetros).
+
+    Nos presets IVF, `nlist` (e os bits do PQ) são reduzidos quando o corpus
+    é pequeno demais para o treino; o número de subvetores do PQ é ajustado
+    para dividir a dimensão. Strings explícitas não são alteradas.
+
+    Args:
+        spec: Nome do preset, 'auto' ou string do `faiss.index_factory`
+        n: Número de vetores do corpus
+        dim: Dimensão dos vetores (usada pelo preset 'ivf_pq')
+    """
+    key = spec.lower()
+    if key == 'auto':
+        if n < 50_000:
+            key = 'flat'
+        elif n < 1_000_000:
+            key = 'hnsw32'
+        else:
+            return f"IVF{int(4 * math.sqrt(n))},Flat", {'nprobe': 32}
+
+    if key not in PRESETS:
+        return spec, {}
+
+    factory, params = PRESETS[key]
+    params = dict(params)
+    if factory.startswith('IVF'):
+        coarse, fine = factory.split(',')
+        nlist = min(int(coarse[3:]), max(1, n // MIN_POINTS_PER_CENTROID))
+        params['nprobe'] = min(params['nprobe'], nlist)
+        if fine.startswith('PQ'):
+            m = int(fine[2:])
+            if dim is not None:
+                m = max(c for c in range(1, m + 1) if dim % c == 0)
+            nbits = max(1, min(8, int(math.log2(max(2, n // MIN_POINTS_PER_CENTROID)))))
+            fine = f"PQ{m}x{nbits}" if nbits != 8 else f"PQ{m}"
+        resolved = f"IVF{nlist},{fine}"
+        if resolved != factory:
+            logger.warning("Corpus de %d vetores: preset %s ajustado para %s", n, factory, resolved)
+        factory = resolved
+    return factory, params
+
+
+def make_search_parameters(index, overrides: Dict[str, int], sel=None):
+    """
+    Cria o `faiss.SearchParameters` adequado ao tipo de índice.
+
+    Passar os parâmetros na chamada (em vez de alterar o índice) permite
+    valores diferentes por consulta sem afetar outras threads.
+
+    Returns:
+        SearchParameters ou None quando não há nada a sobrescrever
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        inner = make_search_parameters(index.index, overrides, sel)
+        return faiss.SearchParametersPreTransform(index_params=inner) if inner is not None else None
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = overrides.get('efSearch', index.hnsw.efSearch)
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = overrides.get('nprobe', index.nprobe)
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def apply_search_params(index, params: Dict[str, int]) -> None:
+    """Grava os parâmetros de busca padrão no próprio índice."""
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        space.set_index_parameter(index, name, value)
+
+
+class ApproximateFAISS(FAISS):
+    """
+    `FAISS` do LangChain com índice configurável pelo `faiss.index_factory`.
+    """
+
+    def __init__(self, *args, index_factory: str = 'Flat', search_params: Optional[Dict[str, int]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index_factory = index_factory
+        self.search_params = dict(search_params or {})
+        if self.search_params:
+            apply_search_params(self.index, self.search_params)
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_embeddings(
+        cls,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        embedding: Embeddings,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[List[str]] = None,
+        index_factory: str = 'hnsw32',
+        search_params: Optional[Dict[str, int]] = None,
+        train_size: int = 100_000,
+        seed: int = 42,
+        **kwargs: Any,
+    ) -> 'ApproximateFAISS':
+        """
+        Constrói o índice a partir de pares (texto, embedding) já calculados.
+
+        Args:
+            text_embeddings: Pares (texto, vetor)
+            embedding: Modelo usado nas consultas
+            metadatas: Metadados por texto
+            ids: Ids do docstore (ex: `chunk_id`)
+            index_factory: Preset ('flat', 'hnsw32', 'ivf4096', 'ivf_pq', 'auto')
+                ou string do `faiss.index_factory`
+            search_params: Parâmetros de busca padrão (sobrescrevem os do preset)
+            train_size: Máximo de vetores usados no treino (IVF/PQ)
+            seed: Semente da amostra de treino
+            **kwargs: Repassados ao construtor (`distance_strategy`, `normalize_L2`)
+        """
+        text_embeddings = list(text_embeddings)
+        vectors = np.array([e for _, e in text_embeddings], dtype=np.float32)
+        n, d = vectors.shape
+
+        factory, params = resolve_factory(index_factory, n, d)
+        params.update(search_params or {})
+
+        distance_strategy = kwargs.get('distance_strategy', DistanceStrategy.EUCLIDEAN_DISTANCE)
+        metric = faiss.METRIC_INNER_PRODUCT if distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT else faiss.METRIC_L2
+        index = faiss.index_factory(d, factory, metric)
+
+        if not index.is_trained:
+            if kwargs.get('normalize_L2'):
+                faiss.normalize_L2(vectors)
+            sample = vectors
+            if n > train_size:
+                rng = np.random.default_rng(seed)
+                sample = vectors[np.sort(rng.choice(n, train_size, replace=False))]
+            index.train(sample)
+
+        store = cls(
+            embedding, index, InMemoryDocstore(), {},
+            index_factory=factory, search_params=params, **kwargs,
+        )
+        store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> 'ApproximateFAISS':
+        """Embeda os textos e constrói o índice (também usado por `from_documents`)."""
+        vectors = embedding.embed_documents(texts)
+        return cls.from_embeddings(list(zip(texts, vectors)), embedding, metadatas=metadatas, ids=ids, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _search_index(self, vector: np.ndarray, n: int, overrides: Dict[str, int], sel=None):
+        params = make_search_parameters(self.index, overrides, sel)
+        if params is None:
+            return self.index.search(vector, n)
+        return self.index.search(vector, n, params=params)
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Igual ao `FAISS`, aceitando `nprobe` / `efSearch` por consulta.
+
+        Exemplo: `similarity_search("pergunta", k=4, nprobe=64)`
+        """
+        overrides = {name: kwargs.pop(name) for name in SEARCH_PARAMS if name in kwargs}
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        scores, indices = self._search_index(vector, k if filter is None else fetch_k, overrides)
+        return self._collect_docs(scores[0], indices[0], k, filter, **kwargs)
+
+    def _collect_docs(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        k: int,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Converte posições do índice em documentos (filtro e score_threshold do LangChain)."""
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        docs = []
+        for score, i in zip(scores, indices):
+            if i == -1:
+                continue
+            doc = self.docstore.search(self.index_to_docstore_id[i])
+            if not isinstance(doc, Document):
+                raise ValueError(f"Documento não encontrado para o id {self.index_to_docstore_id[i]}")
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, score))
+
+        score_threshold = kwargs.get('score_threshold')
+        if score_threshold is not None:
+            cmp = operator.ge if self.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT else operator.le
+            docs = [(doc, s) for doc, s in docs if cmp(s, score_threshold)]
+        return docs[:k]
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        """Salva o índice (como o `FAISS`) e os parâmetros em `<index_name>.params.json`."""
+        super().save_local(folder_path, index_name)
+        (Path(folder_path) / f"{index_name}{PARAMS_SUFFIX}").write_text(json.dumps({
+            'index_factory': self.index_factory,
+            'search_params': self.search_params,
+            'distance_strategy': self.distance_strategy.value,
+            'normalize_L2': self._normalize_L2,
+        }, indent=2))
+
+    @classmethod
+    def load_local(
+        cls,
+        folder_path: str,
+        embeddings: Embeddings,
+        index_name: str = "index",
+        **kwargs: Any,
+    ) -> 'ApproximateFAISS':
+        """
+        Carrega um índice salvo com `save_local` e reaplica os parâmetros.
+
+        Também abre índices salvos pelo `FAISS` comum (sem o arquivo de parâmetros).
+        """
+        params_path = Path(folder_path) / f"{index_name}{PARAMS_SUFFIX}"
+        if params_path.exists():
+            saved = json.loads(params_path.read_text())
+            kwargs.setdefault('index_factory', saved['index_factory'])
+            kwargs.setdefault('search_params', saved['search_params'])
+            kwargs.setdefault('distance_strategy', DistanceStrategy(saved['distance_strategy']))
+            kwargs.setdefault('normalize_L2', saved['normalize_L2'])
+        return super().load_local(folder_path, embeddings, index_name, **kwargs)
@@ -0,0 +1,310 @@
+"""
+Índice léxico (BM25) e busca híbrida com Reciprocal Rank Fusion.
+
+Consultas reais trazem tokens exatos que embeddings representam mal:
+modelos ("A17 Pro"), códigos HTTP ("422"), anos ("2023"), SKUs. Toda
+consulta hoje paga uma chamada de embedding ao Ollama e uma busca densa.
+
+Este módulo oferece:
+
+- `BM25Index`: índice invertido compacto (listas de postings em `array`),
+  alimentado pelos mesmos chunks da ingestão
+- `reciprocal_rank_fusion`: combina rankings (léxico + denso) pela posição,
+  sem precisar calibrar scores de naturezas diferentes
+- `HybridRetriever`: retriever do LangChain que faz BM25 + denso + RRF e,
+  para consultas que são claramente identificadores, usa só o BM25
+  (caminho rápido, sem chamada de embedding)
+"""
+
+import math
+import pickle
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field, PrivateAttr
+
+# Palavras, números e identificadores com pontuação interna (v1.2, SKU-123, 4.422)
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/]\w+)*")
+
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das em no na nos nas por para com sem "
+    "e ou que se ao aos à às é são foi ser como mais mas qual quais quem onde quando "
+    "the of and to in is for on with".split()
+)
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenização simples para BM25: minúsculas, sem acentos, sem stopwords.
+
+    Identificadores com pontuação interna são mantidos inteiros e também
+    quebrados nas partes ("4.422" → "4.422", "4", "422").
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall(_strip_accents(text.lower())):
+        if match in STOPWORDS:
+            continue
+        tokens.append(match)
+        if not match.isalnum():
+            tokens.extend(p for p in re.split(r"[.\-/]", match) if p and p not in STOPWORDS)
+    return tokens
+
+
+_YEAR_RE = re.compile(r"(?:19|20)\d\d")
+
+
+def _is_identifier_token(token: str) -> bool:
+    """Token com cara de código: letras + dígitos (a17, sku-17), pontuação
+    interna com dígitos (4.422) ou número de 3+ dígitos que não é um ano (422)."""
+    if not any(c.isdigit() for c in token):
+        return False
+    if any(c.isalpha() for c in token) or not token.isdigit():
+        return True
+    return len(token) >= 3 and not _YEAR_RE.fullmatch(token)
+
+
+def is_identifier_query(query: str, max_tokens: int = 4) -> bool:
+    """
+    Detecta consultas que são buscas por identificador.
+
+    Exemplos: "A17 Pro", "erro 422", "SKU-1234", '"Real Metrópolis"'.
+    Regra: texto entre aspas, consulta curta com algum token com cara de
+    código (ver `_is_identifier_token`) ou consulta só de números. Anos em
+    perguntas ("Como foi o campeonato de 2023?") não contam.
+    """
+    if re.search(r'"[^"]+"', query):
+        return True
+    tokens = tokenize(query)
+    if not tokens or len(tokens) > max_tokens:
+        return False
+    return any(_is_identifier_token(t) for t in tokens) or all(t.isdigit() for t in tokens)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 em memória.
+
+    Cada termo guarda duas `array`s (ids internos e frequências), então o
+    custo é de ~8 bytes por ocorrência de termo por documento.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, tokenizer: Callable[[str], List[str]] = tokenize):
+        """
+        Args:
+            k1: Saturação da frequência do termo
+            b: Normalização pelo tamanho do documento
+            tokenizer: Função de tokenização
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths = array('I')
+        self._total_length = 0
+        self.documents: List[Document] = []
+        self.ids: List[str] = []
+        self._id_set = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def add_documents(self, documents: Iterable[Document], ids: Optional[Sequence[str]] = None) -> int:
+        """
+        Indexa documentos (ignora ids já indexados).
+
+        Args:
+            documents: Chunks a indexar
+            ids: Ids dos chunks (padrão: `metadata['chunk_id']`, se houver)
+
+        Returns:
+            Número de documentos adicionados
+        """
+        documents = list(documents)
+        if ids is None:
+            ids = [d.metadata.get('chunk_id') or f"doc-{len(self) + i}" for i, d in enumerate(documents)]
+
+        added = 0
+        with self._lock:
+            for doc, doc_id in zip(documents, ids):
+                if doc_id in self._id_set:
+                    continue
+                internal_id = len(self.documents)
+                counts = Counter(self.tokenizer(doc.page_content))
+                for term, tf in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array('I'), array('I'))
+                    postings[0].append(internal_id)
+                    postings[1].append(tf)
+                length = sum(counts.values())
+                self._doc_lengths.append(length)
+                self._total_length += length
+                self.documents.append(doc)
+                self.ids.append(doc_id)
+                self._id_set.add(doc_id)
+                added += 1
+        return added
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """
+        Retorna os k documentos com maior score BM25 (score > 0).
+
+        Args:
+            query: Consulta em linguagem natural ou identificador
+            k: Número de resultados
+
+        Returns:
+            Lista [(documento, score)] do maior para o menor score
+        """
+        n = len(self.documents)
+        terms = set(self.tokenizer(query))
+        if n == 0 or not terms:
+            return []
+
+        # As views numpy bloqueiam o redimensionamento das arrays: o lock
+        # impede que add_documents rode enquanto elas existem
+        with self._lock:
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+            avg_length = self._total_length / n
+            scores = np.zeros(n, dtype=np.float32)
+            doc_ids = tfs = None
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                doc_ids = np.frombuffer(postings[0], dtype=np.uint32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float32)
+                df = len(doc_ids)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / avg_length)
+                scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            del lengths, doc_ids, tfs
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self.documents[i], float(scores[i])) for i in candidates]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Salva o índice em um arquivo pickle (mesmo formato de confiança do `save_local`)."""
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'k1': self.k1, 'b': self.b, 'postings': self._postings,
+                'doc_lengths': self._doc_lengths, 'documents': self.documents, 'ids': self.ids,
+            }, f)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], tokenizer: Callable[[str], List[str]] = tokenize) -> 'BM25Index':
+        """Carrega um índice salvo com `save` (apenas arquivos confiáveis)."""
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        index = cls(data['k1'], data['b'], tokenizer)
+        index._postings = data['postings']
+        index._doc_lengths = data['doc_lengths']
+        index._total_length = sum(data['doc_lengths'])
+        index.documents = data['documents']
+        index.ids = data['ids']
+        index._id_set = set(index.ids)
+        return index
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.metadata.get('chunk_id') or doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Document]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+    key: Callable[[Document], str] = _doc_key,
+) -> List[Tuple[Document, float]]:
+    """
+    Combina rankings pela fórmula RRF: score(d) = Σ wᵢ / (k + posiçãoᵢ(d)).
+
+    Args:
+        rankings: Listas de documentos, cada uma já ordenada
+        k: Constante de suavização (60 é o valor do artigo original)
+        weights: Peso de cada ranking (padrão: 1.0)
+        key: Identidade de um documento entre rankings (padrão: chunk_id)
+
+    Returns:
+        [(documento, score_rrf)] do maior para o menor score
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for position, doc in enumerate(ranking, start=1):
+            doc_key = key(doc)
+            scores[doc_key] = scores.get(doc_key, 0.0) + weight / (k + position)
+            docs.setdefault(doc_key, doc)
+    ordered = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [(docs[doc_key], score) for doc_key, score in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever híbrido: BM25 + busca densa, fundidos por RRF.
+
+    Consultas de identificador (ver `is_identifier_query`) com resultado
+    léxico não vazio retornam apenas o BM25, sem embedar a consulta.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    lexical_index: BM25Index
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    weights: Tuple[float, float] = (1.0, 1.0)
+    lexical_fast_path: bool = True
+    search_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    stats: Dict[str, int] = Field(default_factory=lambda: {'lexical_only': 0, 'hybrid': 0})
+    _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Executa a busca e retorna [(documento, score)].
+
+        No caminho rápido o score é o BM25; no híbrido, o score RRF.
+        """
+        k = k or self.k
+        lexical = self.lexical_index.search(query, self.fetch_k)
+
+        if self.lexical_fast_path and lexical and is_identifier_query(query):
+            with self._stats_lock:
+                self.stats['lexical_only'] += 1
+            return lexical[:k]
+
+        with self._stats_lock:
+            self.stats['hybrid'] += 1
+        dense = self.vectorstore.similarity_search(query, k=self.fetch_k, **self.search_kwargs)
+        fused = reciprocal_rank_fusion(
+            [[doc for doc, _ in lexical], dense], k=self.rrf_k, weights=self.weights,
+        )
+        return fused[:k]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [doc for doc, _ in self.search(query)]
@@ -0,0 +1,396 @@
+"""
+Manutenção incremental de um índice FAISS por `chunk_id`.
+
+Em vez de reconstruir o índice inteiro a cada execução, este módulo:
+- Mantém um manifesto de ingestão: arquivo → hash do arquivo → chunk_ids
+- Embeda apenas os chunks novos (chunk_ids ainda não indexados)
+- Marca chunks de arquivos alterados/removidos com "tombstones"
+- Remove fisicamente os tombstones em lote (compactação periódica)
+- Salva cada versão com `save_local` de forma atômica (diretório
+  versionado + ponteiro `CURRENT`)
+
+Estrutura em disco:
+
+    index_dir/
+    ├── CURRENT            # Nome da versão ativa (ex: v000003)
+    ├── v000002/           # Versão anterior (mantida para rollback)
+    └── v000003/
+        ├── index.faiss
+        ├── index.pkl
+        └── state.json     # Manifesto + tombstones
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+CURRENT_FILE = "CURRENT"
+STATE_FILE = "state.json"
+
+
+def file_hash(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """
+    Calcula o SHA-256 do conteúdo binário de um arquivo.
+
+    Args:
+        path: Caminho do arquivo
+        block_size: Tamanho do bloco de leitura em bytes
+
+    Returns:
+        Hash SHA-256 de 64 caracteres
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Escreve um arquivo de texto de forma atômica (tmp + rename)."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(content, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def read_current_version(index_dir: Union[str, Path]) -> Optional[Path]:
+    """
+    Retorna o diretório da versão ativa do índice, ou None se não existir.
+
+    Args:
+        index_dir: Diretório raiz do índice versionado
+    """
+    pointer = Path(index_dir) / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    return Path(index_dir) / pointer.read_text(encoding='utf-8').strip()
+
+
+class IncrementalFAISSIndex:
+    """
+    Índice FAISS com add/update/delete por `chunk_id`.
+
+    O `chunk_id` (SHA-256 de conteúdo + source + page, gerado por
+    `enrich_chunk_metadata`) é usado como id do docstore. Assim, páginas
+    inalteradas de um PDF modificado mantêm seus ids e não são re-embedadas.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index_dir: Union[str, Path],
+        compaction_ratio: float = 0.2,
+        keep_versions: int = 2,
+    ):
+        """
+        Args:
+            embeddings: Modelo de embeddings (ex: OllamaEmbeddings)
+            index_dir: Diretório raiz do índice versionado
+            compaction_ratio: Fração de tombstones que dispara a compactação
+            keep_versions: Quantas versões salvas manter em disco
+        """
+        self.embeddings = embeddings
+        self.index_dir = Path(index_dir)
+        self.compaction_ratio = compaction_ratio
+        self.keep_versions = max(1, keep_versions)
+
+        self.vectorstore: Optional[FAISS] = None
+        self.manifest: Dict[str, Dict[str, object]] = {}
+        self.tombstones: Set[str] = set()
+        self.version = 0
+
+        current = read_current_version(self.index_dir)
+        if current is not None and current.exists():
+            self._load(current)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _load(self, version_dir: Path) -> None:
+        # Versão vazia (todos os arquivos removidos): só há o state.json
+        self.vectorstore = None
+        if (version_dir / "index.faiss").exists():
+            self.vectorstore = FAISS.load_local(
+                str(version_dir),
+                self.embeddings,
+                allow_dangerous_deserialization=True,
+            )
+        state = json.loads((version_dir / STATE_FILE).read_text(encoding='utf-8'))
+        self.manifest = state['manifest']
+        self.tombstones = set(state['tombstones'])
+        self.version = state['version']
+
+    def save(self) -> Path:
+        """
+        Salva uma nova versão do índice de forma atômica.
+
+        A versão é escrita em um diretório temporário e só depois o ponteiro
+        `CURRENT` é trocado (os.replace), então leitores nunca veem um índice
+        pela metade.
+
+        Um índice vazio (todos os chunks removidos) também é salvo, só com o
+        `state.json`; caso contrário a versão anterior voltaria no próximo load.
+
+        Returns:
+            Diretório da versão salva
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        version = self.version + 1
+        # Pula nomes já usados (ex: versão órfã de uma execução interrompida)
+        while (self.index_dir / f"v{version:06d}").exists():
+            version += 1
+        name = f"v{version:06d}"
+        tmp_dir = self.index_dir / f".tmp-{name}"
+        final_dir = self.index_dir / name
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if self.vectorstore is not None:
+            self.vectorstore.save_local(str(tmp_dir))
+        else:
+            tmp_dir.mkdir()
+        state = {
+            'version': version,
+            'manifest': self.manifest,
+            'tombstones': sorted(self.tombstones),
+        }
+        (tmp_dir / STATE_FILE).write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+
+        os.replace(tmp_dir, final_dir)
+        _write_atomic(self.index_dir / CURRENT_FILE, name)
+        self.version = version
+        self._prune_versions()
+        return final_dir
+
+    def _prune_versions(self) -> None:
+        versions = sorted(p for p in self.index_dir.glob("v*") if p.is_dir())
+        for old in versions[:-self.keep_versions]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Operações por chunk
+    # ------------------------------------------------------------------
+
+    @property
+    def indexed_ids(self) -> Set[str]:
+        """Ids presentes fisicamente no índice (inclui tombstones)."""
+        if self.vectorstore is None:
+            return set()
+        return set(self.vectorstore.index_to_docstore_id.values())
+
+    @property
+    def live_count(self) -> int:
+        """Número de chunks visíveis na busca."""
+        return len(self.indexed_ids) - len(self.tombstones)
+
+    def add_documents(self, chunks: List[Document]) -> int:
+        """
+        Adiciona chunks ao índice, embedando apenas ids ainda não indexados.
+
+        Chunks cujo id estava marcado como tombstone voltam a ficar visíveis
+        sem novo embedding.
+
+        Args:
+            chunks: Chunks com `metadata['chunk_id']`
+
+        Returns:
+            Número de chunks efetivamente embedados
+        """
+        indexed = self.indexed_ids
+        new_chunks: Dict[str, Document] = {}
+        for chunk in chunks:
+            chunk_id = chunk.metadata['chunk_id']
+            if chunk_id in indexed:
+                self.tombstones.discard(chunk_id)
+            elif chunk_id not in new_chunks:
+                new_chunks[chunk_id] = chunk
+
+        if not new_chunks:
+            return 0
+
+        ids = list(new_chunks.keys())
+        docs = list(new_chunks.values())
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_documents(docs, self.embeddings, ids=ids)
+        else:
+            self.vectorstore.add_documents(docs, ids=ids)
+        return len(ids)
+
+    def delete(self, chunk_ids: Iterable[str]) -> int:
+        """
+        Marca chunks como removidos (tombstone) e compacta se necessário.
+
+        Args:
+            chunk_ids: Ids dos chunks a remover
+
+        Returns:
+            Número de novos tombstones
+        """
+        indexed = self.indexed_ids
+        before = len(self.tombstones)
+        self.tombstones.update(cid for cid in chunk_ids if cid in indexed)
+        added = len(self.tombstones) - before
+        self.maybe_compact()
+        return added
+
+    def maybe_compact(self) -> bool:
+        """Compacta quando a fração de tombstones passa de `compaction_ratio`."""
+        total = len(self.indexed_ids)
+        if total and len(self.tombstones) / total >= self.compaction_ratio:
+            self.compact()
+            return True
+        return False
+
+    def compact(self) -> int:
+        """
+        Remove fisicamente todos os tombstones em uma única operação.
+
+        Returns:
+            Número de vetores removidos
+        """
+        if self.vectorstore is None or not self.tombstones:
+            return 0
+        removed = len(self.tombstones)
+        if removed == len(self.indexed_ids):
+            # FAISS não aceita remover todos os vetores via wrapper: recomeça vazio
+            self.vectorstore = None
+        else:
+            self.vectorstore.delete(list(self.tombstones))
+        self.tombstones.clear()
+        return removed
+
+    # ------------------------------------------------------------------
+    # Operações por arquivo
+    # ------------------------------------------------------------------
+
+    def plan(self, paths: Iterable[Union[str, Path]]) -> Dict[str, List[str]]:
+        """
+        Compara os arquivos atuais com o manifesto.
+
+        Args:
+            paths: Arquivos presentes na pasta de origem
+
+        Returns:
+            Dicionário com listas 'added', 'changed', 'unchanged' e 'deleted'
+        """
+        plan = {'added': [], 'changed': [], 'unchanged': [], 'deleted': []}
+        seen = set()
+        for path in paths:
+            key = str(path)
+            seen.add(key)
+            entry = self.manifest.get(key)
+            if entry is None:
+                plan['added'].append(key)
+            elif entry['file_hash'] != file_hash(path):
+                plan['changed'].append(key)
+            else:
+                plan['unchanged'].append(key)
+        plan['deleted'] = [key for key in self.manifest if key not in seen]
+        return plan
+
+    def upsert_file(self, path: Union[str, Path], chunks: List[Document]) -> Dict[str, int]:
+        """
+        Substitui os chunks de um arquivo pelos chunks da versão atual.
+
+        Args:
+            path: Caminho do arquivo de origem
+            chunks: Chunks da versão atual do arquivo (com `chunk_id`)
+
+        Returns:
+            Contagem de chunks 'embedded', 'kept' e 'removed'
+        """
+        key = str(path)
+        new_ids = [c.metadata['chunk_id'] for c in chunks]
+        old_ids = set(self.manifest.get(key, {}).get('chunk_ids', []))
+        stale = old_ids - set(new_ids)
+
+        embedded = self.add_documents(chunks)
+        self.manifest[key] = {
+            'file_hash': file_hash(path),
+            'chunk_ids': list(dict.fromkeys(new_ids)),
+        }
+        removed = self.delete(stale)
+        return {'embedded': embedded, 'kept': len(set(new_ids)) - embedded, 'removed': removed}
+
+    def remove_file(self, path: Union[str, Path]) -> int:
+        """
+        Remove do índice todos os chunks de um arquivo.
+
+        Args:
+            path: Caminho do arquivo (como registrado no manifesto)
+
+        Returns:
+            Número de chunks marcados como removidos
+        """
+        entry = self.manifest.pop(str(path), None)
+        if entry is None:
+            return 0
+        return self.delete(entry['chunk_ids'])
+
+    def sync(
+        self,
+        paths: Iterable[Union[str, Path]],
+        load_chunks: Callable[[Path], List[Document]],
+        save: bool = True,
+    ) -> Dict[str, object]:
+        """
+        Sincroniza o índice com a pasta de origem.
+
+        Apenas arquivos novos ou alterados são carregados com `load_chunks`;
+        arquivos inalterados não são nem abertos.
+
+        Args:
+            paths: Arquivos presentes na pasta de origem
+            load_chunks: Função que carrega, divide e enriquece um arquivo
+            save: Se True, salva uma nova versão quando houver mudanças
+
+        Returns:
+            Resumo com o plano e as contagens de chunks
+        """
+        paths = [Path(p) for p in paths]
+        plan = self.plan(paths)
+        totals = {'embedded': 0, 'kept': 0, 'removed': 0}
+
+        for key in plan['added'] + plan['changed']:
+            stats = self.upsert_file(key, load_chunks(Path(key)))
+            for name, value in stats.items():
+                totals[name] += value
+
+        for key in plan['deleted']:
+            totals['removed'] += self.remove_file(key)
+
+        changed = bool(plan['added'] or plan['changed'] or plan['deleted'])
+        if save and changed:
+            self.save()
+
+        return {'plan': plan, **totals, 'tombstones': len(self.tombstones), 'version': self.version}
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[tuple]:
+        """
+        Busca por similaridade ignorando chunks com tombstone.
+
+        Busca `k + len(tombstones)` candidatos para garantir `k` resultados
+        válidos mesmo que todos os tombstones apareçam no topo.
+        """
+        if self.vectorstore is None:
+            return []
+        fetch_k = k + len(self.tombstones)
+        kwargs.setdefault('fetch_k', max(20, fetch_k))
+        results = self.vectorstore.similarity_search_with_score(query, k=fetch_k, **kwargs)
+        live = [(doc, score) for doc, score in results if doc.id not in self.tombstones]
+        return live[:k]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        """Mesma busca de `similarity_search_with_score`, sem os scores."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
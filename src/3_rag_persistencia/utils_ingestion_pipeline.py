@@ -0,0 +1,427 @@
+"""
+Pipeline de ingestão de PDFs em streaming, paralelo e com backpressure.
+
+O fluxo dos labs 3.6/3.7 carrega TODAS as páginas de TODOS os PDFs em uma
+lista antes de começar a dividir, deduplicar e embedar. A memória cresce
+com o corpus e a CPU fica parada enquanto o Ollama embeda.
+
+Aqui cada etapa consome a anterior sob demanda:
+
+    PDFs ──► [pool de processos: PyPDFLoader] ──► páginas
+         ──► [split + hash + dedup] ──► batches de chunks
+         ──► fila limitada ──► [embed em batch + add no FAISS]
+
+- A extração roda em um `ProcessPoolExecutor` com número limitado de
+  arquivos "em voo"
+- As etapas são ligadas por uma fila de tamanho fixo: se o embedding
+  atrasar, a extração espera (backpressure) e a memória fica constante
+- Um cache de páginas indexado pelo hash do arquivo permite que PDFs
+  inalterados pulem o `PyPDFLoader` por completo
+- Com `metrics` (`utils_instrumentation.Metrics`), cada etapa é registrada:
+  `pdf_load`, `split`, `dedup`, `embed` e `index_add`
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils_embedding_cache import content_hash
+from utils_incremental_index import file_hash
+from utils_instrumentation import NULL_METRICS, Metrics
+
+_END = object()
+
+
+def generate_chunk_id(content: str, metadata: Dict[str, Any]) -> str:
+    """
+    Gera o `chunk_id` com a mesma regra do lab 3.6 (conteúdo + source + page).
+
+    Args:
+        content: Texto do chunk
+        metadata: Metadados do chunk
+
+    Returns:
+        Hash SHA-256 de 64 caracteres
+    """
+    unique_string = f"{content}|{metadata.get('source', '')}|{metadata.get('page', '')}"
+    return hashlib.sha256(unique_string.encode('utf-8')).hexdigest()
+
+
+def extract_pdf_pages(pdf_path: str) -> List[Dict[str, Any]]:
+    """
+    Extrai as páginas de um PDF (executada nos processos do pool).
+
+    Retorna dicionários simples em vez de `Document` para reduzir o custo de
+    serialização entre processos.
+    """
+    pages = PyPDFLoader(pdf_path).load()
+    return [{'page_content': p.page_content, 'metadata': p.metadata} for p in pages]
+
+
+def _with_source(pages: List[Dict[str, Any]], path: Path) -> List[Dict[str, Any]]:
+    """Páginas do cache com os metadados de caminho do arquivo atual (como o `PyPDFLoader` grava)."""
+    source = str(path)
+    return [
+        {'page_content': p['page_content'], 'metadata': {
+            **p['metadata'], 'source': source,
+            **({'file_path': source} if 'file_path' in p['metadata'] else {}),
+        }}
+        for p in pages
+    ]
+
+
+def _extract_pdf_pages_timed(pdf_path: str) -> Tuple[List[Dict[str, Any]], float]:
+    """`extract_pdf_pages` + duração em ms, medida dentro do processo do pool."""
+    start = time.perf_counter()
+    pages = extract_pdf_pages(pdf_path)
+    return pages, (time.perf_counter() - start) * 1000
+
+
+class PageCache:
+    """
+    Cache em disco das páginas extraídas, indexado pelo hash do arquivo.
+
+    Cada PDF vira um arquivo `<file_hash>.json.gz` com o texto e os metadados
+    das páginas. Se o PDF não mudou, o `PyPDFLoader` não é chamado.
+
+    Arquivos idênticos em caminhos diferentes compartilham a entrada: o
+    `source` gravado é o do primeiro caminho e é trocado pelo caminho atual
+    ao servir as páginas (ver `iter_pdf_pages`).
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, key: str, pages: List[Dict[str, Any]]) -> None:
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(pages, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def iter_pdf_pages(
+    pdf_paths: Iterable[Union[str, Path]],
+    page_cache: Optional[PageCache] = None,
+    max_workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[Tuple[Path, List[Dict[str, Any]]]]:
+    """
+    Gera (caminho, páginas) para cada PDF, extraindo em paralelo.
+
+    No máximo `max_pending` PDFs ficam em extração ao mesmo tempo, então a
+    memória não depende do número total de arquivos. A ordem de saída é a
+    ordem de conclusão, não a de entrada.
+
+    Args:
+        pdf_paths: Caminhos dos PDFs (pode ser um gerador)
+        page_cache: Cache de páginas (opcional)
+        max_workers: Processos do pool (padrão: núcleos da CPU)
+        max_pending: PDFs em extração simultânea (padrão: 2 × max_workers)
+        stats: Dicionário onde contadores são acumulados
+        metrics: Coletor para a etapa `pdf_load` (opcional)
+    """
+    metrics = metrics or NULL_METRICS
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    stats = stats if stats is not None else {}
+    stats.setdefault('pdfs', 0)
+    stats.setdefault('pdfs_from_cache', 0)
+    stats.setdefault('pages', 0)
+
+    def finish(path: Path, pages: List[Dict[str, Any]], duration_ms: float = 0.0, from_cache: bool = False):
+        stats['pdfs'] += 1
+        stats['pages'] += len(pages)
+        metrics.record('pdf_load', duration_ms, count=len(pages), bytes=path.stat().st_size, from_cache=from_cache)
+        return path, pages
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending: Dict[Any, Tuple[Path, str]] = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                path, key = pending.pop(future)
+                pages, duration_ms = future.result()
+                if page_cache is not None:
+                    page_cache.put(key, pages)
+                yield finish(path, pages, duration_ms)
+
+        for pdf_path in pdf_paths:
+            path = Path(pdf_path)
+            key = file_hash(path)
+            cache_start = time.perf_counter()
+            cached = page_cache.get(key) if page_cache is not None else None
+            if cached is not None:
+                stats['pdfs_from_cache'] += 1
+                pages = _with_source(cached, path)
+                yield finish(path, pages, (time.perf_counter() - cache_start) * 1000, from_cache=True)
+                continue
+
+            pending[pool.submit(_extract_pdf_pages_timed, str(path))] = (path, key)
+            if len(pending) >= max_pending:
+                yield from drain(FIRST_COMPLETED)
+
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+
+def iter_chunk_batches(
+    pages_iter: Iterable[Tuple[Path, List[Dict[str, Any]]]],
+    text_splitter,
+    batch_size: int = 64,
+    metadata_fn: Optional[Callable[[Path], Dict[str, Any]]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    near_duplicates=None,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[List[Document]]:
+    """
+    Divide, enriquece, deduplica e agrupa chunks em batches.
+
+    A deduplicação segue o lab 3.6 (chunk_id e content_hash), mas guarda
+    apenas os hashes: a memória usada é ~64 bytes por chunk único.
+
+    Args:
+        pages_iter: Saída de `iter_pdf_pages`
+        text_splitter: Splitter do LangChain (ex: RecursiveCharacterTextSplitter)
+        batch_size: Chunks por batch de embedding
+        metadata_fn: Metadados extras por arquivo (ex: `extract_metadata_from_path`)
+        stats: Dicionário onde contadores são acumulados
+        near_duplicates: `NearDuplicateDetector` para descartar também
+            quase-duplicatas (opcional)
+        metrics: Coletor para as etapas `split` e `dedup` (opcional)
+    """
+    metrics = metrics or NULL_METRICS
+    stats = stats if stats is not None else {}
+    for name in ('chunks', 'duplicates_samepage', 'duplicates_crosspage',
+                 'near_duplicates_samepage', 'near_duplicates_crosspage'):
+        stats.setdefault(name, 0)
+
+    seen_chunk_ids = set()
+    seen_content_hashes = set()
+    batch: List[Document] = []
+
+    for path, pages in pages_iter:
+        file_metadata = metadata_fn(path) if metadata_fn else {}
+        docs = [
+            Document(page_content=p['page_content'], metadata={**p['metadata'], **file_metadata})
+            for p in pages
+        ]
+        with metrics.stage('split', count=len(docs)) as m:
+            chunks = text_splitter.split_documents(docs)
+            m['chunks'] = len(chunks)
+
+        # Nada de `yield` dentro da etapa: o tempo do consumidor não entra na medida
+        unique: List[Document] = []
+        with metrics.stage('dedup', count=len(chunks)) as m:
+            for i, chunk in enumerate(chunks):
+                chunk.metadata['chunk_index'] = i
+                chunk.metadata['total_chunks'] = len(chunks)
+                chunk_id = generate_chunk_id(chunk.page_content, chunk.metadata)
+                c_hash = content_hash(chunk.page_content)
+                chunk.metadata['chunk_id'] = chunk_id
+                chunk.metadata['content_hash'] = c_hash
+                stats['chunks'] += 1
+
+                if chunk_id in seen_chunk_ids:
+                    stats['duplicates_samepage'] += 1
+                    continue
+                if c_hash in seen_content_hashes:
+                    stats['duplicates_crosspage'] += 1
+                    continue
+                seen_chunk_ids.add(chunk_id)
+                seen_content_hashes.add(c_hash)
+
+                if near_duplicates is not None:
+                    location = (chunk.metadata.get('source'), chunk.metadata.get('page'))
+                    match = near_duplicates.add(chunk.page_content, key=chunk_id, location=location)
+                    if match is not None:
+                        stats[f'near_duplicates_{match[1]}'] += 1
+                        continue
+
+                unique.append(chunk)
+            m['unique'] = len(unique)
+
+        for chunk in unique:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def _put(out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """`out.put` que desiste quando o consumidor sinaliza `stop`."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)  # bloqueia quando a fila está cheia (backpressure)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(
+    batches: Iterator[List[Document]],
+    out: queue.Queue,
+    errors: List[BaseException],
+    stop: threading.Event,
+) -> None:
+    """Thread produtora: extração + chunking alimentando a fila limitada."""
+    try:
+        for batch in batches:
+            if not _put(out, batch, stop):
+                break
+    except BaseException as e:  # propaga para a thread principal
+        errors.append(e)
+    finally:
+        batches.close()  # encerra o pool de processos do iter_pdf_pages
+        _put(out, _END, stop)
+
+
+def run_ingestion_pipeline(
+    pdf_paths: Iterable[Union[str, Path]],
+    text_splitter,
+    embeddings: Embeddings,
+    vectorstore: Optional[FAISS] = None,
+    metadata_fn: Optional[Callable[[Path], Dict[str, Any]]] = None,
+    page_cache: Optional[PageCache] = None,
+    embed_batch_size: int = 64,
+    queue_size: int = 4,
+    max_workers: Optional[int] = None,
+    verbose: bool = True,
+    lexical_index=None,
+    near_duplicates=None,
+    metrics: Optional[Metrics] = None,
+) -> Tuple[Optional[FAISS], Dict[str, Any]]:
+    """
+    Executa o pipeline completo e retorna o vectorstore populado.
+
+    A extração/chunking roda em uma thread produtora (com o pool de
+    processos) enquanto a thread atual embeda e indexa os batches. No
+    máximo `queue_size` batches ficam aguardando embedding.
+
+    Args:
+        pdf_paths: Caminhos dos PDFs
+        text_splitter: Splitter do LangChain
+        embeddings: Modelo de embeddings (pode ser um `CachedEmbeddings`)
+        vectorstore: Índice existente para receber os chunks (opcional)
+        metadata_fn: Metadados extras por arquivo
+        page_cache: Cache de páginas por hash de arquivo (opcional)
+        embed_batch_size: Chunks por chamada de `embed_documents`
+        queue_size: Batches máximos aguardando embedding
+        max_workers: Processos para extração de PDF
+        verbose: Imprime progresso por batch
+        lexical_index: `BM25Index` alimentado com os mesmos batches (opcional)
+        near_duplicates: `NearDuplicateDetector` para quase-duplicatas (opcional)
+        metrics: Coletor de métricas por etapa (opcional)
+
+    Returns:
+        (vectorstore, estatísticas)
+    """
+    metrics = metrics or NULL_METRICS
+    stats: Dict[str, Any] = {'embedded': 0, 'batches': 0, 'embed_time_s': 0.0}
+    start = time.perf_counter()
+
+    pages_iter = iter_pdf_pages(pdf_paths, page_cache=page_cache, max_workers=max_workers, stats=stats,
+                                metrics=metrics)
+    batches = iter_chunk_batches(
+        pages_iter, text_splitter, embed_batch_size, metadata_fn, stats=stats, near_duplicates=near_duplicates,
+        metrics=metrics,
+    )
+
+    batch_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    errors: List[BaseException] = []
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce, args=(batches, batch_queue, errors, stop), daemon=True)
+    producer.start()
+
+    try:
+        vectorstore = _consume(batch_queue, embeddings, vectorstore, lexical_index, stats, metrics,
+                               queue_size, verbose)
+    finally:
+        # Se o embedding/índice falhar, a produtora para em vez de ficar presa no put
+        stop.set()
+        while True:
+            try:
+                batch_queue.get_nowait()
+            except queue.Empty:
+                break
+        producer.join()
+    if errors:
+        raise errors[0]
+
+    stats['duplicates'] = (
+        stats['duplicates_samepage'] + stats['duplicates_crosspage']
+        + stats['near_duplicates_samepage'] + stats['near_duplicates_crosspage']
+    )
+    stats['elapsed_s'] = time.perf_counter() - start
+    return vectorstore, stats
+
+
+def _consume(
+    batch_queue: queue.Queue,
+    embeddings: Embeddings,
+    vectorstore: Optional[FAISS],
+    lexical_index,
+    stats: Dict[str, Any],
+    metrics: Metrics,
+    queue_size: int,
+    verbose: bool,
+) -> Optional[FAISS]:
+    """Consumidor (thread atual): embedding + indexação de cada batch da fila."""
+    while True:
+        batch = batch_queue.get()
+        if batch is _END:
+            return vectorstore
+
+        texts = [c.page_content for c in batch]
+        metadatas = [c.metadata for c in batch]
+        ids = [c.metadata['chunk_id'] for c in batch]
+
+        embed_start = time.perf_counter()
+        text_bytes = sum(len(t.encode('utf-8')) for t in texts) if metrics.enabled else 0
+        with metrics.stage('embed', count=len(texts), bytes=text_bytes):
+            vectors = embeddings.embed_documents(texts)
+        stats['embed_time_s'] += time.perf_counter() - embed_start
+
+        with metrics.stage('index_add', count=len(texts)):
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+            else:
+                vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+            if lexical_index is not None:
+                lexical_index.add_documents(batch, ids=ids)
+
+        stats['embedded'] += len(batch)
+        stats['batches'] += 1
+        if verbose:
+            print(f"   ✓ Batch {stats['batches']}: {len(batch)} chunks | "
+                  f"PDFs: {stats['pdfs']} | Fila: {batch_queue.qsize()}/{queue_size}")
@@ -0,0 +1,253 @@
+"""
+Pré-filtro por metadados para buscas FAISS filtradas.
+
+No Lab 3.7, `SelfQueryingRAGChatbot.chat` chama
+`similarity_search(query, filter={'doc_type': ..., 'year': ...})`. O `FAISS`
+do LangChain aplica o filtro DEPOIS da busca: traz `fetch_k` vizinhos e
+confere os metadados de cada um no docstore. Filtros seletivos devolvem
+menos de k resultados (ou nenhum) e o trabalho extra é desperdiçado.
+
+Este módulo oferece:
+
+- `MetadataIndex`: listas ordenadas de posições do índice por valor de
+  metadado (`doc_type`, `year`, `source`), atualizadas à medida que
+  vetores são adicionados ao vectorstore
+- `PrefilteredFAISS`: substituto do `FAISS` que converte o filtro em ids
+  candidatos e os passa para a busca (`faiss.IDSelectorBatch`); quando o
+  subconjunto é pequeno, calcula as distâncias por força bruta só nele
+
+Filtros que o índice não sabe resolver (campos não indexados, operadores
+como `$gt`, funções) caem no pós-filtro original do LangChain.
+
+Uso:
+
+    vectorstore = PrefilteredFAISS.from_faiss(vectorstore)
+    vectorstore.similarity_search("futebol", k=4, filter={'doc_type': 'manual', 'year': 2025})
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from utils_faiss_factory import SEARCH_PARAMS, ApproximateFAISS
+
+DEFAULT_FIELDS = ('doc_type', 'year', 'source')
+
+
+class MetadataIndex:
+    """
+    Índice invertido de metadados: (campo, valor) → posições no índice FAISS.
+
+    As posições são adicionadas em ordem crescente, então cada lista já
+    nasce ordenada e interseções/uniões são feitas com numpy.
+    """
+
+    def __init__(self, fields: Sequence[str] = DEFAULT_FIELDS):
+        """
+        Args:
+            fields: Campos de metadados indexados
+        """
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {f: {} for f in self.fields}
+        self._arrays: Dict[Tuple[str, Hashable], np.ndarray] = {}
+        self._unhashable = set()
+        self._size = 0
+        self._mapping: Optional[Dict[int, str]] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def values(self, field: str) -> Dict[Hashable, int]:
+        """Contagem de posições por valor de um campo."""
+        return {value: len(ids) for value, ids in self._postings[field].items()}
+
+    def add(self, position: int, metadata: Dict[str, Any]) -> None:
+        """Indexa os metadados do vetor na posição `position` do índice."""
+        with self._lock:
+            for field in self.fields:
+                value = metadata.get(field)
+                try:
+                    self._postings[field].setdefault(value, []).append(position)
+                except TypeError:  # listas/dicts não podem ser chave
+                    self._unhashable.add(field)
+                    continue
+                self._arrays.pop((field, value), None)
+            self._size = max(self._size, position + 1)
+
+    def sync(self, vectorstore: FAISS) -> int:
+        """
+        Indexa as posições do vectorstore que ainda não foram vistas.
+
+        `FAISS.delete` renumera as posições e troca o `index_to_docstore_id`
+        por um dicionário novo: quando o mapeamento não é o mesmo objeto da
+        última sincronização (ou o índice encolheu), reconstrói tudo. Um
+        `delete` seguido de `add` mantém o `ntotal`, mas não o mapeamento.
+
+        Returns:
+            Número de posições indexadas
+        """
+        with self._sync_lock:  # buscas concorrentes não indexam a mesma posição duas vezes
+            ntotal = vectorstore.index.ntotal
+            mapping = vectorstore.index_to_docstore_id
+            if mapping is not self._mapping or ntotal < self._size:
+                self.clear()
+                self._mapping = mapping
+            start = self._size
+            for position in range(start, ntotal):
+                doc = vectorstore.docstore.search(mapping[position])
+                self.add(position, doc.metadata if isinstance(doc, Document) else {})
+            return ntotal - start
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings = {f: {} for f in self.fields}
+            self._arrays.clear()
+            self._unhashable.clear()
+            self._size = 0
+
+    def _ids_for(self, field: str, value: Hashable) -> np.ndarray:
+        key = (field, value)
+        ids = self._arrays.get(key)
+        if ids is None:
+            ids = self._arrays[key] = np.array(self._postings[field].get(value, ()), dtype=np.int64)
+        return ids
+
+    def candidates(self, filter: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Resolve um filtro no formato do LangChain em posições candidatas.
+
+        Suporta `{campo: valor}`, `{campo: [valores]}`, `$eq` e `$in`,
+        combinados por AND entre campos.
+
+        Returns:
+            Array ordenado de posições, ou None se o filtro não puder ser
+            resolvido pelo índice (use o pós-filtro)
+        """
+        if not isinstance(filter, dict) or not filter:
+            return None
+        with self._lock:
+            result = None
+            for field, condition in filter.items():
+                if field not in self._postings or field in self._unhashable:
+                    return None
+                if isinstance(condition, dict):
+                    if len(condition) != 1:
+                        return None
+                    (op, condition), = condition.items()
+                    if op not in ('$eq', '$in'):
+                        return None
+                values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+                try:
+                    parts = [self._ids_for(field, v) for v in values]
+                except TypeError:
+                    return None
+                ids = parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts or [np.empty(0, np.int64)]))
+                result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+                if len(result) == 0:
+                    break
+            return result
+
+
+class PrefilteredFAISS(ApproximateFAISS):
+    """
+    `ApproximateFAISS` com pré-filtro de metadados.
+
+    Filtros resolvidos pelo `MetadataIndex` viram um `IDSelectorBatch`
+    passado ao FAISS; subconjuntos com até `brute_force_threshold` vetores
+    são pontuados por força bruta (reconstrução + numpy).
+    """
+
+    def __init__(
+        self,
+        *args,
+        metadata_fields: Sequence[str] = DEFAULT_FIELDS,
+        brute_force_threshold: int = 2048,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.metadata_index = MetadataIndex(metadata_fields)
+        self.brute_force_threshold = brute_force_threshold
+        self.filter_stats = {'brute_force': 0, 'id_selector': 0, 'post_filter': 0}
+
+    @classmethod
+    def from_faiss(cls, vectorstore: FAISS, **kwargs: Any) -> 'PrefilteredFAISS':
+        """
+        Envolve um `FAISS` existente (mesmo índice e docstore, sem cópia).
+
+        Args:
+            vectorstore: Vectorstore criado com `FAISS.from_documents` etc.
+            **kwargs: `metadata_fields`, `brute_force_threshold`, `index_factory`...
+        """
+        store = cls(
+            vectorstore.embedding_function,
+            vectorstore.index,
+            vectorstore.docstore,
+            vectorstore.index_to_docstore_id,
+            relevance_score_fn=vectorstore.override_relevance_score_fn,
+            normalize_L2=vectorstore._normalize_L2,
+            distance_strategy=vectorstore.distance_strategy,
+            **kwargs,
+        )
+        store.metadata_index.sync(store)
+        return store
+
+    def _brute_force(self, vector: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k exato dentro de `ids` (distância L2² ou produto interno, como o FAISS)."""
+        try:
+            vectors = self.index.reconstruct_batch(ids)
+        except RuntimeError:
+            # Índices IVF só reconstroem por id com o mapa direto
+            faiss.extract_index_ivf(self.index).make_direct_map()
+            vectors = self.index.reconstruct_batch(ids)
+        if self.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            scores = vectors @ vector[0]
+            order = np.argsort(-scores, kind='stable')[:k]
+        else:
+            scores = ((vectors - vector[0]) ** 2).sum(axis=1)
+            order = np.argsort(scores, kind='stable')[:k]
+        return scores[order][None, :], ids[order][None, :]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Busca com pré-filtro quando possível; caso contrário, igual ao `ApproximateFAISS`.
+        """
+        ids = None
+        if isinstance(filter, dict):
+            self.metadata_index.sync(self)
+            ids = self.metadata_index.candidates(filter)
+        if ids is None:
+            if filter is not None:
+                self.filter_stats['post_filter'] += 1
+            return super().similarity_search_with_score_by_vector(embedding, k, filter, fetch_k, **kwargs)
+        if len(ids) == 0:
+            return []
+
+        overrides = {name: kwargs.pop(name) for name in SEARCH_PARAMS if name in kwargs}
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+
+        if len(ids) > self.brute_force_threshold:
+            scores, indices = self._search_index(vector, k, overrides, sel=faiss.IDSelectorBatch(ids))
+            # Índices em grafo (HNSW) podem não alcançar k vizinhos permitidos
+            if (indices[0] >= 0).sum() >= min(k, len(ids)):
+                self.filter_stats['id_selector'] += 1
+                return self._collect_docs(scores[0], indices[0], k, **kwargs)
+
+        self.filter_stats['brute_force'] += 1
+        scores, indices = self._brute_force(vector, ids, k)
+        return self._collect_docs(scores[0], indices[0], k, **kwargs)
@@ -0,0 +1,213 @@
+"""
+Detecção de quase-duplicatas com MinHash + LSH, em streaming.
+
+A deduplicação do Lab 3.6 (`processed_chunk_ids` / `processed_content_hashes`)
+só pega chunks IDÊNTICOS byte a byte. Cópias levemente reformatadas (como
+os manuais de futebol de 2023 e 2025) passam e incham o índice.
+
+Este módulo oferece:
+
+- `minhash_signature`: assinatura MinHash dos shingles de palavras do texto;
+  a fração de posições iguais entre duas assinaturas estima a similaridade
+  de Jaccard entre os textos
+- `NearDuplicateDetector`: índice LSH por bandas (`b` bandas × `r` linhas,
+  escolhidos a partir do `threshold` de Jaccard). Cada chunk é comparado
+  só com os candidatos que caem no mesmo bucket em alguma banda, e o
+  candidato é confirmado pela similaridade estimada
+
+Memória por chunk único: `num_perm × 4` bytes da assinatura + uma entrada
+de bucket por banda. Duplicatas não são guardadas, apenas contadas e
+agrupadas em clusters (mesma página × páginas diferentes, como no lab).
+"""
+
+import re
+import unicodedata
+import zlib
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_BASE = np.uint64(1_000_003)
+
+# np.trapz foi renomeado para np.trapezoid no numpy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def _words(text: str) -> List[str]:
+    text = unicodedata.normalize('NFD', text.lower())
+    text = "".join(c for c in text if unicodedata.category(c) != 'Mn')
+    return re.findall(r"\w+", text)
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> np.ndarray:
+    """
+    Hashes (uint64) dos shingles de `shingle_size` palavras consecutivas.
+
+    Minúsculas, sem acentos e sem pontuação: mudanças de formatação não
+    alteram os shingles.
+    """
+    words = _words(text)
+    if not words:
+        return np.zeros(1, dtype=np.uint64)
+    tokens = np.fromiter((zlib.crc32(w.encode('utf-8')) for w in words), dtype=np.uint64, count=len(words))
+    k = min(shingle_size, len(tokens))
+    hashes = np.zeros(len(tokens) - k + 1, dtype=np.uint64)
+    for j in range(k):  # hash polinomial (overflow em uint64 é intencional)
+        hashes = hashes * _SHINGLE_BASE + tokens[j:len(tokens) - k + 1 + j]
+    return np.unique(hashes)
+
+
+def minhash_signature(hashes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Assinatura MinHash: mínimo de (a·h + b) mod p para cada permutação."""
+    permuted = (hashes[:, None] * a[None, :] + b[None, :]) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def optimal_lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Escolhe (bandas, linhas) minimizando falsos positivos + falsos negativos.
+
+    A probabilidade de dois textos com Jaccard `s` virarem candidatos é
+    `1 - (1 - s^r)^b`; integramos o erro abaixo e acima do threshold.
+    """
+    s = np.linspace(0, 1, 201)
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            probability = 1 - (1 - s ** rows) ** bands
+            false_positive = _trapezoid(np.where(s < threshold, probability, 0), s)
+            false_negative = _trapezoid(np.where(s >= threshold, 1 - probability, 0), s)
+            if false_positive + false_negative < best_error:
+                best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class NearDuplicateDetector:
+    """
+    Detector de quase-duplicatas em streaming (MinHash + LSH por bandas).
+
+    Uso:
+
+        detector = NearDuplicateDetector(threshold=0.8)
+        for chunk in chunks:
+            match = detector.add(chunk.page_content, key=chunk_id, location=(source, page))
+            if match is not None:
+                original_key, kind = match  # kind: 'samepage' ou 'crosspage'
+                continue
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 42):
+        """
+        Args:
+            threshold: Similaridade de Jaccard mínima para considerar duplicata
+            num_perm: Número de permutações MinHash
+            shingle_size: Palavras por shingle
+            seed: Semente das permutações
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._keys: List[Hashable] = []
+        self._locations: List[Any] = []
+        self._clusters: Dict[int, List[Hashable]] = {}
+        self._seen = 0
+        self.stats = {'unique': 0, 'samepage': 0, 'crosspage': 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def signature(self, text: str) -> np.ndarray:
+        return minhash_signature(shingle_hashes(text, self.shingle_size), self._a, self._b)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text: str) -> Optional[Tuple[Hashable, float]]:
+        """
+        Procura um chunk já visto com Jaccard estimado ≥ threshold.
+
+        Returns:
+            (chave do chunk original, Jaccard estimado) ou None
+        """
+        match = self._match(self.signature(text)) if len(self) else None
+        return match[:2] if match else None
+
+    def _match(self, signature: np.ndarray, band_keys: Optional[List[bytes]] = None):
+        band_keys = band_keys or self._band_keys(signature)
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            candidates.update(buckets.get(band_key, ()))
+        if not candidates:
+            return None
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[ids] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return self._keys[ids[best]], float(similarity[best]), int(ids[best])
+
+    def add(self, text: str, key: Optional[Hashable] = None, location: Any = None) -> Optional[Tuple[Hashable, str]]:
+        """
+        Verifica o chunk e, se for único, o indexa.
+
+        Args:
+            text: Conteúdo do chunk
+            key: Identificador do chunk (padrão: ordem de chegada)
+            location: Posição do chunk, ex: (source, page). Duplicatas com a
+                mesma `location` do original contam como 'samepage'
+
+        Returns:
+            (chave do chunk original, 'samepage' | 'crosspage') se for
+            quase-duplicata; None se for único
+        """
+        key = self._seen if key is None else key
+        self._seen += 1
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+
+        match = self._match(signature, band_keys) if len(self) else None
+        if match is not None:
+            original_key, _, original_id = match
+            self._clusters.setdefault(original_id, []).append(key)
+            same = location is not None and location == self._locations[original_id]
+            kind = 'samepage' if same else 'crosspage'
+            self.stats[kind] += 1
+            return original_key, kind
+
+        internal_id = len(self._keys)
+        if internal_id == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+        self._signatures[internal_id] = signature
+        self._keys.append(key)
+        self._locations.append(location)
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(internal_id)
+        self.stats['unique'] += 1
+        return None
+
+    def clusters(self) -> List[Dict[str, Any]]:
+        """Clusters de duplicatas: original, localização e chaves removidas."""
+        return [
+            {
+                'original': self._keys[internal_id],
+                'location': self._locations[internal_id],
+                'duplicates': list(duplicates),
+                'size': len(duplicates) + 1,
+            }
+            for internal_id, duplicates in sorted(self._clusters.items(), key=lambda item: -len(item[1]))
+        ]
+
+    def memory_bytes(self) -> int:
+        """Memória aproximada das assinaturas e dos buckets (chunks únicos)."""
+        bucket_entries = sum(len(b) for b in self._buckets)
+        return len(self) * self.num_perm * 4 + bucket_entries * (self.rows * 4 + 64)
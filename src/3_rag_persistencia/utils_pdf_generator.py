@@ -6,14 +6,23 @@ Este módulo cria PDFs com conteúdos realistas para demonstrar:
 - Chunking de texto
 - Busca semântica em documentos longos
 - RAG com múltiplas fontes
+
+Também gera corpora sintéticos grandes (milhares de PDFs) para testes de
+carga de ingestão e retrieval, com gabarito de consultas → páginas.
 """
 
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
 from datetime import datetime
 
 
@@ -872,6 +881,314 @@ def gerar_todos_pdfs(output_dir=None):
     return pdf_files
 
 
+# ============================================================================
+# Corpus sintético para testes de carga
+# ============================================================================
+
+# Vocabulário por tipo de documento. Os prefixos dos nomes de arquivo seguem
+# a convenção de `extract_metadata_from_path` (manual/guia/relatorio/artigo/receita).
+VOCABULARIO_SINTETICO = {
+    "manual": {
+        "temas": ["smartphone", "roteador", "futebol", "impressora", "drone"],
+        "entidades": ["módulo", "componente", "sensor", "painel", "conector"],
+        "atributos": ["tensão nominal", "temperatura máxima", "capacidade", "tempo de resposta", "peso"],
+        "unidades": ["V", "°C", "mAh", "ms", "g"],
+        "frases": [
+            "Antes de utilizar o equipamento, leia atentamente todas as instruções de segurança.",
+            "Mantenha o dispositivo longe de fontes de calor e umidade excessiva.",
+            "A configuração inicial pode ser feita pelo aplicativo ou pelo painel frontal.",
+            "Em caso de falha, reinicie o sistema e verifique as conexões de alimentação.",
+            "Consulte a tabela de especificações para os limites de operação recomendados.",
+            "Atualizações de firmware corrigem falhas e adicionam novos recursos.",
+        ],
+    },
+    "guia": {
+        "temas": ["viagem", "investimentos", "jardinagem", "fotografia", "corrida"],
+        "entidades": ["roteiro", "plano", "método", "programa", "protocolo"],
+        "atributos": ["duração", "custo estimado", "frequência", "nível", "distância"],
+        "unidades": ["dias", "reais", "vezes por semana", "pontos", "km"],
+        "frases": [
+            "Este guia apresenta recomendações práticas para iniciantes e avançados.",
+            "Planeje cada etapa com antecedência para evitar imprevistos.",
+            "Registre o progresso semanalmente para ajustar o plano quando necessário.",
+            "Pequenos hábitos consistentes produzem melhores resultados no longo prazo.",
+            "Compare alternativas antes de tomar decisões definitivas.",
+        ],
+    },
+    "relatorio": {
+        "temas": ["supercopa", "vendas", "auditoria", "desempenho", "infraestrutura"],
+        "entidades": ["indicador", "departamento", "projeto", "contrato", "servidor"],
+        "atributos": ["receita trimestral", "taxa de crescimento", "número de incidentes", "disponibilidade", "orçamento"],
+        "unidades": ["mil reais", "%", "ocorrências", "%", "mil reais"],
+        "frases": [
+            "O período analisado apresentou variações relevantes em relação ao ano anterior.",
+            "Os dados foram consolidados a partir dos sistemas internos de gestão.",
+            "Recomenda-se acompanhamento mensal dos indicadores críticos.",
+            "As metas estabelecidas foram parcialmente atingidas no período.",
+            "A equipe responsável apresentou um plano de ação para os desvios identificados.",
+        ],
+    },
+    "artigo": {
+        "temas": ["embeddings", "bancos vetoriais", "redes neurais", "recuperação de informação", "compressão"],
+        "entidades": ["modelo", "algoritmo", "experimento", "conjunto de dados", "índice"],
+        "atributos": ["acurácia", "latência média", "número de parâmetros", "recall@10", "tamanho"],
+        "unidades": ["%", "ms", "milhões", "%", "GB"],
+        "frases": [
+            "Os resultados indicam ganhos consistentes em relação aos métodos de referência.",
+            "A metodologia proposta foi avaliada em diferentes cenários experimentais.",
+            "Trabalhos relacionados exploram abordagens complementares ao problema.",
+            "As limitações do estudo são discutidas na seção de conclusões.",
+            "A reprodutibilidade foi garantida com sementes fixas e código aberto.",
+        ],
+    },
+    "receita": {
+        "temas": ["massas", "sobremesas", "pães", "saladas", "sopas"],
+        "entidades": ["preparo", "molho", "recheio", "fermento", "creme"],
+        "atributos": ["tempo de forno", "quantidade de farinha", "rendimento", "temperatura do forno", "tempo de descanso"],
+        "unidades": ["minutos", "g", "porções", "°C", "minutos"],
+        "frases": [
+            "Separe todos os ingredientes antes de iniciar o preparo.",
+            "Misture delicadamente até obter uma textura homogênea.",
+            "Ajuste o sal e os temperos conforme o seu gosto.",
+            "Sirva imediatamente ou conserve em recipiente fechado na geladeira.",
+            "Pré-aqueça o forno com pelo menos quinze minutos de antecedência.",
+        ],
+    },
+}
+
+
+# doc_type atribuído por `extract_metadata_from_path` a cada prefixo de arquivo
+# (ex: guia_*.pdf é indexado como "manual"); o gabarito usa o tipo indexado.
+DOC_TYPE_INDEXADO = {"guia": "manual"}
+
+
+def _planejar_documento(
+    indice: int,
+    seed: int,
+    paginas: Tuple[int, int],
+    taxa_duplicacao: float,
+    anos: Sequence[int],
+    tipos: Sequence[str],
+    output_dir: Path,
+) -> Dict:
+    """
+    Define deterministicamente o conteúdo de um documento sintético.
+
+    Cada documento usa seu próprio `random.Random(seed, indice)`, então o
+    resultado não depende da ordem de execução no pool de processos.
+    """
+    rng = random.Random(f"{seed}-{indice}")
+    tipo = rng.choice(list(tipos))
+    ano = rng.choice(list(anos))
+    vocab = VOCABULARIO_SINTETICO[tipo]
+    tema = rng.choice(vocab["temas"])
+    nome = f"{tipo}_{tema.replace(' ', '-')}_{indice:05d}_{ano}.pdf"
+
+    paginas_texto = []
+    original_de = []  # página → página original (duplicata de duplicata aponta para a original)
+    fatos = []
+    for pagina in range(rng.randint(*paginas)):
+        # Página duplicada (como em manual_futebol_2025_com_dup.pdf)
+        if paginas_texto and rng.random() < taxa_duplicacao:
+            origem = original_de[rng.randrange(len(paginas_texto))]
+            paginas_texto.append(paginas_texto[origem])
+            original_de.append(origem)
+            for fato in fatos:
+                if fato["pagina_origem"] == origem:
+                    fato["paginas"].append(pagina)
+            continue
+
+        i_attr = rng.randrange(len(vocab["atributos"]))
+        entidade = rng.choice(vocab["entidades"])
+        codigo = f"{tipo[:2].upper()}-{indice:05d}-{pagina:02d}"
+        valor = rng.randint(1, 9999)
+        atributo = vocab["atributos"][i_attr]
+        unidade = vocab["unidades"][i_attr]
+        fato_texto = f"O {entidade} {codigo} apresenta {atributo} de {valor} {unidade}."
+
+        paragrafos = []
+        for _ in range(rng.randint(3, 5)):
+            paragrafos.append(" ".join(rng.choice(vocab["frases"]) for _ in range(rng.randint(3, 6))))
+        paragrafos.insert(rng.randrange(len(paragrafos) + 1), fato_texto)
+
+        paginas_texto.append({
+            "titulo": f"{tipo.capitalize()} de {tema} ({ano}) - Seção {pagina + 1}",
+            "paragrafos": paragrafos,
+        })
+        original_de.append(pagina)
+        fatos.append({
+            "query": f"Qual é o valor de {atributo} do {entidade} {codigo}?",
+            "answer": f"{valor} {unidade}",
+            "pagina_origem": pagina,
+            "paginas": [pagina],
+        })
+
+    return {
+        "path": str(output_dir / nome),
+        "source": nome,
+        "doc_type": tipo,
+        "year": ano,
+        "paginas": paginas_texto,
+        "fatos": fatos,
+    }
+
+
+def _renderizar_documento_sintetico(spec: Dict) -> Dict:
+    """
+    Renderiza um documento planejado (executada nos processos do pool).
+
+    Usa o `canvas` do ReportLab diretamente (sem platypus), que é bem mais
+    rápido para texto corrido simples.
+    """
+    largura, altura = A4
+    margem = 0.8 * inch
+    largura_util = largura - 2 * margem
+
+    pdf = canvas.Canvas(spec["path"], pagesize=A4, pageCompression=1)
+    for pagina in spec["paginas"]:
+        y = altura - margem
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(margem, y, pagina["titulo"])
+        y -= 28
+        pdf.setFont("Helvetica", 10)
+        for paragrafo in pagina["paragrafos"]:
+            for linha in simpleSplit(paragrafo, "Helvetica", 10, largura_util):
+                if y < margem:
+                    break
+                pdf.drawString(margem, y, linha)
+                y -= 13
+            y -= 8
+        pdf.showPage()
+    pdf.save()
+
+    return {
+        "source": spec["source"],
+        "doc_type": spec["doc_type"],
+        "year": spec["year"],
+        "pages": len(spec["paginas"]),
+        "fatos": spec["fatos"],
+    }
+
+
+def gerar_corpus_sintetico(
+    n_documentos: int,
+    output_dir: Optional[Path] = None,
+    paginas: Tuple[int, int] = (2, 6),
+    taxa_duplicacao: float = 0.1,
+    taxa_copias: float = 0.02,
+    anos: Sequence[int] = tuple(range(2020, 2026)),
+    tipos: Sequence[str] = tuple(VOCABULARIO_SINTETICO.keys()),
+    seed: int = 42,
+    max_workers: Optional[int] = None,
+) -> Path:
+    """
+    Gera um corpus sintético de PDFs para testes de carga.
+
+    Além dos PDFs, grava na pasta de saída:
+    - `ground_truth.jsonl`: uma consulta por linha com a resposta e as
+      páginas relevantes (`page` 0-based, como no metadado do PyPDFLoader)
+    - `corpus_manifest.json`: parâmetros usados e resumo do corpus
+
+    Args:
+        n_documentos: Número de documentos originais
+        output_dir: Pasta de saída. Se None, usa data/pdfs_sinteticos/
+        paginas: Intervalo (mín, máx) de páginas por documento
+        taxa_duplicacao: Probabilidade de uma página repetir outra do mesmo documento
+        taxa_copias: Fração de documentos que ganham uma cópia com outro ano
+                     (como manual_futebol_2023_copia.pdf)
+        anos: Anos possíveis (distribuição uniforme)
+        tipos: Tipos de documento possíveis (chaves de VOCABULARIO_SINTETICO)
+        seed: Semente para reprodutibilidade
+        max_workers: Processos para renderização (padrão: núcleos da CPU)
+
+    Returns:
+        Caminho do arquivo ground_truth.jsonl
+    """
+    if output_dir is None:
+        output_dir = Path(__file__).parent.parent.parent / "data" / "pdfs_sinteticos"
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    desconhecidos = set(tipos) - set(VOCABULARIO_SINTETICO)
+    if desconhecidos:
+        raise ValueError(f"Tipos sem vocabulário: {sorted(desconhecidos)}")
+
+    print(f"🚀 Gerando corpus sintético com {n_documentos} documentos...\n")
+
+    specs = [
+        _planejar_documento(i, seed, paginas, taxa_duplicacao, anos, tipos, output_dir)
+        for i in range(n_documentos)
+    ]
+
+    # Cópias de documentos inteiros com outro ano no nome
+    rng = random.Random(f"{seed}-copias")
+    for original in rng.sample(specs, k=int(n_documentos * taxa_copias)):
+        ano = rng.choice([a for a in anos if a != original["year"]] or list(anos))
+        nome = original["source"].replace(f"_{original['year']}.pdf", f"_copia_{ano}.pdf")
+        copia = dict(original, path=str(output_dir / nome), source=nome, year=ano)
+        copia["fatos"] = []
+        original.setdefault("copias", []).append(nome)
+        specs.append(copia)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        chunksize = max(1, len(specs) // ((max_workers or 4) * 8))
+        resultados = list(pool.map(_renderizar_documento_sintetico, specs, chunksize=chunksize))
+
+    ground_truth_path = output_dir / "ground_truth.jsonl"
+    total_consultas = 0
+    with open(ground_truth_path, "w", encoding="utf-8") as f:
+        for spec, resultado in zip(specs, resultados):
+            fontes = [spec["source"]] + spec.get("copias", [])
+            for fato in resultado["fatos"]:
+                registro = {
+                    "query": fato["query"],
+                    "answer": fato["answer"],
+                    "doc_type": DOC_TYPE_INDEXADO.get(resultado["doc_type"], resultado["doc_type"]),
+                    "year": resultado["year"],
+                    "relevant": [
+                        {"source": fonte, "page": pagina}
+                        for fonte in fontes
+                        for pagina in fato["paginas"]
+                    ],
+                }
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                total_consultas += 1
+
+    manifesto = {
+        "n_documentos": n_documentos,
+        "n_copias": len(specs) - n_documentos,
+        "paginas": list(paginas),
+        "taxa_duplicacao": taxa_duplicacao,
+        "taxa_copias": taxa_copias,
+        "anos": list(anos),
+        "tipos": list(tipos),
+        "seed": seed,
+        "total_pdfs": len(resultados),
+        "total_paginas": sum(r["pages"] for r in resultados),
+        "total_consultas": total_consultas,
+    }
+    (output_dir / "corpus_manifest.json").write_text(
+        json.dumps(manifesto, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+
+    print(f"✅ {manifesto['total_pdfs']} PDFs ({manifesto['total_paginas']} páginas) em: {output_dir}")
+    print(f"✅ Gabarito com {total_consultas} consultas: {ground_truth_path}")
+    return ground_truth_path
+
+
 if __name__ == "__main__":
-    # Executar este arquivo diretamente para gerar os PDFs
-    gerar_todos_pdfs()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera PDFs de exemplo para os labs de RAG.")
+    parser.add_argument("--sintetico", type=int, metavar="N",
+                        help="Gera um corpus sintético com N documentos (teste de carga)")
+    parser.add_argument("--saida", type=Path, help="Pasta de saída")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do corpus sintético")
+    parser.add_argument("--workers", type=int, help="Processos para renderização")
+    args = parser.parse_args()
+
+    if args.sintetico:
+        gerar_corpus_sintetico(args.sintetico, args.saida, seed=args.seed, max_workers=args.workers)
+    else:
+        # Executar este arquivo diretamente para gerar os PDFs
+        gerar_todos_pdfs(args.saida)
@@ -0,0 +1,274 @@
+"""
+Armazenamento quantizado de vetores com rescoring exato.
+
+O Lab 3.6 guarda todos os embeddings como float32 em um índice flat
+(`ntotal * d * 4` bytes). Este módulo oferece formatos comprimidos:
+
+| Método   | Bytes por vetor (d=768) | Como funciona                                  |
+|----------|-------------------------|------------------------------------------------|
+| `flat`   | 3072                    | float32, busca exata (referência)              |
+| `int8`   | 768                     | Quantização escalar de 8 bits por dimensão     |
+| `binary` | 96                      | 1 bit por dimensão (sinal), distância Hamming  |
+| `pq`     | d / 8 (ex: 96)          | Product Quantization (subvetores → centróides) |
+
+Com `rescore=True`, o índice comprimido busca `k × oversample` candidatos
+e os scores finais são recalculados com os vetores float32, lidos de um
+arquivo `.npy` mapeado em memória (fica em disco, não na RAM).
+
+Os scores são similaridade de cosseno (vetores normalizados).
+"""
+
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+METHODS = ('flat', 'int8', 'binary', 'pq')
+
+FULL_VECTORS_FILE = "full_vectors.npy"
+
+
+def _normalized(vectors) -> np.ndarray:
+    matrix = np.array(vectors, dtype=np.float32, order='C', ndmin=2)
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def _pq_params(dim: int, n_train: int, m: Optional[int], nbits: int) -> Tuple[int, int]:
+    """Escolhe subquantizadores (divisor de d) e bits compatíveis com o treino."""
+    if m is None:
+        m = next(c for c in (dim // 8, dim // 4, dim // 2, dim) if c and dim % c == 0)
+    if dim % m != 0:
+        raise ValueError(f"pq_m ({m}) deve dividir a dimensão ({dim})")
+    # O k-means de cada subespaço precisa de pelo menos 2^nbits pontos
+    nbits = max(1, min(nbits, int(math.log2(max(n_train, 2)))))
+    return m, nbits
+
+
+class QuantizedIndex:
+    """
+    Índice vetorial com armazenamento comprimido e rescoring opcional.
+    """
+
+    def __init__(
+        self,
+        method: str = 'int8',
+        rescore: bool = True,
+        oversample: int = 4,
+        store_dir: Optional[Union[str, Path]] = None,
+        pq_m: Optional[int] = None,
+        pq_nbits: int = 8,
+    ):
+        """
+        Args:
+            method: 'flat', 'int8', 'binary' ou 'pq'
+            rescore: Recalcula o top-k com os vetores float32
+            oversample: Candidatos por resultado final quando há rescoring
+            store_dir: Diretório do memmap com os vetores float32. Se None,
+                os vetores ficam em memória (apenas quando rescore=True)
+            pq_m: Número de subvetores do PQ (padrão: d/8)
+            pq_nbits: Bits por subvetor do PQ
+        """
+        if method not in METHODS:
+            raise ValueError(f"Método inválido: {method}. Use um de {METHODS}")
+        self.method = method
+        self.rescore = rescore and method != 'flat'
+        self.oversample = oversample
+        self.store_dir = Path(store_dir) if store_dir is not None else None
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+
+        self.index = None
+        self.full_vectors: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        self.build_time_s = 0.0
+
+    def __len__(self) -> int:
+        return 0 if self.index is None else self.index.ntotal
+
+    def build(self, vectors) -> 'QuantizedIndex':
+        """Treina (quando necessário) e popula o índice com os vetores (n, d)."""
+        start = time.perf_counter()
+        x = _normalized(vectors)
+        n, self.dim = x.shape
+
+        if self.method == 'flat':
+            self.index = faiss.IndexFlatIP(self.dim)
+        elif self.method == 'int8':
+            self.index = faiss.IndexScalarQuantizer(
+                self.dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        elif self.method == 'binary':
+            if self.dim % 8 != 0:
+                raise ValueError("Quantização binária exige dimensão múltipla de 8")
+            self.index = faiss.IndexBinaryFlat(self.dim)
+        else:
+            m, nbits = _pq_params(self.dim, n, self.pq_m, self.pq_nbits)
+            self.index = faiss.IndexPQ(self.dim, m, nbits, faiss.METRIC_INNER_PRODUCT)
+
+        if self.method == 'binary':
+            self.index.add(self._binarize(x))
+        else:
+            if not self.index.is_trained:
+                self.index.train(x)
+            self.index.add(x)
+
+        if self.rescore:
+            if self.store_dir is not None:
+                self.store_dir.mkdir(parents=True, exist_ok=True)
+                path = self.store_dir / FULL_VECTORS_FILE
+                np.save(path, x)
+                self.full_vectors = np.load(path, mmap_mode='r')
+            else:
+                self.full_vectors = x
+
+        self.build_time_s = time.perf_counter() - start
+        return self
+
+    @staticmethod
+    def _binarize(x: np.ndarray) -> np.ndarray:
+        """1 bit por dimensão: positivo → 1, negativo/zero → 0."""
+        return np.packbits(x > 0, axis=1)
+
+    def _search_compressed(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.method == 'binary':
+            distances, ids = self.index.search(self._binarize(q), k)
+            # Hamming → aproximação do cosseno: 1 - 2·h/d
+            return 1.0 - 2.0 * distances.astype(np.float32) / self.dim, ids
+        return self.index.search(q, k)
+
+    def search(self, queries, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k vizinhos mais próximos de cada query.
+
+        Returns:
+            (scores, ids), ambos (nq, k), do mais similar para o menos similar.
+            Posições sem resultado têm id -1.
+        """
+        if self.index is None:
+            raise RuntimeError("Índice vazio: chame build() primeiro")
+        q = _normalized(queries)
+        if not self.rescore:
+            return self._search_compressed(q, k)
+
+        _, candidates = self._search_compressed(q, min(k * self.oversample, len(self)))
+        scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(q), k), -1, dtype=np.int64)
+        for i, cand in enumerate(candidates):
+            cand = np.sort(cand[cand >= 0])
+            cand_scores = self.full_vectors[cand] @ q[i]
+            top = np.argsort(-cand_scores)[:k]
+            scores[i, :len(top)] = cand_scores[top]
+            ids[i, :len(top)] = cand[top]
+        return scores, ids
+
+    def memory_bytes(self) -> int:
+        """Bytes que precisam ficar em RAM: índice serializado + `rescore_bytes`."""
+        if self.index is None:
+            return 0
+        if self.method == 'binary':
+            index_bytes = faiss.serialize_index_binary(self.index).nbytes
+        else:
+            index_bytes = faiss.serialize_index(self.index).nbytes
+        return index_bytes + self.rescore_bytes()
+
+    def rescore_bytes(self) -> int:
+        """Bytes dos vetores float32 de rescoring mantidos em RAM (0 com memmap)."""
+        if self.full_vectors is None or isinstance(self.full_vectors, np.memmap):
+            return 0
+        return self.full_vectors.nbytes
+
+
+def quantize_vectorstore(vectorstore, method: str = 'int8', pq_m: Optional[int] = None, pq_nbits: int = 8):
+    """
+    Substitui o índice flat de um `FAISS` do LangChain por um comprimido.
+
+    O docstore, o mapeamento de ids e a métrica do vectorstore são mantidos,
+    então `similarity_search`, `as_retriever` e `save_local` continuam
+    funcionando. Apenas 'int8' e 'pq' são suportados aqui (o LangChain não
+    trabalha com índices binários); o rescoring fica a cargo de
+    `QuantizedIndex`.
+
+    Args:
+        vectorstore: Instância `langchain_community.vectorstores.FAISS`
+        method: 'int8' ou 'pq'
+        pq_m: Subvetores do PQ (padrão: d/8)
+        pq_nbits: Bits por subvetor do PQ
+
+    Returns:
+        O mesmo vectorstore, com `vectorstore.index` comprimido
+    """
+    if method not in ('int8', 'pq'):
+        raise ValueError("quantize_vectorstore suporta apenas 'int8' e 'pq'")
+    old = vectorstore.index
+    vectors = old.reconstruct_n(0, old.ntotal)
+    if method == 'int8':
+        index = faiss.IndexScalarQuantizer(old.d, faiss.ScalarQuantizer.QT_8bit, old.metric_type)
+    else:
+        m, nbits = _pq_params(old.d, old.ntotal, pq_m, pq_nbits)
+        index = faiss.IndexPQ(old.d, m, nbits, old.metric_type)
+    index.train(vectors)
+    index.add(vectors)
+    vectorstore.index = index
+    return vectorstore
+
+
+def compare_quantization(
+    vectors,
+    queries,
+    k: int = 10,
+    methods: Sequence[str] = METHODS,
+    oversample: int = 4,
+    store_dir: Optional[Union[str, Path]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compara memória, tempo de build, latência e recall@k de cada método.
+
+    O recall é medido contra a busca exata float32 (`flat`). Cada método
+    comprimido aparece duas vezes: sem e com rescoring. Sem `store_dir`, os
+    vetores float32 do rescoring ficam em RAM e entram em `memory_mb` (e na
+    compressão); a parte deles aparece também em `rescore_mb`.
+
+    Args:
+        vectors: Embeddings do corpus (n, d)
+        queries: Embeddings das queries (nq, d)
+        k: Tamanho do top-k
+        methods: Métodos a comparar
+        oversample: Fator de over-fetch do rescoring
+        store_dir: Diretório para os memmaps de rescoring (um por método)
+
+    Returns:
+        Lista de dicionários, um por configuração
+    """
+    x = _normalized(vectors)
+    q = _normalized(queries)
+    baseline = QuantizedIndex('flat').build(x)
+    _, expected = baseline.search(q, k)
+    flat_bytes = baseline.memory_bytes()
+
+    report = []
+    for method in methods:
+        for rescore in ((False,) if method == 'flat' else (False, True)):
+            level_dir = Path(store_dir) / method if (store_dir is not None and rescore) else None
+            index = QuantizedIndex(method, rescore=rescore, oversample=oversample, store_dir=level_dir).build(x)
+
+            start = time.perf_counter()
+            _, found = index.search(q, k)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(q)
+
+            hits = sum(len(set(f) & set(e)) for f, e in zip(found, expected))
+            memory = index.memory_bytes()
+            report.append({
+                'method': method,
+                'rescore': rescore,
+                'memory_mb': memory / 1024 ** 2,
+                'rescore_mb': index.rescore_bytes() / 1024 ** 2,
+                'compression': flat_bytes / memory if memory else float('inf'),
+                'build_s': index.build_time_s,
+                'latency_ms': latency_ms,
+                'recall': hits / expected.size,
+            })
+    return report
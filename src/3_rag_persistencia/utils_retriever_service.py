@@ -0,0 +1,394 @@
+"""
+Serviço de retrieval residente para RAG com FAISS.
+
+Nos labs 3.1 e 3.2, `rag_query()` chama `FAISS.load_local(...)` a cada
+pergunta: o índice e o docstore inteiros são lidos e "unpickled" de novo.
+Este módulo mantém o índice carregado em memória:
+
+- Carrega o índice uma única vez (singleton por diretório)
+- Detecta quando uma versão mais nova foi salva em disco e faz hot-swap
+  (funciona com `save_local` simples e com o diretório versionado do
+  `utils_incremental_index`)
+- Índices salvos com `save_local_sqlite` (`utils_docstore`) são abertos
+  com o docstore em SQLite: só o índice FAISS vai para a memória e a
+  carga não usa pickle. Se o `index.faiss` foi regravado depois por um
+  `save_local` simples, o `.sqlite` está velho e o `index.pkl` é usado
+- Reutiliza os clientes de embeddings e de LLM entre perguntas
+- Expõe opcionalmente endpoints HTTP `/health` e `/query`
+
+Uso no notebook:
+
+    service = get_retriever_service(FAISS_PATH, embeddings, llm=llm)
+    resposta, docs = service.query("Qual celular tem uma câmera boa?")
+
+Uso como servidor HTTP:
+
+    server, thread = start_http_server(service, port=8765)
+    # POST http://localhost:8765/query  {"question": "...", "k": 2}
+    # GET  http://localhost:8765/health
+"""
+
+import json
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils_docstore import docstore_matches_index, docstore_path, load_local_sqlite
+from utils_incremental_index import STATE_FILE, read_current_version
+
+DEFAULT_PROMPT = """
+Você é um assistente inteligente. Use APENAS o contexto abaixo para responder a pergunta do usuário.
+Se a resposta não estiver no contexto, diga educadamente que não possui essa informação.
+
+Contexto:
+{contexto}
+
+Pergunta: {pergunta}
+
+Resposta:"""
+
+
+# Erros de um índice lido no meio da escrita (arquivo truncado, par inconsistente)
+LOAD_ERRORS = (FileNotFoundError, EOFError, pickle.UnpicklingError, RuntimeError, ValueError)
+LOAD_RETRIES = 3
+LOAD_RETRY_DELAY = 0.05
+
+
+def build_prompt(pergunta: str, docs: List[Document]) -> str:
+    """Monta o prompt RAG no mesmo formato usado nos labs 3.1 e 3.2."""
+    contexto = "\n".join([f"- {doc.page_content}" for doc in docs])
+    return DEFAULT_PROMPT.format(contexto=contexto, pergunta=pergunta)
+
+
+class RetrieverService:
+    """
+    Mantém um índice FAISS carregado e o substitui quando há versão nova.
+
+    A verificação de versão é barata (um `stat` nos arquivos do índice) e
+    acontece no máximo uma vez a cada `check_interval` segundos. A troca é
+    feita carregando o novo índice por completo antes de substituir a
+    referência, então perguntas em andamento nunca veem um índice parcial.
+
+    Com `save_local` simples, `index.faiss` e `index.pkl` não são trocados
+    juntos: se os arquivos mudarem durante a carga, ou formarem um par
+    inconsistente, a carga é repetida. Prefira o diretório versionado
+    (`utils_incremental_index`), que troca a versão de uma vez.
+
+    Depois da troca, o docstore em SQLite do índice antigo é fechado assim
+    que a última busca em andamento nele termina.
+    """
+
+    def __init__(
+        self,
+        index_path: Union[str, Path],
+        embeddings: Embeddings,
+        llm: Any = None,
+        check_interval: float = 2.0,
+        prompt_builder: Callable[[str, List[Document]], str] = build_prompt,
+    ):
+        """
+        Args:
+            index_path: Diretório do `save_local` (ou raiz versionada com CURRENT)
+            embeddings: Modelo de embeddings reutilizado em todas as buscas
+            llm: Cliente LLM reutilizado (qualquer objeto com `.invoke`)
+            check_interval: Intervalo mínimo (s) entre verificações de versão
+            prompt_builder: Função que monta o prompt a partir dos documentos
+        """
+        self.index_path = Path(index_path)
+        self.embeddings = embeddings
+        self.llm = llm
+        self.check_interval = check_interval
+        self.prompt_builder = prompt_builder
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._vectorstore: Optional[FAISS] = None
+        self._signature: Optional[Tuple] = None
+        self._readers: Dict[int, int] = {}     # id(vectorstore) -> buscas em andamento
+        self._retired: Dict[int, FAISS] = {}   # substituídos, esperando as buscas terminarem
+        self._last_check = 0.0
+
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.queries = 0
+
+        self.reload(force=True)
+
+    # ------------------------------------------------------------------
+    # Carregamento e hot-swap
+    # ------------------------------------------------------------------
+
+    def _resolve_dir(self) -> Path:
+        """Retorna o diretório com index.faiss (segue o ponteiro CURRENT, se houver)."""
+        current = read_current_version(self.index_path)
+        return current if current is not None else self.index_path
+
+    def _disk_signature(self) -> Tuple:
+        index_dir = self._resolve_dir()
+        if not (index_dir / "index.faiss").exists() and (index_dir / STATE_FILE).exists():
+            return (str(index_dir), 'empty')  # versão vazia do IncrementalFAISSIndex
+        files = [index_dir / "index.faiss", docstore_path(index_dir), index_dir / "index.pkl"]
+        return (str(index_dir),) + tuple(f.stat().st_mtime_ns if f.exists() else None for f in files)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarrega o índice se a versão em disco mudou.
+
+        Args:
+            force: Recarrega mesmo sem mudança detectada
+
+        Returns:
+            True se um novo índice foi carregado
+        """
+        for attempt in range(LOAD_RETRIES):
+            signature = self._disk_signature()
+            if not force and signature == self._signature:
+                return False
+            try:
+                vectorstore = self._load(signature)
+                if self._disk_signature() == signature:
+                    break
+                error: Exception = RuntimeError("índice alterado durante a carga")
+            except LOAD_ERRORS as e:
+                error = e  # par index.faiss/index.pkl sendo escrito
+            time.sleep(LOAD_RETRY_DELAY * (attempt + 1))
+        else:
+            raise error
+
+        with self._lock:
+            old, self._vectorstore = self._vectorstore, vectorstore
+            self._signature = signature
+            self.loaded_at = time.time()
+            if not force:
+                self.reloads += 1
+            if old is not None and self._readers.get(id(old)):
+                self._retired[id(old)] = old
+                old = None
+        _close_docstore(old)
+        return True
+
+    def _load(self, signature: Tuple) -> Optional[FAISS]:
+        if signature[1:] == ('empty',):
+            return None
+        # Docstore em SQLite (save_local_sqlite) tem prioridade, se for do index.faiss atual
+        if docstore_matches_index(signature[0]) or not (Path(signature[0]) / "index.pkl").exists():
+            vectorstore = load_local_sqlite(signature[0], self.embeddings)
+        else:
+            vectorstore = FAISS.load_local(
+                signature[0],
+                self.embeddings,
+                allow_dangerous_deserialization=True,
+            )
+        if vectorstore.index.ntotal != len(vectorstore.index_to_docstore_id):
+            raise ValueError("index.faiss e docstore de versões diferentes")
+        return vectorstore
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        # Apenas uma thread verifica/recarrega; as demais seguem com o índice atual
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            self.reload()
+        except LOAD_ERRORS:
+            # Versão sendo escrita/removida: mantém o índice atual e tenta de novo
+            # na próxima verificação
+            pass
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def vectorstore(self) -> Optional[FAISS]:
+        """
+        Índice atualmente em uso (None se a versão atual estiver vazia).
+
+        Depois de um hot-swap o docstore em SQLite deste objeto é fechado:
+        para buscas, use `search`.
+        """
+        self._maybe_reload()
+        with self._lock:
+            return self._vectorstore
+
+    @contextmanager
+    def _acquire(self) -> Iterator[Optional[FAISS]]:
+        """Índice atual, protegido de ter o docstore fechado durante o uso."""
+        self._maybe_reload()
+        with self._lock:
+            vectorstore = self._vectorstore
+            key = id(vectorstore)
+            self._readers[key] = self._readers.get(key, 0) + 1
+        try:
+            yield vectorstore
+        finally:
+            retired = None
+            with self._lock:
+                self._readers[key] -= 1
+                if not self._readers[key]:
+                    del self._readers[key]
+                    retired = self._retired.pop(key, None)
+            _close_docstore(retired)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def search(self, pergunta: str, k: int = 2, **kwargs) -> List[Document]:
+        """Busca documentos relevantes no índice residente."""
+        with self._acquire() as vectorstore:
+            if vectorstore is None:
+                return []
+            return vectorstore.similarity_search(pergunta, k=k, **kwargs)
+
+    def query(self, pergunta: str, k: int = 2, llm: Any = None) -> Tuple[str, List[Document]]:
+        """
+        Realiza uma consulta RAG completa sem recarregar o índice.
+
+        Args:
+            pergunta: Pergunta do usuário
+            k: Número de documentos recuperados
+            llm: LLM alternativo para esta pergunta (padrão: o do serviço)
+
+        Returns:
+            (resposta, documentos_usados)
+        """
+        llm = llm or self.llm
+        if llm is None:
+            raise ValueError("Nenhum LLM configurado no serviço")
+
+        docs = self.search(pergunta, k=k)
+        resposta = llm.invoke(self.prompt_builder(pergunta, docs))
+        with self._lock:
+            self.queries += 1
+        # ChatModels retornam mensagens; LLMs retornam texto
+        return getattr(resposta, 'content', resposta), docs
+
+    def health(self) -> Dict[str, Any]:
+        """Estado do serviço para o endpoint `/health`."""
+        vectorstore = self.vectorstore
+        return {
+            'status': 'ok' if vectorstore is not None else 'empty',
+            'index_dir': self._signature[0] if self._signature else None,
+            'vectors': vectorstore.index.ntotal if vectorstore is not None else 0,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'queries': self.queries,
+        }
+
+
+def _close_docstore(vectorstore: Optional[FAISS]) -> None:
+    """Fecha a conexão do docstore (SQLiteDocstore); o InMemoryDocstore não tem o que fechar."""
+    close = getattr(getattr(vectorstore, 'docstore', None), 'close', None)
+    if close is not None:
+        close()
+
+
+_services: Dict[str, RetrieverService] = {}
+_services_lock = threading.Lock()
+
+
+def get_retriever_service(
+    index_path: Union[str, Path],
+    embeddings: Embeddings,
+    llm: Any = None,
+    **kwargs,
+) -> RetrieverService:
+    """
+    Retorna o serviço residente do diretório (cria na primeira chamada).
+
+    Chamadas seguintes com o mesmo diretório reutilizam o mesmo índice em
+    memória. Se `llm` for informado, substitui o LLM do serviço existente.
+    """
+    key = str(Path(index_path).resolve())
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = RetrieverService(index_path, embeddings, llm=llm, **kwargs)
+            _services[key] = service
+        elif llm is not None:
+            service.llm = llm
+    return service
+
+
+def _make_handler(service: RetrieverService):
+    class RetrieverHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, service.health())
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path not in ('/query', '/search'):
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(payload, dict):
+                    raise ValueError("o corpo deve ser um objeto JSON")
+                question = payload['question']
+                k = int(payload.get('k', 2))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {'error': f'payload inválido: {e}'})
+                return
+
+            start = time.perf_counter()
+            try:
+                if self.path == '/search':
+                    answer, docs = None, service.search(question, k=k)
+                else:
+                    answer, docs = service.query(question, k=k)
+            except Exception as e:
+                self._send_json(500, {'error': f'{type(e).__name__}: {e}'})
+                return
+            self._send_json(200, {
+                'answer': answer,
+                'sources': [{'content': d.page_content, 'metadata': d.metadata} for d in docs],
+                'latency_ms': (time.perf_counter() - start) * 1000,
+            })
+
+        def log_message(self, format, *args):
+            pass  # Silencia o log padrão por request
+
+    return RetrieverHandler
+
+
+def start_http_server(
+    service: RetrieverService,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """
+    Inicia o servidor HTTP do serviço em uma thread de fundo.
+
+    Endpoints:
+        GET  /health  → estado do índice
+        POST /search  → {"question": str, "k": int} → documentos
+        POST /query   → {"question": str, "k": int} → resposta + documentos
+
+    Returns:
+        (servidor, thread). Use `server.shutdown()` para parar.
+    """
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
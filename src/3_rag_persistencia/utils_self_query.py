@@ -0,0 +1,187 @@
+"""
+Extração de filtros de metadados (self-querying) com caminho determinístico.
+
+O `extract_metadata_filters` do Lab 3.7 chama o LLM a CADA pergunta só
+para descobrir `doc_type` e `year`, e depois procura o JSON na resposta
+com regex. Essa chamada costuma ser a maior latência antes da busca.
+
+Este módulo oferece:
+
+- `doc_type_from_filename`: classifica o arquivo na ingestão com o mesmo
+  vocabulário das regras, para que um filtro `doc_type='manual'` também
+  encontre os guias e tutoriais
+- `extract_filters_by_rules`: regras com o mesmo vocabulário do
+  `extract_metadata_from_path` (manual/guia/tutorial, relatorio/report,
+  artigo/paper, receita/recipe e anos de 4 dígitos começando com 20).
+  Responde em microssegundos ou devolve None quando a pergunta é ambígua
+- `MetadataFilterExtractor`: usa as regras e só chama o LLM nos casos
+  ambíguos, guardando as respostas em um cache LRU por pergunta
+  normalizada. Cada extração informa o caminho usado
+  ('rules', 'cache' ou 'llm')
+
+Uso:
+
+    extractor = MetadataFilterExtractor(lambda q: extract_metadata_filters(q, llm))
+    semantic_query, filters, path = extractor.extract("Manuais de 2025 sobre futebol")
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Mesmas palavras-chave de extract_metadata_from_path (com plurais)
+DOC_TYPE_PATTERNS: Dict[str, str] = {
+    'manual': r"manua(?:l|is)|guias?|tutoria(?:l|is)",
+    'relatorio': r"relat[oó]rios?|reports?",
+    'artigo': r"artigos?|papers?|articles?",
+    'receita': r"receitas?|recipes?",
+}
+
+_PREPOSITION = r"(?:\b(?:de|do|da|dos|das|em|no|na|nos|nas)\s+)?"
+_YEAR_RE = re.compile(_PREPOSITION + r"\b(20\d{2})\b", re.IGNORECASE)
+
+# Expressões que as regras não sabem resolver (intervalos de anos, tempo relativo)
+_AMBIGUOUS_RE = re.compile(
+    r"\b(?:ano passado|(?:neste|deste|este|esse|nesse) ano|recentes?|[uú]ltim[oa]s?|"
+    r"mais (?:novos?|novas?|antigos?|antigas?)|"
+    r"(?:antes d[eoa]|depois d[eoa]|a partir d[eoa]|desde|entre|at[eé])\s+(?:o ano (?:de )?)?20\d{2})\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Chave do cache: minúsculas, sem acentos, espaços e pontuação final normalizados."""
+    text = unicodedata.normalize('NFD', query.lower())
+    text = "".join(c for c in text if unicodedata.category(c) != 'Mn')
+    return re.sub(r"\s+", " ", text).strip(" ?!.")
+
+
+def doc_type_from_filename(
+    filename: str,
+    doc_types: Sequence[str] = tuple(DOC_TYPE_PATTERNS),
+    default: str = "documento",
+) -> str:
+    """
+    Tipo do documento pelo nome do arquivo (ex: "guia_futebol_2024" → 'manual').
+
+    Args:
+        filename: Nome do arquivo (com ou sem extensão)
+        doc_types: Tipos reconhecidos (os demais caem no `default`)
+        default: Tipo quando nenhuma palavra-chave aparece
+
+    Returns:
+        Tipo do documento
+    """
+    for doc_type, pattern in DOC_TYPE_PATTERNS.items():
+        # Sem \b: em "manual_futebol" o "_" conta como letra para o regex
+        if doc_type in doc_types and re.search(pattern, filename, re.IGNORECASE):
+            return doc_type
+    return default
+
+
+def extract_filters_by_rules(
+    query: str,
+    doc_types: Sequence[str] = tuple(DOC_TYPE_PATTERNS),
+) -> Optional[Tuple[str, Dict]]:
+    """
+    Extrai `doc_type` e `year` da pergunta sem LLM.
+
+    Args:
+        query: Pergunta do usuário
+        doc_types: Tipos aceitos como filtro (tipos fora da lista são ignorados,
+            como na validação da resposta do LLM)
+
+    Returns:
+        (query_semântica, filtros), ou None se a pergunta for ambígua
+        (mais de um tipo ou ano, ou expressões como "ano passado")
+    """
+    if _AMBIGUOUS_RE.search(query):
+        return None
+
+    filters: Dict = {}
+    semantic_query = query
+
+    found_types = [
+        doc_type for doc_type, pattern in DOC_TYPE_PATTERNS.items()
+        if re.search(rf"\b(?:{pattern})\b", query, re.IGNORECASE)
+    ]
+    years = set(_YEAR_RE.findall(query))
+    if len(found_types) > 1 or len(years) > 1:
+        return None
+
+    if found_types and found_types[0] in doc_types:
+        filters['doc_type'] = found_types[0]
+        semantic_query = re.sub(
+            rf"\b(?:{DOC_TYPE_PATTERNS[found_types[0]]})\b", " ", semantic_query, flags=re.IGNORECASE,
+        )
+    if years:
+        filters['year'] = int(years.pop())
+        semantic_query = _YEAR_RE.sub(" ", semantic_query)
+
+    semantic_query = re.sub(r"\s+", " ", semantic_query).strip(" ,;:")
+    if not re.search(r"\w", semantic_query.rstrip("?!.")):
+        semantic_query = query
+    return semantic_query, filters
+
+
+class MetadataFilterExtractor:
+    """
+    Self-querying com regras determinísticas, fallback no LLM e cache LRU.
+    """
+
+    def __init__(
+        self,
+        llm_extract: Callable[[str], Tuple[str, Dict]],
+        doc_types: Sequence[str] = tuple(DOC_TYPE_PATTERNS),
+        cache_size: int = 256,
+    ):
+        """
+        Args:
+            llm_extract: Extração via LLM, chamada só nos casos ambíguos
+                (ex: `lambda q: extract_metadata_filters(q, llm)`)
+            doc_types: Tipos de documento aceitos pelas regras
+            cache_size: Máximo de respostas do LLM em cache
+        """
+        self.llm_extract = llm_extract
+        self.doc_types = tuple(doc_types)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, Tuple[str, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'rules': 0, 'cache': 0, 'llm': 0}
+
+    def extract(self, query: str) -> Tuple[str, Dict, str]:
+        """
+        Extrai os filtros da pergunta.
+
+        Returns:
+            (query_semântica, filtros, caminho), com caminho em
+            'rules', 'cache' ou 'llm'
+        """
+        result = extract_filters_by_rules(query, self.doc_types)
+        if result is not None:
+            self.stats['rules'] += 1
+            return result[0], dict(result[1]), 'rules'
+
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache'] += 1
+                return cached[0], dict(cached[1]), 'cache'
+
+        semantic_query, filters = self.llm_extract(query)
+        with self._lock:
+            self._cache[key] = (semantic_query, dict(filters))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.stats['llm'] += 1
+        return semantic_query, dict(filters), 'llm'
+
+    def __call__(self, query: str) -> Tuple[str, Dict]:
+        """Mesma assinatura de retorno do `extract_metadata_filters` do lab."""
+        semantic_query, filters, _ = self.extract(query)
+        return semantic_query, filters
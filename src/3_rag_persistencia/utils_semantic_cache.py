@@ -0,0 +1,373 @@
+"""
+Cache semântico de respostas na frente das chains RAG.
+
+A `rag_chain` LCEL dos labs 3.5, 3.6 e 4.1 executa retrieval + geração
+completa no `OllamaLLM` a cada pergunta, inclusive para perguntas quase
+idênticas que os usuários repetem. A geração domina a latência.
+
+Este módulo oferece:
+
+- `SemanticCache`: embeda a pergunta e procura a pergunta em cache mais
+  próxima (similaridade de cosseno). Acima do `threshold`, devolve a
+  resposta e as fontes guardadas
+  - Tamanho limitado (LRU), TTL por entrada e métricas de hit ratio
+  - Invalidação automática quando a versão do índice muda (`version_fn`)
+- `IndexVersion`: `version_fn` local, um contador incrementado a cada
+  `add_*`/`delete` do vectorstore (o `ntotal` não muda em um `delete`
+  seguido de `add`)
+- `cached_version`: `version_fn` remoto (ex: `points_count` do Qdrant)
+  consultado no máximo uma vez a cada `ttl_seconds`, e não a cada pergunta
+- `build_cached_rag_chain`: Runnable que consulta o cache, e só em caso de
+  miss faz o retrieval (reaproveitando o embedding da pergunta) e a geração
+- `run_cache_demo`: demonstração dos labs (perguntas repetidas + métricas)
+
+Uso:
+
+    cache = SemanticCache(embeddings, threshold=0.92, version_fn=IndexVersion(vectorstore))
+    chain = build_cached_rag_chain(retriever, prompt | llm | StrOutputParser(), cache, format_docs)
+    result = chain.invoke("Quais são as formações do futebol?")
+    result['answer'], result['sources'], result['cached']
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.vectorstores import VectorStoreRetriever
+
+
+MUTATING_METHODS = ('add_texts', 'add_documents', 'add_embeddings', 'delete', 'merge_from')
+
+DEMO_QUESTIONS = (
+    "Quais são as principais formações táticas do futebol?",
+    "Quais são as principais formações táticas no futebol?",
+    "quais são as principais formações táticas do futebol",
+    "Como fazer uma lasanha?",
+)
+
+
+class IndexVersion:
+    """
+    Versão do índice para o `version_fn`: contador de mutações.
+
+    `IndexVersion(vectorstore)` envolve os métodos de escrita da instância
+    (`add_texts`, `add_documents`, `add_embeddings`, `delete`,
+    `merge_from`), então toda mutação feita por eles incrementa a versão.
+    Escritas por outros caminhos (outro processo, cliente direto) devem
+    chamar `bump()`.
+    """
+
+    def __init__(self, vectorstore: Any = None):
+        """
+        Args:
+            vectorstore: Vectorstore monitorado (opcional)
+        """
+        self.value = 0
+        self._lock = threading.Lock()
+        if vectorstore is not None:
+            self.track(vectorstore)
+
+    def __call__(self) -> int:
+        return self.value
+
+    def bump(self) -> int:
+        """Incrementa a versão (invalida os caches que a usam)."""
+        with self._lock:
+            self.value += 1
+            return self.value
+
+    def track(self, vectorstore: Any) -> None:
+        """Incrementa a versão a cada chamada dos métodos de escrita do vectorstore."""
+        for name in MUTATING_METHODS:
+            method = getattr(vectorstore, name, None)
+            if method is None:
+                continue
+
+            def tracked(*args, _method=method, **kwargs):
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    self.bump()
+
+            object.__setattr__(vectorstore, name, tracked)
+
+
+def cached_version(
+    version_fn: Callable[[], Any],
+    ttl_seconds: float = 10.0,
+    clock: Callable[[], float] = time.monotonic,
+) -> Callable[[], Any]:
+    """
+    Envolve um `version_fn` caro (ex: round-trip ao Qdrant) com um TTL.
+
+    Args:
+        version_fn: Função que consulta a versão
+        ttl_seconds: Tempo que o valor lido é reutilizado
+        clock: Relógio (injetável nos testes)
+
+    Returns:
+        Função sem argumentos com a versão (no máximo `ttl_seconds` atrasada)
+    """
+    lock = threading.Lock()
+    state = {'value': None, 'expires': float('-inf')}
+
+    def version() -> Any:
+        with lock:
+            now = clock()
+            if now >= state['expires']:
+                state['value'] = version_fn()
+                state['expires'] = now + ttl_seconds
+            return state['value']
+
+    return version
+
+
+class SemanticCache:
+    """
+    Cache de respostas indexado pelo embedding da pergunta.
+
+    Os embeddings ficam em uma matriz numpy pré-alocada (`max_entries × d`)
+    e a busca é um único produto matriz-vetor.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.92,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        version_fn: Optional[Callable[[], Any]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            embeddings: Modelo usado para embedar as perguntas
+            threshold: Similaridade de cosseno mínima para um hit
+            max_entries: Máximo de respostas guardadas (LRU)
+            ttl_seconds: Validade de cada entrada (None = sem expiração)
+            version_fn: Retorna a versão atual do índice; se mudar, o cache é
+                esvaziado. Chamado a cada lookup/store: use algo barato
+                (`IndexVersion`, `cached_version`)
+            clock: Relógio (injetável nos testes)
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn
+        self.clock = clock
+
+        self._vectors: Optional[np.ndarray] = None
+        self._created = np.full(max_entries, np.nan)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._lru: 'OrderedDict[int, None]' = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def embed(self, question: str) -> np.ndarray:
+        """Embedding da pergunta (pode ser repassado ao retrieval)."""
+        return np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _release(self, slot: int) -> None:
+        self._entries[slot] = None
+        self._created[slot] = np.nan
+        self._lru.pop(slot, None)
+        self._free.append(slot)
+
+    def _check_version(self) -> None:
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            if self._lru:
+                self._stats['invalidations'] += 1
+            for slot in list(self._lru):
+                self._release(slot)
+            self._version = version
+
+    def _expire(self) -> None:
+        if self.ttl_seconds is None:
+            return
+        expired = np.flatnonzero(self._created < self.clock() - self.ttl_seconds)
+        for slot in expired:
+            self._release(int(slot))
+        self._stats['expirations'] += len(expired)
+
+    def lookup(self, question: str, vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Procura uma pergunta semelhante no cache.
+
+        Args:
+            question: Pergunta do usuário
+            vector: Embedding já calculado (evita uma chamada ao modelo)
+
+        Returns:
+            {'answer', 'sources', 'question', 'similarity'} ou None (miss)
+        """
+        query = self._normalize(self.embed(question) if vector is None else np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._check_version()
+            self._expire()
+            if not self._lru:
+                self._stats['misses'] += 1
+                return None
+
+            slots = np.fromiter(self._lru, dtype=np.int64, count=len(self._lru))
+            similarities = self._vectors[slots] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self._stats['misses'] += 1
+                return None
+
+            slot = int(slots[best])
+            self._lru.move_to_end(slot)
+            self._stats['hits'] += 1
+            entry = self._entries[slot]
+            return {**entry, 'similarity': float(similarities[best])}
+
+    def store(
+        self,
+        question: str,
+        answer: Any,
+        sources: Sequence[Document] = (),
+        vector: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Guarda a resposta de uma pergunta (descarta a entrada menos usada se cheio).
+
+        Args:
+            question: Pergunta do usuário
+            answer: Resposta gerada
+            sources: Documentos usados como contexto
+            vector: Embedding já calculado da pergunta
+        """
+        vector = self._normalize(self.embed(question) if vector is None else np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if not self._free:
+                oldest, _ = self._lru.popitem(last=False)
+                self._release(oldest)
+                self._stats['evictions'] += 1
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._created[slot] = self.clock()
+            self._entries[slot] = {'question': question, 'answer': answer, 'sources': list(sources)}
+            self._lru[slot] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in list(self._lru):
+                self._release(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses, hit ratio, entradas e descartes (LRU, TTL, versão)."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._lru),
+                'max_entries': self.max_entries,
+            }
+
+
+def _retrieve(retriever, question: str, vector: np.ndarray, cache: SemanticCache) -> List[Document]:
+    # Reaproveita o embedding da pergunta quando o retriever usa o mesmo modelo
+    if (
+        isinstance(retriever, VectorStoreRetriever)
+        and retriever.search_type == 'similarity'
+        and getattr(retriever.vectorstore, 'embeddings', None) is cache.embeddings
+    ):
+        return retriever.vectorstore.similarity_search_by_vector(vector.tolist(), **retriever.search_kwargs)
+    return retriever.invoke(question)
+
+
+def build_cached_rag_chain(
+    retriever,
+    answer_chain: Runnable,
+    cache: SemanticCache,
+    format_docs: Callable[[List[Document]], str],
+) -> Runnable:
+    """
+    Monta a chain RAG com o cache semântico na frente.
+
+    Args:
+        retriever: Retriever do vectorstore
+        answer_chain: Geração a partir de {'context', 'question'}
+            (ex: `prompt | llm | StrOutputParser()`)
+        cache: Cache semântico
+        format_docs: Converte os documentos no texto do contexto
+
+    Returns:
+        Runnable: pergunta → {'answer', 'sources', 'cached', 'similarity', 'latency_ms'}
+    """
+    def run(question: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        vector = cache.embed(question)
+        hit = cache.lookup(question, vector)
+        if hit is not None:
+            return {
+                'answer': hit['answer'], 'sources': hit['sources'], 'cached': True,
+                'similarity': hit['similarity'], 'latency_ms': (time.perf_counter() - start) * 1000,
+            }
+
+        docs = _retrieve(retriever, question, vector, cache)
+        answer = answer_chain.invoke({'context': format_docs(docs), 'question': question})
+        cache.store(question, answer, docs, vector)
+        return {
+            'answer': answer, 'sources': docs, 'cached': False,
+            'similarity': None, 'latency_ms': (time.perf_counter() - start) * 1000,
+        }
+
+    return RunnableLambda(run, name="CachedRAGChain")
+
+
+def run_cache_demo(
+    cached_chain: Runnable,
+    cache: SemanticCache,
+    questions: Sequence[str] = DEMO_QUESTIONS,
+) -> List[Dict[str, Any]]:
+    """
+    Executa perguntas repetidas na chain com cache e imprime hits/misses.
+
+    Args:
+        cached_chain: Chain de `build_cached_rag_chain`
+        cache: Cache usado pela chain
+        questions: Perguntas (variações da mesma pergunta geram hits)
+
+    Returns:
+        Resultados da chain, um por pergunta
+    """
+    print("=" * 80)
+    print("⚡ CACHE SEMÂNTICO")
+    print("=" * 80)
+    results = []
+    for question in questions:
+        result = cached_chain.invoke(question)
+        origin = f"💾 cache (sim={result['similarity']:.3f})" if result['cached'] else "🤖 LLM"
+        print(f"\n❓ {question}")
+        print(f"   {origin} | {result['latency_ms']:.0f} ms | {len(result['sources'])} fontes")
+        results.append(result)
+
+    stats = cache.stats()
+    print(f"\n📊 Hits: {stats['hits']} | Misses: {stats['misses']} | "
+          f"Hit rate: {stats['hit_rate']*100:.1f}% | Entradas: {stats['entries']}")
+    print("=" * 80)
+    return results
@@ -0,0 +1,190 @@
+"""
+Streaming de respostas RAG com tempo até o primeiro token (TTFT).
+
+`SelfQueryingRAGChatbot.chat` (lab 3.7) e a `rag_chain` LCEL
+(`... | llm | StrOutputParser()`) só retornam depois que o LLM gerou a
+resposta inteira: o usuário encara a tela parada por vários segundos, e
+não dá para saber se o tempo foi gasto no self-query, no embedding, na
+busca ou na geração.
+
+Este módulo oferece:
+
+- `stream_rag`: gerador de eventos de uma pergunta RAG
+  - `sources` primeiro: documentos recuperados (e filtros), antes do LLM
+  - `token` a cada pedaço de texto que chega do `llm.stream`
+  - `done` no final: resposta completa + `timings`
+- `timings` por estágio, em ms: `filter_ms`, `embed_ms`, `search_ms`,
+  `rerank_ms`, `prompt_ms`, `ttft_ms` (do início da pergunta até o
+  primeiro token, a latência percebida), `generation_ms` (do início do
+  `llm.stream` até o último token) e `total_ms`
+- `consume_stream`: consome os eventos (ex: imprimindo os tokens) e
+  devolve o evento `done`
+- `format_timings`: uma linha legível com o breakdown
+- Com `metrics` (`utils_instrumentation.Metrics`), os tempos viram as
+  etapas `filter`, `embed_query`, `retrieve`, `rerank`, `prompt_build`,
+  `ttft` e `generate`
+
+Funciona com `OllamaLLM` (pedaços `str`) e com chat models (`AIMessageChunk`).
+
+Uso:
+
+    for event in stream_rag(pergunta, vectorstore, prompt, llm, k=4):
+        if event['type'] == 'token':
+            print(event['text'], end="", flush=True)
+        elif event['type'] == 'done':
+            print(format_timings(event['timings']))
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils_instrumentation import Metrics, record_timings
+
+STAGES = ('filter_ms', 'embed_ms', 'search_ms', 'rerank_ms', 'prompt_ms', 'ttft_ms', 'generation_ms', 'total_ms')
+
+# Chave de `timings` → etapa registrada no `Metrics`
+METRIC_STAGES = {
+    'filter_ms': 'filter', 'embed_ms': 'embed_query', 'search_ms': 'retrieve', 'rerank_ms': 'rerank',
+    'prompt_ms': 'prompt_build', 'ttft_ms': 'ttft', 'generation_ms': 'generate',
+}
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], key: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = (time.perf_counter() - start) * 1000
+
+
+def format_context(docs: List[Document]) -> str:
+    """Contexto no formato do lab 3.7: `[Fonte: ..., Página: ...]` + conteúdo."""
+    return "\n\n---\n\n".join(
+        f"[Fonte: {doc.metadata.get('source', 'N/A')}, Página: {doc.metadata.get('page', 'N/A')}]\n{doc.page_content}"
+        for doc in docs
+    )
+
+
+def _chunk_text(chunk: Any) -> str:
+    text = getattr(chunk, 'content', chunk)  # AIMessageChunk → content; OllamaLLM → str
+    return text if isinstance(text, str) else str(text)
+
+
+def stream_rag(
+    question: str,
+    vectorstore,
+    prompt,
+    llm,
+    embeddings: Optional[Embeddings] = None,
+    k: int = 4,
+    extract_filters: Optional[Callable[[str], Tuple[str, Optional[Dict[str, Any]]]]] = None,
+    rerank: Optional[Callable[[str, List[Document]], List[Document]]] = None,
+    format_docs: Callable[[List[Document]], str] = format_context,
+    prompt_inputs: Optional[Dict[str, Any]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Responde uma pergunta em streaming, medindo cada estágio.
+
+    Args:
+        question: Pergunta do usuário
+        vectorstore: Vectorstore com `similarity_search_by_vector` (FAISS, Qdrant...)
+        prompt: Template com as variáveis `context` e `question`
+        llm: Modelo com `.stream` (ex: OllamaLLM)
+        embeddings: Modelo de embeddings (None = `vectorstore.embeddings`)
+        k: Documentos recuperados
+        extract_filters: Self-query opcional: pergunta → (query semântica, filtros)
+        rerank: Reranking opcional: (query, documentos) → documentos
+        format_docs: Converte os documentos no texto do contexto
+        prompt_inputs: Variáveis extras do prompt (ex: `chat_history`)
+        metrics: Coletor onde os tempos de cada estágio são registrados (opcional)
+
+    Yields:
+        {'type': 'sources', 'documents', 'query', 'filters'}, depois
+        {'type': 'token', 'text'} para cada pedaço e, por fim,
+        {'type': 'done', 'answer', 'documents', 'timings'}
+    """
+    embeddings = embeddings or vectorstore.embeddings
+    timings: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+    start = time.perf_counter()
+
+    query, filters = question, None
+    if extract_filters is not None:
+        with _timed(timings, 'filter_ms'):
+            query, filters = extract_filters(question)
+
+    with _timed(timings, 'embed_ms'):
+        vector = embeddings.embed_query(query)
+
+    with _timed(timings, 'search_ms'):
+        search_kwargs = {'filter': filters} if filters else {}
+        docs = vectorstore.similarity_search_by_vector(vector, k=k, **search_kwargs)
+
+    if rerank is not None:
+        with _timed(timings, 'rerank_ms'):
+            docs = rerank(query, docs)
+
+    # As fontes saem antes da geração: a interface já pode mostrá-las
+    yield {'type': 'sources', 'documents': docs, 'query': query, 'filters': filters}
+
+    with _timed(timings, 'prompt_ms'):
+        prompt_value = prompt.invoke({**(prompt_inputs or {}), 'context': format_docs(docs), 'question': question})
+
+    parts = []
+    generation_start = time.perf_counter()
+    for chunk in llm.stream(prompt_value):
+        text = _chunk_text(chunk)
+        if not text:
+            continue
+        if not parts:
+            timings['ttft_ms'] = (time.perf_counter() - start) * 1000
+        parts.append(text)
+        yield {'type': 'token', 'text': text}
+    timings['generation_ms'] = (time.perf_counter() - generation_start) * 1000
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+    if not parts:
+        timings['ttft_ms'] = timings['total_ms']
+    if metrics is not None:
+        record_timings(metrics, timings, METRIC_STAGES)
+
+    yield {'type': 'done', 'answer': "".join(parts), 'documents': docs, 'timings': timings}
+
+
+def consume_stream(
+    events: Iterator[Dict[str, Any]],
+    on_token: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Consome os eventos de `stream_rag`.
+
+    Args:
+        events: Gerador de eventos
+        on_token: Chamado com cada pedaço de texto (ex: `print(..., end="")`)
+
+    Returns:
+        O evento `done` (resposta, documentos e timings)
+    """
+    done: Dict[str, Any] = {}
+    for event in events:
+        if event['type'] == 'token' and on_token is not None:
+            on_token(event['text'])
+        elif event['type'] == 'done':
+            done = event
+    return done
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Breakdown de latência em uma linha (estágios zerados são omitidos)."""
+    labels = {
+        'filter_ms': 'filtros', 'embed_ms': 'embedding', 'search_ms': 'busca', 'rerank_ms': 'rerank',
+        'prompt_ms': 'prompt', 'ttft_ms': 'TTFT', 'generation_ms': 'geração', 'total_ms': 'total',
+    }
+    return " | ".join(
+        f"{labels[key]}: {timings[key]:.0f}ms" for key in STAGES
+        if timings.get(key) or key in ('ttft_ms', 'total_ms')
+    )
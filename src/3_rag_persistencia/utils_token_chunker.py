@@ -0,0 +1,275 @@
+"""
+Chunking por orçamento de tokens, com tokenização em lote.
+
+No Lab 3.3, `calc_tokens`, `calc_chunks` e `perform_rag_analysis` criam um
+`RecursiveCharacterTextSplitter(length_function=len)` novo a cada chamada
+e tokenizam texto por texto; `calc_tokens_bertugues` depende de um
+tokenizer/modelo BERT carregados em variáveis globais do notebook. Em um
+corpus grande o chunking vira uma fração visível do tempo de ingestão, e
+os tokens de cada chunk são recontados depois.
+
+Este módulo oferece:
+
+- Registro por processo de tokenizers e modelos (`get_encoding`,
+  `get_hf_tokenizer`, `get_hf_model`): cada um é carregado uma única vez
+- `TokenChunker`: divide pelo número de TOKENS (não de caracteres)
+  - Todos os documentos de um lote são tokenizados em uma única chamada
+    `encode_ordinary_batch` (paralela entre documentos, em threads nativas)
+  - O documento é tokenizado uma vez só; os chunks são janelas sobre os
+    IDs, com o corte ajustado para fim de parágrafo/linha/frase/palavra
+  - Nenhum corte cai no meio de um caractere UTF-8 (acentos e emojis
+    ocupam vários bytes, e às vezes vários tokens)
+  - Cada chunk sai com `metadata['token_count']` do texto final, contado
+    em lote: etapas seguintes não precisam tokenizar de novo
+  - Compatível com a interface dos splitters do LangChain
+    (`split_text`, `split_documents`), então pode ser passado para
+    `run_ingestion_pipeline`
+
+Uso:
+
+    chunker = TokenChunker("cl100k_base", chunk_size=256, chunk_overlap=32)
+    chunks = chunker.split_documents(pages)
+    chunks[0].metadata['token_count']
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+_REGISTRY: Dict[Tuple[str, str], Any] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# Pontuação do corte logo após um token: quanto maior, melhor o ponto de corte
+_PARAGRAPH, _LINE, _SENTENCE, _WORD = 4, 3, 2, 1
+_SENTENCE_ENDINGS = (b'.', b'!', b'?', b';', b':')
+
+
+def _get_or_load(kind: str, name: str, loader: Callable[[], Any]) -> Any:
+    key = (kind, name)
+    if key not in _REGISTRY:
+        with _REGISTRY_LOCK:
+            if key not in _REGISTRY:
+                _REGISTRY[key] = loader()
+    return _REGISTRY[key]
+
+
+def get_encoding(name: str = "cl100k_base"):
+    """
+    Encoding do tiktoken, carregado uma vez por processo.
+
+    Args:
+        name: Nome do encoding (ex: cl100k_base, p50k_base)
+
+    Returns:
+        `tiktoken.Encoding`
+    """
+    def load():
+        import tiktoken
+        return tiktoken.get_encoding(name)
+
+    return _get_or_load('tiktoken', name, load)
+
+
+def get_hf_tokenizer(model_name: str = "ricardoz/BERTugues-base-portuguese-cased", **kwargs):
+    """
+    Tokenizer do Hugging Face (ex: BERTugues), carregado uma vez por processo.
+
+    Args:
+        model_name: Nome do modelo no Hugging Face Hub
+        **kwargs: Repassados para `AutoTokenizer.from_pretrained` na primeira carga
+
+    Returns:
+        Tokenizer do `transformers`
+    """
+    def load():
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name, **kwargs)
+
+    return _get_or_load('hf_tokenizer', model_name, load)
+
+
+def get_hf_model(model_name: str = "ricardoz/BERTugues-base-portuguese-cased"):
+    """
+    Modelo do Hugging Face (ex: BERTugues) em modo de inferência, carregado uma vez.
+
+    Args:
+        model_name: Nome do modelo no Hugging Face Hub
+
+    Returns:
+        Modelo do `transformers` (`eval()`)
+    """
+    def load():
+        from transformers import AutoModel
+        return AutoModel.from_pretrained(model_name).eval()
+
+    return _get_or_load('hf_model', model_name, load)
+
+
+def count_tokens(texts: Sequence[str], encoding: Union[str, Any] = "cl100k_base", num_threads: int = 8) -> List[int]:
+    """
+    Conta os tokens de vários textos em uma única chamada em lote.
+
+    Args:
+        texts: Textos a contar
+        encoding: Nome do encoding ou objeto `tiktoken.Encoding`
+        num_threads: Threads do `encode_ordinary_batch`
+
+    Returns:
+        Número de tokens de cada texto
+    """
+    encoding = get_encoding(encoding) if isinstance(encoding, str) else encoding
+    return [len(ids) for ids in encoding.encode_ordinary_batch(list(texts), num_threads=num_threads)]
+
+
+def _break_scores(token_bytes: List[bytes]) -> np.ndarray:
+    """Qualidade de cortar logo após cada token (0 = meio de palavra)."""
+    scores = np.zeros(len(token_bytes), dtype=np.int8)
+    for i, piece in enumerate(token_bytes):
+        if b'\n\n' in piece:
+            scores[i] = _PARAGRAPH
+        elif b'\n' in piece:
+            scores[i] = _LINE
+        elif piece.rstrip().endswith(_SENTENCE_ENDINGS):
+            scores[i] = _SENTENCE
+        elif i + 1 < len(token_bytes) and token_bytes[i + 1][:1].isspace():
+            scores[i] = _WORD
+    return scores
+
+
+def _nearest_boundary(char_boundary: np.ndarray, index: int, lo: int, hi: int) -> int:
+    """Limite de caractere mais próximo de `index` em [lo, hi], preferindo recuar."""
+    for candidate in range(index, lo - 1, -1):
+        if char_boundary[candidate]:
+            return candidate
+    for candidate in range(index + 1, hi + 1):
+        if char_boundary[candidate]:
+            return candidate
+    return hi
+
+
+class TokenChunker:
+    """
+    Splitter por orçamento de tokens com tokenização em lote.
+
+    `chunk_size` e `chunk_overlap` são medidos em tokens do `encoding`.
+    O corte de cada chunk é o melhor limite (parágrafo > linha > frase >
+    palavra) dentro da metade final da janela; sem limite, corta no último
+    token que termina um caractere UTF-8.
+    """
+
+    def __init__(
+        self,
+        encoding: Union[str, Any] = "cl100k_base",
+        chunk_size: int = 256,
+        chunk_overlap: int = 32,
+        num_threads: int = 8,
+        batch_size: int = 256,
+    ):
+        """
+        Args:
+            encoding: Nome do encoding do tiktoken ou objeto com
+                `encode_ordinary_batch` e `decode_tokens_bytes`
+            chunk_size: Máximo de tokens por chunk
+            chunk_overlap: Tokens repetidos entre chunks consecutivos
+            num_threads: Threads usadas na tokenização em lote
+            batch_size: Documentos tokenizados por chamada
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) deve ser menor que chunk_size ({chunk_size})")
+        self.encoding = get_encoding(encoding) if isinstance(encoding, str) else encoding
+        self.encoding_name = getattr(self.encoding, 'name', str(encoding))
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.stats = {'documents': 0, 'chunks': 0, 'tokens': 0}
+
+    def _windows(self, scores: np.ndarray, char_boundary: np.ndarray) -> List[Tuple[int, int]]:
+        n = len(scores)
+        windows = []
+        start = 0
+        while start < n:
+            end = min(start + self.chunk_size, n)
+            if end < n:
+                lo = start + self.chunk_size // 2
+                region = scores[lo:end][::-1]  # de trás para frente: empate fica com o corte mais tardio
+                best = int(np.argmax(region))
+                if region[best] > 0:
+                    end = end - best
+                else:
+                    end = _nearest_boundary(char_boundary, end, start + 1, n)
+            windows.append((start, end))
+            if end == n:
+                break
+            next_start = _nearest_boundary(char_boundary, max(end - self.chunk_overlap, start + 1), start + 1, end)
+            # Começa a sobreposição em um limite de palavra, se houver
+            boundaries = np.flatnonzero(scores[next_start - 1:end - 1] > 0)
+            start = next_start + int(boundaries[0]) if len(boundaries) and self.chunk_overlap else next_start
+        return windows
+
+    def _chunk_encoded(self, text: str, ids: List[int]) -> List[str]:
+        if not ids:
+            return []
+        token_bytes = self.encoding.decode_tokens_bytes(ids)
+        offsets = np.concatenate([[0], np.cumsum([len(b) for b in token_bytes])])
+        raw = text.encode('utf-8')
+        # Bytes de continuação (10xxxxxx) não começam caractere: cortar ali o partiria
+        char_boundary = np.array([offset == len(raw) or raw[offset] & 0xC0 != 0x80 for offset in offsets])
+        chunks = []
+        scores = np.where(char_boundary[1:], _break_scores(token_bytes), 0)
+        for start, end in self._windows(scores, char_boundary):
+            content = raw[offsets[start]:offsets[end]].decode('utf-8').strip()
+            if content:
+                chunks.append(content)
+        return chunks
+
+    def _split_batch(self, texts: List[str]) -> List[List[Tuple[str, int]]]:
+        encoded = self.encoding.encode_ordinary_batch(texts, num_threads=self.num_threads)
+        contents = [self._chunk_encoded(text, ids) for text, ids in zip(texts, encoded)]
+        # O texto final (sem os espaços das bordas) é recontado em um único lote
+        counts = iter(count_tokens([c for chunks in contents for c in chunks], self.encoding, self.num_threads))
+        results = [[(content, next(counts)) for content in chunks] for chunks in contents]
+        self.stats['documents'] += len(texts)
+        self.stats['chunks'] += sum(len(r) for r in results)
+        self.stats['tokens'] += sum(len(ids) for ids in encoded)
+        return results
+
+    def split_texts(self, texts: Iterable[str]) -> List[List[Tuple[str, int]]]:
+        """
+        Divide vários textos, tokenizando `batch_size` por vez.
+
+        Returns:
+            Para cada texto, a lista de (conteúdo do chunk, nº de tokens)
+        """
+        texts = list(texts)
+        results = []
+        for i in range(0, len(texts), self.batch_size):
+            results.extend(self._split_batch(texts[i:i + self.batch_size]))
+        return results
+
+    def split_text(self, text: str) -> List[str]:
+        """Divide um texto (interface do LangChain)."""
+        return [content for content, _ in self.split_texts([text])[0]]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """
+        Divide documentos preservando os metadados.
+
+        Cada chunk recebe `token_count`, `chunk_index` e `encoding` nos metadados.
+        """
+        documents = list(documents)
+        chunks = []
+        split = self.split_texts(doc.page_content for doc in documents)
+        for doc, pieces in zip(documents, split):
+            for index, (content, token_count) in enumerate(pieces):
+                metadata = {**doc.metadata, 'token_count': token_count, 'chunk_index': index,
+                            'encoding': self.encoding_name}
+                chunks.append(Document(page_content=content, metadata=metadata))
+        return chunks
+
+    def create_documents(self, texts: Sequence[str], metadatas: Optional[Sequence[Dict[str, Any]]] = None) -> List[Document]:
+        """Cria documentos a partir de textos (interface do LangChain)."""
+        metadatas = metadatas or [{}] * len(texts)
+        return self.split_documents(Document(page_content=t, metadata=dict(m)) for t, m in zip(texts, metadatas))
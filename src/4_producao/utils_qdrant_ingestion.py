@@ -0,0 +1,281 @@
+"""
+Ingestão em massa no Qdrant: paralela, idempotente e retomável.
+
+O Lab 4.1 indexa com `QdrantVectorStore.from_documents`, que gera IDs
+aleatórios para os pontos: se a ingestão cair no meio, a única saída é
+recomeçar, e os chunks já enviados viram duplicatas. O HNSW também é
+reconstruído enquanto os pontos chegam, competindo com o upsert.
+
+Este módulo oferece:
+
+- `point_id`: UUID determinístico derivado do `chunk_id` SHA-256 (mesma
+  regra do lab 3.6). Reenviar um chunk sobrescreve o mesmo ponto
+- `QdrantBulkLoader`: embedding em batch + `upsert` em paralelo
+  - Vários batches em voo (`parallel`): o embedding de um batch sobrepõe
+    o upsert dos outros; o número de batches pendentes é limitado
+  - Checkpoint em disco (append-only) com os chunks já gravados: uma nova
+    execução pula o que já foi enviado. O checkpoint é descartado se a
+    collection não existir ou tiver menos pontos que ele (ex: depois de um
+    `delete_collection` ou `docker compose down -v`)
+  - Indexação HNSW adiada durante a carga (`indexing_threshold=0`) e
+    reativada no final, mesmo em caso de erro
+  - Funciona com qualquer `QdrantClient`: HTTP, gRPC (`prefer_grpc=True`)
+    ou modo local (`QdrantClient(":memory:")` / `QdrantClient(path=...)`)
+  - Payload no formato do `QdrantVectorStore` (`page_content` + `metadata`)
+
+Uso:
+
+    client = QdrantClient(url=QDRANT_URL, prefer_grpc=True)
+    loader = QdrantBulkLoader(client, "rag_documents", embeddings, checkpoint_path="ingest.ckpt")
+    stats = loader.load(chunks)
+    vectorstore = loader.as_vectorstore()
+
+Depende de `utils_ingestion_pipeline` (capítulo 3) para o `chunk_id`.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient, models
+
+from utils_ingestion_pipeline import generate_chunk_id
+
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def _is_local(client: QdrantClient) -> bool:
+    from qdrant_client.local.qdrant_local import QdrantLocal
+    return isinstance(getattr(client, '_client', None), QdrantLocal)
+
+
+def point_id(chunk_id: str) -> str:
+    """
+    UUID do ponto no Qdrant a partir do `chunk_id` (primeiros 128 bits do SHA-256).
+
+    Args:
+        chunk_id: Hash SHA-256 hexadecimal do chunk
+
+    Returns:
+        UUID em formato string
+    """
+    return str(uuid.UUID(hex=chunk_id[:32]))
+
+
+def chunk_point_id(chunk: Document) -> str:
+    """UUID do ponto de um chunk (usa `metadata['chunk_id']` se existir)."""
+    chunk_id = chunk.metadata.get('chunk_id') or generate_chunk_id(chunk.page_content, chunk.metadata)
+    return point_id(chunk_id)
+
+
+class IngestionCheckpoint:
+    """
+    Conjunto de pontos já gravados, persistido em um arquivo append-only.
+
+    Cada batch confirmado pelo Qdrant vira uma linha com os IDs; a perda da
+    última linha em um crash só faz o batch ser reenviado (upsert idempotente).
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.done: Set[str] = set()
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            for line in self.path.read_text(encoding='utf-8').splitlines():
+                self.done.update(line.split())
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.done
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def add(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self.done.update(ids)
+            if self.path:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(" ".join(ids) + "\n")
+
+    def reset(self) -> None:
+        with self._lock:
+            self.done.clear()
+            if self.path and self.path.exists():
+                self.path.unlink()
+
+
+class QdrantBulkLoader:
+    """
+    Carga em massa de chunks em uma collection do Qdrant.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        embeddings: Embeddings,
+        batch_size: int = 64,
+        parallel: int = 4,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+        distance: models.Distance = models.Distance.COSINE,
+        defer_indexing: bool = True,
+    ):
+        """
+        Args:
+            client: Cliente do Qdrant (HTTP, gRPC ou local)
+            collection_name: Nome da collection (criada se não existir)
+            embeddings: Modelo de embeddings (ex: OllamaEmbeddings)
+            batch_size: Chunks por batch de embedding/upsert
+            parallel: Batches processados em paralelo
+            checkpoint_path: Arquivo de checkpoint (None = sem retomada)
+            distance: Métrica da collection, se for criada
+            defer_indexing: Desliga a indexação HNSW durante a carga
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.distance = distance
+        self.defer_indexing = defer_indexing
+        self.checkpoint = IngestionCheckpoint(checkpoint_path)
+        self.stats: Dict[str, Any] = {}
+        # O modo local do qdrant-client não é thread-safe: os embeddings
+        # continuam em paralelo, mas os upserts passam um de cada vez
+        self._upsert_lock = threading.Lock() if _is_local(client) else nullcontext()
+
+    def ensure_collection(self, vector_size: int) -> bool:
+        """
+        Cria a collection se ela não existir.
+
+        Returns:
+            True se a collection foi criada agora
+        """
+        if self.client.collection_exists(self.collection_name):
+            return False
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=self.distance),
+        )
+        return True
+
+    def _set_indexing_threshold(self, threshold: int) -> None:
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold),
+        )
+
+    def _process_batch(self, batch: List[Document], ids: List[str]) -> Dict[str, float]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents([c.page_content for c in batch])
+        embedded = time.perf_counter()
+        with self._upsert_lock:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=models.Batch(
+                    ids=ids,
+                    vectors=vectors,
+                    payloads=[{'page_content': c.page_content, 'metadata': c.metadata} for c in batch],
+                ),
+                wait=True,
+            )
+        self.checkpoint.add(ids)
+        return {'embed': embedded - start, 'upsert': time.perf_counter() - embedded}
+
+    def validate_checkpoint(self) -> bool:
+        """
+        Descarta o checkpoint se ele não corresponder mais à collection.
+
+        O checkpoint é um arquivo local: se a collection foi apagada ou
+        recriada, os pontos que ele lista não estão mais no Qdrant.
+
+        Returns:
+            True se o checkpoint foi descartado
+        """
+        if not len(self.checkpoint):
+            return False
+        if self.client.collection_exists(self.collection_name):
+            points = self.client.count(self.collection_name, exact=True).count
+            if points >= len(self.checkpoint):
+                return False
+        self.checkpoint.reset()
+        return True
+
+    def load(self, chunks: Sequence[Document]) -> Dict[str, Any]:
+        """
+        Embeda e grava os chunks que ainda não estão no checkpoint.
+
+        Args:
+            chunks: Chunks a indexar
+
+        Returns:
+            Estatísticas: pontos enviados/pulados, batches, tempos e throughput
+        """
+        start = time.perf_counter()
+        checkpoint_reset = self.validate_checkpoint()
+        pending: Dict[str, Document] = {}
+        for chunk in chunks:
+            pid = chunk_point_id(chunk)
+            if pid not in self.checkpoint:
+                pending[pid] = chunk  # duplicatas exatas colapsam no mesmo ID
+        ids = list(pending)
+        batches = [ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+
+        stats = {
+            'points': 0, 'skipped': len(chunks) - len(ids), 'batches': 0,
+            'embed_seconds': 0.0, 'upsert_seconds': 0.0, 'indexing_deferred': False,
+            'checkpoint_reset': checkpoint_reset,
+        }
+        if batches and not self.client.collection_exists(self.collection_name):
+            probe = self.embeddings.embed_query(pending[batches[0][0]].page_content)
+            self.ensure_collection(len(probe))
+
+        previous_threshold = None
+        if batches and self.defer_indexing:
+            config = self.client.get_collection(self.collection_name).config.optimizer_config
+            previous_threshold = config.indexing_threshold or DEFAULT_INDEXING_THRESHOLD
+            self._set_indexing_threshold(0)
+            stats['indexing_deferred'] = True
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                in_flight = {}
+                for batch_ids in batches:
+                    # Backpressure: no máximo 2 × parallel batches em voo
+                    while len(in_flight) >= 2 * self.parallel:
+                        self._collect(in_flight, stats, FIRST_COMPLETED)
+                    future = executor.submit(self._process_batch, [pending[i] for i in batch_ids], batch_ids)
+                    in_flight[future] = len(batch_ids)
+                while in_flight:
+                    self._collect(in_flight, stats, FIRST_COMPLETED)
+        finally:
+            if previous_threshold is not None:
+                self._set_indexing_threshold(previous_threshold)
+
+        stats['elapsed_seconds'] = time.perf_counter() - start
+        stats['points_per_second'] = stats['points'] / stats['elapsed_seconds'] if stats['points'] else 0.0
+        self.stats = stats
+        return stats
+
+    @staticmethod
+    def _collect(in_flight: Dict[Any, int], stats: Dict[str, Any], return_when) -> None:
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            size = in_flight.pop(future)
+            timings = future.result()  # propaga erros do embedding/upsert
+            stats['points'] += size
+            stats['batches'] += 1
+            stats['embed_seconds'] += timings['embed']
+            stats['upsert_seconds'] += timings['upsert']
+
+    def as_vectorstore(self):
+        """`QdrantVectorStore` sobre a collection carregada."""
+        from langchain_qdrant import QdrantVectorStore
+        return QdrantVectorStore(client=self.client, collection_name=self.collection_name, embedding=self.embeddings)
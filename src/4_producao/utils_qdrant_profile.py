@@ -0,0 +1,449 @@
+"""
+Perfil de serviço da collection do Qdrant + busca em batch.
+
+O Lab 4.1 cria a collection só com `VectorParams(size, Distance.COSINE)`:
+sem índices de payload em `source`/`page` (todo filtro varre os payloads),
+HNSW com parâmetros padrão, sem quantização, vetores sempre em RAM, e uma
+requisição de busca por pergunta.
+
+Este módulo oferece:
+
+- `PROFILES`: perfis declarativos (dicts) com índices de payload, HNSW
+  (`m`, `ef_construct`), quantização escalar/binária, `on_disk` e os
+  parâmetros de busca (`hnsw_ef`, rescoring com oversampling)
+
+| Perfil       | Quantização   | Vetores originais | Busca                          |
+|--------------|---------------|-------------------|--------------------------------|
+| `default`    | —             | RAM               | padrão do Qdrant               |
+| `balanced`   | int8 (RAM)    | RAM               | hnsw_ef=128, rescore ×2        |
+| `low_memory` | int8 (RAM)    | disco             | hnsw_ef=128, rescore ×3        |
+| `binary`     | binária (RAM) | disco             | hnsw_ef=128, rescore ×4        |
+
+- `apply_profile`: cria a collection já com o perfil ou migra uma
+  existente. É idempotente: compara a configuração atual
+  (`describe_collection`) com o perfil e só aplica as diferenças
+- `QdrantBatchRetriever`: retriever que embeda as perguntas em paralelo
+  (`embed_query`) e busca todas em um único `query_batch_points`
+- `latency_report`: latência de buscas uma a uma × em batch
+
+Uso:
+
+    actions = apply_profile(client, "rag_documents", "balanced", vector_size=768)
+    retriever = QdrantBatchRetriever(client=client, collection_name="rag_documents",
+                                     embeddings=embeddings, search=PROFILES['balanced']['search'])
+    docs_per_question = retriever.batch(questions, {"max_concurrency": 8})
+
+Depende de `utils_batch_qa` (capítulo 3) para o embedding das perguntas.
+"""
+
+import copy
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import get_config_list
+from pydantic import ConfigDict, Field
+from qdrant_client import QdrantClient, models
+
+from utils_batch_qa import embed_queries
+
+# O QdrantVectorStore guarda os metadados do chunk dentro de `metadata`;
+# no Lab 4.1 eles vêm do PyPDFLoader (`source` = caminho do PDF, `page`)
+LAB_PAYLOAD_INDEXES = {
+    'metadata.source': 'keyword',
+    'metadata.page': 'integer',
+}
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {
+        'payload_indexes': {},
+        'hnsw': {'m': 16, 'ef_construct': 100},
+        'quantization': None,
+        'on_disk': {'vectors': False, 'hnsw': False, 'payload': False},
+        'search': {},
+    },
+    'balanced': {
+        'payload_indexes': LAB_PAYLOAD_INDEXES,
+        'hnsw': {'m': 16, 'ef_construct': 128},
+        'quantization': {'type': 'scalar', 'quantile': 0.99, 'always_ram': True},
+        'on_disk': {'vectors': False, 'hnsw': False, 'payload': False},
+        'search': {'hnsw_ef': 128, 'rescore': True, 'oversampling': 2.0},
+    },
+    'low_memory': {
+        'payload_indexes': LAB_PAYLOAD_INDEXES,
+        'hnsw': {'m': 16, 'ef_construct': 128},
+        'quantization': {'type': 'scalar', 'quantile': 0.99, 'always_ram': True},
+        'on_disk': {'vectors': True, 'hnsw': False, 'payload': True},
+        'search': {'hnsw_ef': 128, 'rescore': True, 'oversampling': 3.0},
+    },
+    'binary': {
+        'payload_indexes': LAB_PAYLOAD_INDEXES,
+        'hnsw': {'m': 32, 'ef_construct': 256},
+        'quantization': {'type': 'binary', 'always_ram': True},
+        'on_disk': {'vectors': True, 'hnsw': False, 'payload': True},
+        'search': {'hnsw_ef': 128, 'rescore': True, 'oversampling': 4.0},
+    },
+}
+
+
+def _resolve(profile: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Perfil desconhecido: {profile}. Opções: {list(PROFILES)}")
+        return copy.deepcopy(PROFILES[profile])
+    return profile
+
+
+def _quantization_config(spec: Optional[Dict[str, Any]]):
+    if spec is None:
+        return None
+    if spec['type'] == 'scalar':
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=spec.get('quantile'), always_ram=spec.get('always_ram'),
+        ))
+    if spec['type'] == 'binary':
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=spec.get('always_ram')))
+    raise ValueError(f"Quantização desconhecida: {spec['type']}")
+
+
+def describe_collection(info: models.CollectionInfo) -> Dict[str, Any]:
+    """
+    Configuração atual da collection no formato dos perfis.
+
+    Args:
+        info: Resultado de `client.get_collection(...)`
+
+    Returns:
+        Dict com payload_indexes, hnsw, quantization e on_disk
+    """
+    params = info.config.params
+    vectors = params.vectors
+    hnsw = info.config.hnsw_config
+
+    quantization = info.config.quantization_config
+    if isinstance(quantization, models.ScalarQuantization):
+        quantization = {'type': 'scalar', 'quantile': quantization.scalar.quantile,
+                        'always_ram': quantization.scalar.always_ram}
+    elif isinstance(quantization, models.BinaryQuantization):
+        quantization = {'type': 'binary', 'always_ram': quantization.binary.always_ram}
+    else:
+        quantization = None
+
+    return {
+        'payload_indexes': {
+            field: getattr(schema.data_type, 'value', schema.data_type)
+            for field, schema in (info.payload_schema or {}).items()
+        },
+        'hnsw': {'m': hnsw.m, 'ef_construct': hnsw.ef_construct},
+        'quantization': quantization,
+        'on_disk': {
+            'vectors': bool(getattr(vectors, 'on_disk', False)),
+            'hnsw': bool(hnsw.on_disk),
+            'payload': bool(params.on_disk_payload),
+        },
+    }
+
+
+def diff_profile(current: Dict[str, Any], target: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """
+    Diferenças entre a configuração atual e o perfil.
+
+    Só compara as chaves presentes no perfil (perfis parciais são válidos).
+    Índices de payload a mais na collection não são removidos.
+
+    Returns:
+        Lista de ações: ('payload_index', (campo, tipo)), ('hnsw', {...}),
+        ('quantization', spec | None), ('on_disk', {...})
+    """
+    actions: List[Tuple[str, Any]] = []
+    for field, schema in target.get('payload_indexes', {}).items():
+        if current['payload_indexes'].get(field) != schema:
+            actions.append(('payload_index', (field, schema)))
+
+    if 'hnsw' in target:
+        changed = {k: v for k, v in target['hnsw'].items() if current['hnsw'].get(k) != v}
+        if changed:
+            actions.append(('hnsw', changed))
+
+    if 'quantization' in target:
+        want, have = target['quantization'], current['quantization']
+        if (want is None) != (have is None) or (
+            want is not None and any(have.get(k) != v for k, v in want.items())
+        ):
+            actions.append(('quantization', want))
+
+    if 'on_disk' in target:
+        changed = {k: v for k, v in target['on_disk'].items() if current['on_disk'].get(k) != v}
+        if changed:
+            actions.append(('on_disk', changed))
+    return actions
+
+
+def apply_profile(
+    client: QdrantClient,
+    collection_name: str,
+    profile: Union[str, Dict[str, Any]] = 'balanced',
+    vector_size: Optional[int] = None,
+    distance: models.Distance = models.Distance.COSINE,
+) -> List[Tuple[str, Any]]:
+    """
+    Cria a collection com o perfil, ou migra a existente para ele.
+
+    Args:
+        client: Cliente do Qdrant
+        collection_name: Nome da collection
+        profile: Nome em `PROFILES` ou dict no mesmo formato
+        vector_size: Dimensão dos vetores (obrigatória se a collection não existir)
+        distance: Métrica, se a collection for criada
+
+    Returns:
+        Ações aplicadas (lista vazia se a collection já estava no perfil)
+    """
+    profile = _resolve(profile)
+    actions: List[Tuple[str, Any]] = []
+
+    if not client.collection_exists(collection_name):
+        if vector_size is None:
+            raise ValueError("vector_size é obrigatório para criar a collection")
+        on_disk = profile.get('on_disk', {})
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=distance, on_disk=on_disk.get('vectors')),
+            hnsw_config=models.HnswConfigDiff(**profile.get('hnsw', {}), on_disk=on_disk.get('hnsw')),
+            quantization_config=_quantization_config(profile.get('quantization')),
+            on_disk_payload=on_disk.get('payload'),
+        )
+        actions.append(('create_collection', vector_size))
+        for field, schema in profile.get('payload_indexes', {}).items():
+            client.create_payload_index(collection_name, field, field_schema=models.PayloadSchemaType(schema))
+            actions.append(('payload_index', (field, schema)))
+        return actions
+
+    current = describe_collection(client.get_collection(collection_name))
+    for action, detail in diff_profile(current, profile):
+        if action == 'payload_index':
+            field, schema = detail
+            client.create_payload_index(collection_name, field, field_schema=models.PayloadSchemaType(schema))
+        elif action == 'hnsw':
+            client.update_collection(collection_name, hnsw_config=models.HnswConfigDiff(**detail))
+        elif action == 'quantization':
+            client.update_collection(
+                collection_name,
+                quantization_config=_quantization_config(detail) if detail else models.Disabled.DISABLED,
+            )
+        elif action == 'on_disk':
+            if 'vectors' in detail:
+                client.update_collection(collection_name, vectors_config={'': models.VectorParamsDiff(on_disk=detail['vectors'])})
+            if 'hnsw' in detail:
+                client.update_collection(collection_name, hnsw_config=models.HnswConfigDiff(on_disk=detail['hnsw']))
+            if 'payload' in detail:
+                client.update_collection(
+                    collection_name, collection_params=models.CollectionParamsDiff(on_disk_payload=detail['payload']),
+                )
+        actions.append((action, detail))
+    return actions
+
+
+def search_params(search: Dict[str, Any]) -> Optional[models.SearchParams]:
+    """Converte a seção `search` de um perfil em `SearchParams`."""
+    if not search:
+        return None
+    quantization = None
+    if 'rescore' in search or 'oversampling' in search:
+        quantization = models.QuantizationSearchParams(
+            rescore=search.get('rescore'), oversampling=search.get('oversampling'),
+        )
+    return models.SearchParams(hnsw_ef=search.get('hnsw_ef'), exact=search.get('exact', False), quantization=quantization)
+
+
+def build_filter(filters: Optional[Dict[str, Any]], prefix: str = 'metadata.') -> Optional[models.Filter]:
+    """
+    Converte o filtro simples dos labs ({'source': 'manual.pdf', 'page': [1, 2]}) em `models.Filter`.
+
+    Listas viram `MatchAny`; os demais valores, `MatchValue`.
+    """
+    if not filters:
+        return None
+    conditions = []
+    for field, value in filters.items():
+        match = models.MatchAny(any=list(value)) if isinstance(value, (list, tuple, set)) else models.MatchValue(value=value)
+        conditions.append(models.FieldCondition(key=f"{prefix}{field}", match=match))
+    return models.Filter(must=conditions)
+
+
+class QdrantBatchRetriever(BaseRetriever):
+    """
+    Retriever do Qdrant com busca em batch.
+
+    `batch(perguntas)` embeda as perguntas com `embed_query` (em paralelo,
+    até `max_concurrency` do config) e faz 1 `query_batch_points` para
+    todas, em vez de N buscas. `embed_documents` não é usado: modelos
+    assimétricos (prefixo de query/documento) embedam perguntas diferente
+    de chunks. Lê o payload no formato do `QdrantVectorStore`.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    client: Any
+    collection_name: str
+    embeddings: Embeddings
+    k: int = 4
+    search: Dict[str, Any] = Field(default_factory=dict)
+    filter: Optional[Dict[str, Any]] = None
+    content_payload_key: str = 'page_content'
+    metadata_payload_key: str = 'metadata'
+
+    def _to_document(self, point) -> Document:
+        payload = point.payload or {}
+        metadata = dict(payload.get(self.metadata_payload_key) or {})
+        metadata.update({'_id': point.id, '_score': point.score})
+        return Document(page_content=payload.get(self.content_payload_key, ''), metadata=metadata)
+
+    def search_vectors(
+        self,
+        vectors: Sequence[Sequence[float]],
+        k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Document]]:
+        """
+        Busca vários vetores em uma única requisição.
+
+        Args:
+            vectors: Embeddings das perguntas
+            k: Resultados por pergunta (padrão: self.k)
+            filters: Filtro de metadados (padrão: self.filter)
+
+        Returns:
+            Uma lista de documentos por vetor, na mesma ordem
+        """
+        if len(vectors) == 0:
+            return []
+        params = search_params(self.search)
+        query_filter = build_filter(filters if filters is not None else self.filter)
+        requests = [
+            models.QueryRequest(query=list(map(float, v)), limit=k or self.k, filter=query_filter,
+                                params=params, with_payload=True)
+            for v in vectors
+        ]
+        responses = self.client.query_batch_points(self.collection_name, requests=requests)
+        return [[self._to_document(p) for p in response.points] for response in responses]
+
+    def embed_queries(self, queries: Sequence[str], max_concurrency: Optional[int] = None) -> List[Any]:
+        """Embeda as perguntas com `embed_query`, em paralelo (ver `utils_batch_qa.embed_queries`)."""
+        return embed_queries(self.embeddings, queries, max_concurrency)
+
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Union[List[Document], Exception]]:
+        """
+        Embeda as perguntas e busca todas em uma única requisição.
+
+        Args:
+            queries: Perguntas
+            k: Resultados por pergunta (padrão: self.k)
+            filters: Filtro de metadados (padrão: self.filter)
+            max_concurrency: Máximo de embeddings simultâneos
+            return_exceptions: Se True, a exceção de uma pergunta vai na
+                posição dela em vez de ser levantada
+
+        Returns:
+            Uma lista de documentos (ou exceção) por pergunta, na mesma ordem
+        """
+        if not queries:
+            return []
+        vectors = self.embed_queries(queries, max_concurrency)
+        errors = [v for v in vectors if isinstance(v, Exception)]
+        if errors and not return_exceptions:
+            raise errors[0]
+
+        ok = [i for i, v in enumerate(vectors) if not isinstance(v, Exception)]
+        results: List[Union[List[Document], Exception]] = list(vectors)
+        try:
+            found = self.search_vectors([vectors[i] for i in ok], k, filters)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            found = [e] * len(ok)
+        for i, docs in zip(ok, found):
+            results[i] = docs
+        return results
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        return self.search_batch([query], k, filters)[0]
+
+    def batch(self, inputs: List[str], config=None, *, return_exceptions: bool = False, **kwargs) -> List[Any]:
+        """
+        Busca todas as perguntas em um único `query_batch_points`.
+
+        Respeita `max_concurrency` do config e `return_exceptions`. Com
+        callbacks no config (ex.: dentro de uma chain com tracing), usa o
+        `BaseRetriever.batch` padrão, que registra uma execução por pergunta.
+        """
+        if not inputs:
+            return []
+        configs = get_config_list(config, len(inputs))
+        if any(c.get('callbacks') for c in configs):
+            return super().batch(inputs, config, return_exceptions=return_exceptions, **kwargs)
+        return self.search_batch(inputs, max_concurrency=configs[0].get('max_concurrency'),
+                                 return_exceptions=return_exceptions, **kwargs)
+
+
+def latency_report(
+    client: QdrantClient,
+    collection_name: str,
+    vectors: Sequence[Sequence[float]],
+    k: int = 4,
+    search: Optional[Dict[str, Any]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Dict[str, float]:
+    """
+    Mede a busca uma a uma (`query_points`) × em batch (`query_batch_points`).
+
+    Os vetores já vêm embedados: mede só o Qdrant.
+
+    Returns:
+        Latências em ms: p50/p95 por consulta sequencial, total sequencial,
+        total em batch e speedup
+    """
+    params = search_params(search or {})
+    query_filter = build_filter(filters)
+    latencies = []
+    start = time.perf_counter()
+    for v in vectors:
+        t0 = time.perf_counter()
+        client.query_points(collection_name, query=list(map(float, v)), limit=k,
+                            query_filter=query_filter, search_params=params)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    sequential_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    client.query_batch_points(collection_name, requests=[
+        models.QueryRequest(query=list(map(float, v)), limit=k, filter=query_filter, params=params)
+        for v in vectors
+    ])
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'queries': len(vectors),
+        'p50_ms': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'p95_ms': float(np.percentile(latencies, 95)) if latencies else 0.0,
+        'sequential_total_ms': sequential_ms,
+        'batch_total_ms': batch_ms,
+        'speedup': sequential_ms / batch_ms if batch_ms else 0.0,
+    }
@@ -0,0 +1,280 @@
+"""
+Benchmark de throughput de embeddings do Ollama.
+
+Substitui o antigo `test_ollama_models.py` (5 requests sequenciais de um
+único texto por modelo). Aqui varremos:
+
+    modelos × batch size × concorrência × tamanho do texto
+
+e registramos throughput (textos/s) e latência p50/p95/p99 por batch,
+separando o tempo de carga do modelo (cold) do tempo em regime (warm).
+
+O CSV segue o formato de `data/embeddings/ollama_comparative_results.csv`
+(mesmas colunas iniciais) com as colunas do benchmark ao final.
+
+Uso:
+
+    # Contra o Ollama local
+    python tests/benchmark_ollama_embeddings.py --models all-minilm,nomic-embed-text
+
+    # Offline, contra o servidor fake incluído (CI)
+    python tests/benchmark_ollama_embeddings.py --fake
+"""
+
+import argparse
+import csv
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+for chapter in ('1_fundamentos', '2_buscas'):
+    sys.path.insert(0, str(ROOT / 'src' / chapter))
+
+from utils_ollama_embedder import OllamaEmbedder  # noqa: E402
+from utils_similaridade import cosine_similarity  # noqa: E402
+
+DEFAULT_OUTPUT = ROOT / 'data' / 'embeddings' / 'ollama_benchmark_results.csv'
+
+# Mesmos textos do Lab 1.5 (colunas de similaridade do CSV original)
+SIMILARITY_TEXTS = [
+    'O gato é um animal doméstico',
+    'O gato é um felino de estimação',
+    'A programação é importante para engenheiros de software',
+]
+
+_WORDS = (
+    "banco dados vetorial embedding busca semântica similaridade cosseno índice "
+    "documento consulta modelo recuperação contexto resposta pergunta chunk token "
+    "memória latência throughput servidor produção pipeline ingestão qualidade"
+).split()
+
+CSV_COLUMNS = [
+    'model', 'dimensions', 'avg_response_time_ms',
+    'sim_12_similar', 'sim_13_different', 'discrimination',
+    'batch_size', 'concurrency', 'text_words', 'n_texts',
+    'texts_per_sec', 'p50_ms', 'p95_ms', 'p99_ms',
+    'cold_request_ms', 'load_duration_ms', 'warm_request_ms',
+]
+
+
+def make_texts(n: int, words: int, seed: int = 42) -> List[str]:
+    """Gera `n` textos distintos com aproximadamente `words` palavras."""
+    rng = random.Random(seed)
+    return [f"{i} " + " ".join(rng.choices(_WORDS, k=words)) for i in range(n)]
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+def measure_cold_start(api_url: str, model: str, timeout: int = 300) -> Dict[str, float]:
+    """
+    Mede a primeira chamada com o modelo descarregado e uma chamada quente.
+
+    Um request com `keep_alive: 0` faz o Ollama descarregar o modelo ao
+    final; o request seguinte paga a carga completa (`load_duration`).
+    """
+    endpoint = f"{api_url.rstrip('/')}/api/embed"
+    with requests.Session() as session:
+        session.post(endpoint, json={'model': model, 'input': 'unload', 'keep_alive': 0}, timeout=timeout)
+
+        start = time.perf_counter()
+        cold = session.post(endpoint, json={'model': model, 'input': SIMILARITY_TEXTS[0]}, timeout=timeout)
+        cold_ms = (time.perf_counter() - start) * 1000
+        cold.raise_for_status()
+
+        start = time.perf_counter()
+        session.post(endpoint, json={'model': model, 'input': SIMILARITY_TEXTS[0]}, timeout=timeout).raise_for_status()
+        warm_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        'cold_request_ms': cold_ms,
+        'load_duration_ms': cold.json().get('load_duration', 0) / 1e6,
+        'warm_request_ms': warm_ms,
+    }
+
+
+def measure_similarity(embedder: OllamaEmbedder) -> Dict[str, Any]:
+    """Dimensão e similaridades do Lab 1.5 para o modelo."""
+    vectors, _ = embedder.embed_batch(SIMILARITY_TEXTS)
+    sim_12 = cosine_similarity(vectors[0], vectors[1])
+    sim_13 = cosine_similarity(vectors[0], vectors[2])
+    return {
+        'dimensions': len(vectors[0]),
+        'sim_12_similar': round(sim_12, 4),
+        'sim_13_different': round(sim_13, 4),
+        'discrimination': round(sim_12 - sim_13, 4),
+    }
+
+
+def run_case(
+    api_url: str,
+    model: str,
+    batch_size: int,
+    concurrency: int,
+    texts: List[str],
+    repeats: int = 3,
+) -> Dict[str, Any]:
+    """
+    Executa uma combinação (batch size × concorrência) com o modelo já quente.
+
+    Returns:
+        Throughput médio e latências por batch (média, p50, p95, p99)
+    """
+    embedder = OllamaEmbedder(
+        api_url, model=model, batch_size=batch_size, max_workers=concurrency, adaptive=False,
+    )
+    latencies: List[float] = []
+    wall_time = 0.0
+    try:
+        embedder.embed_batch(texts[:batch_size])  # aquecimento das conexões
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, metadata = embedder.embed_batch(texts, return_metadata=True)
+            wall_time += time.perf_counter() - start
+            latencies.extend(m['latency_ms'] for m in metadata)
+    finally:
+        embedder.close()
+
+    return {
+        'avg_response_time_ms': round(statistics.mean(latencies), 2),
+        'texts_per_sec': round(len(texts) * repeats / wall_time, 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def run_benchmark(
+    api_url: str,
+    models: Sequence[str],
+    batch_sizes: Sequence[int] = (1, 8, 32, 128),
+    concurrencies: Sequence[int] = (1, 2, 4, 8),
+    text_lengths: Sequence[int] = (16, 128, 512),
+    n_texts: int = 256,
+    repeats: int = 3,
+    verbose: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Varre todas as combinações e retorna uma linha por caso.
+
+    Args:
+        api_url: URL base do Ollama
+        models: Modelos de embeddings
+        batch_sizes: Textos por request
+        concurrencies: Requests simultâneos
+        text_lengths: Tamanhos dos textos (em palavras)
+        n_texts: Textos por rodada
+        repeats: Rodadas por caso (as latências de todas são agregadas)
+        verbose: Imprime uma linha por caso
+    """
+    rows = []
+    for model in models:
+        cold = measure_cold_start(api_url, model)
+        embedder = OllamaEmbedder(api_url, model=model, adaptive=False)
+        try:
+            quality = measure_similarity(embedder)
+        finally:
+            embedder.close()
+        if verbose:
+            print(f"\n🔄 {model} ({quality['dimensions']}D) | cold: {cold['cold_request_ms']:.0f}ms "
+                  f"(carga {cold['load_duration_ms']:.0f}ms) | warm: {cold['warm_request_ms']:.0f}ms")
+
+        for words in text_lengths:
+            texts = make_texts(n_texts, words)
+            for batch_size in batch_sizes:
+                for concurrency in concurrencies:
+                    result = run_case(api_url, model, batch_size, concurrency, texts, repeats)
+                    rows.append({
+                        'model': model, **quality, **result,
+                        'batch_size': batch_size, 'concurrency': concurrency,
+                        'text_words': words, 'n_texts': n_texts,
+                        **{k: round(v, 2) for k, v in cold.items()},
+                    })
+                    if verbose:
+                        print(f"   {words:>4} palavras | batch {batch_size:>4} | conc {concurrency:>2} | "
+                              f"{result['texts_per_sec']:>9.1f} textos/s | p50 {result['p50_ms']:>8.1f}ms | "
+                              f"p99 {result['p99_ms']:>8.1f}ms")
+    return rows
+
+
+def write_results(rows: List[Dict[str, Any]], path: Union[str, Path]) -> Path:
+    """Salva as linhas no formato de `ollama_comparative_results.csv`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows({col: row.get(col) for col in CSV_COLUMNS} for row in rows)
+    return path
+
+
+def best_configurations(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Maior throughput por (modelo, tamanho de texto)."""
+    best: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        key = f"{row['model']} / {row['text_words']} palavras"
+        if key not in best or row['texts_per_sec'] > best[key]['texts_per_sec']:
+            best[key] = row
+    return best
+
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de embeddings do Ollama")
+    parser.add_argument('--url', default='http://localhost:11434', help="URL base do Ollama")
+    parser.add_argument('--models', default='all-minilm,nomic-embed-text,mxbai-embed-large')
+    parser.add_argument('--batch-sizes', default='1,8,32,128')
+    parser.add_argument('--concurrency', default='1,2,4,8')
+    parser.add_argument('--text-lengths', default='16,128,512', help="Tamanhos dos textos em palavras")
+    parser.add_argument('--n-texts', type=int, default=256)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT))
+    parser.add_argument('--fake', action='store_true', help="Usa o servidor Ollama fake (offline)")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if args.fake:
+        from fake_ollama_server import start_fake_ollama
+        server, _ = start_fake_ollama(port=0)
+        url = f"http://127.0.0.1:{server.server_port}"
+        print(f"🧪 Usando Ollama fake em {url}")
+
+    try:
+        rows = run_benchmark(
+            url,
+            [m for m in args.models.split(',') if m],
+            _parse_ints(args.batch_sizes),
+            _parse_ints(args.concurrency),
+            _parse_ints(args.text_lengths),
+            n_texts=args.n_texts,
+            repeats=args.repeats,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    path = write_results(rows, args.output)
+    print('\n📊 MELHOR CONFIGURAÇÃO POR MODELO:')
+    print('-' * 70)
+    for key, row in best_configurations(rows).items():
+        print(f"{key:35} | batch {row['batch_size']:>4} | conc {row['concurrency']:>2} | "
+              f"{row['texts_per_sec']:.1f} textos/s")
+    print('-' * 70)
+    print(f"✅ Resultados salvos em: {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+# Os utilitários ficam ao lado dos notebooks de cada capítulo (pastas que
+# começam com dígitos não são pacotes importáveis), então expomos cada pasta.
+SRC_DIR = Path(__file__).parent.parent / "src"
+for chapter_dir in sorted(SRC_DIR.iterdir()):
+    if chapter_dir.is_dir() and str(chapter_dir) not in sys.path:
+        sys.path.insert(0, str(chapter_dir))
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class FakeClock:
+    """Relógio manual para testes de TTL (`clock.now += 61`)."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TopicEmbeddings(Embeddings):
+    """Embedding por contagem de tópicos: cada tópico é uma dimensão."""
+
+    TOPICS = ['futebol', 'lasanha', 'iphone', 'vôlei']
+
+    def __init__(self):
+        self.document_calls = 0
+        self.queries = []
+        self.failing_queries = set()
+
+    def _embed(self, text):
+        return [float(text.count(t)) for t in self.TOPICS] + [0.01]
+
+    def embed_documents(self, texts):
+        self.document_calls += 1
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        if text in self.failing_queries:
+            raise RuntimeError('embedding indisponível')
+        self.queries.append(text)
+        return self._embed(text)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def topic_embeddings():
+    return TopicEmbeddings()
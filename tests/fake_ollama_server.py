@@ -0,0 +1,177 @@
+"""
+Servidor Ollama de mentira para testes offline e CI.
+
+Implementa apenas o necessário para os benchmarks de embeddings:
+
+- `POST /api/embed`  → vetores determinísticos (mesmo texto = mesmo vetor)
+- `GET  /api/tags`   → lista de modelos "instalados"
+
+A latência é simulada: o primeiro request de um modelo paga o tempo de
+carga (`load_delay_s`); os seguintes pagam `base_latency_ms` mais um custo
+por token. `keep_alive: 0` descarrega o modelo, como no Ollama real.
+
+Uso:
+
+    server, thread = start_fake_ollama(port=0)
+    url = f"http://127.0.0.1:{server.server_port}"
+    ...
+    server.shutdown()
+
+Ou pela linha de comando:
+
+    python tests/fake_ollama_server.py --port 11435
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MODEL_DIMENSIONS = {
+    'nomic-embed-text': 768,
+    'mxbai-embed-large': 1024,
+    'all-minilm': 384,
+    'embeddinggemma': 768,
+}
+
+
+def fake_embedding(model: str, text: str, dim: int) -> List[float]:
+    """Vetor normalizado derivado do hash de (modelo, texto)."""
+    seed = int.from_bytes(hashlib.sha256(f"{model}|{text}".encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).normal(size=dim)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+class FakeOllamaState:
+    """Modelos carregados e parâmetros de latência compartilhados entre threads."""
+
+    def __init__(
+        self,
+        dimensions: Optional[Dict[str, int]] = None,
+        load_delay_s: float = 0.2,
+        base_latency_ms: float = 2.0,
+        per_token_ms: float = 0.01,
+    ):
+        self.dimensions = dict(dimensions or MODEL_DIMENSIONS)
+        self.load_delay_s = load_delay_s
+        self.base_latency_ms = base_latency_ms
+        self.per_token_ms = per_token_ms
+        self.loaded = set()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, model: str) -> float:
+        """Carrega o modelo se necessário e retorna o tempo de carga (s)."""
+        with self._lock:
+            if model in self.loaded:
+                return 0.0
+            time.sleep(self.load_delay_s)
+            self.loaded.add(model)
+            return self.load_delay_s
+
+    def unload(self, model: str) -> None:
+        with self._lock:
+            self.loaded.discard(model)
+
+
+def _make_handler(state: FakeOllamaState):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self._send_json(200, {'models': [{'name': f"{m}:latest"} for m in state.dimensions]})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/api/embed':
+                self._send_json(404, {'error': 'not found'})
+                return
+            start = time.perf_counter()
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            model = payload.get('model', '').split(':')[0]
+            if model not in state.dimensions:
+                self._send_json(404, {'error': f"model '{model}' not found"})
+                return
+
+            inputs = payload.get('input', [])
+            texts = [inputs] if isinstance(inputs, str) else list(inputs)
+            with state._lock:
+                state.requests += 1
+
+            load_s = state.ensure_loaded(model)
+            tokens = sum(len(t.split()) for t in texts)
+            time.sleep((state.base_latency_ms + state.per_token_ms * tokens) / 1000)
+            dim = state.dimensions[model]
+            embeddings = [fake_embedding(model, t, dim) for t in texts]
+
+            if payload.get('keep_alive') in (0, '0', '0s'):
+                state.unload(model)
+
+            self._send_json(200, {
+                'model': model,
+                'embeddings': embeddings,
+                'total_duration': int((time.perf_counter() - start) * 1e9),
+                'load_duration': int(load_s * 1e9),
+                'prompt_eval_count': tokens,
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeOllamaHandler
+
+
+def start_fake_ollama(
+    host: str = '127.0.0.1',
+    port: int = 0,
+    **state_kwargs,
+) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """
+    Inicia o servidor em uma thread de fundo.
+
+    Args:
+        host: Endereço de escuta
+        port: Porta (0 = porta livre escolhida pelo sistema)
+        **state_kwargs: Parâmetros de `FakeOllamaState` (latências, dimensões)
+
+    Returns:
+        (servidor, thread). O estado fica em `server.state`.
+    """
+    state = FakeOllamaState(**state_kwargs)
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Ollama de mentira (embeddings determinísticos)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--load-delay', type=float, default=0.2, help="Tempo de carga do modelo (s)")
+    parser.add_argument('--latency', type=float, default=2.0, help="Latência base por request (ms)")
+    args = parser.parse_args()
+
+    server, thread = start_fake_ollama(
+        args.host, args.port, load_delay_s=args.load_delay, base_latency_ms=args.latency,
+    )
+    print(f"🧪 Ollama fake em http://{args.host}:{server.server_port} (Ctrl+C para parar)")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,63 @@
+from langchain_community.vectorstores import FAISS
+from langchain_core.runnables import RunnableLambda
+from langchain_qdrant import QdrantVectorStore
+
+from utils_batch_qa import answer_batch, batch_search
+
+TOPICS = ['futebol', 'lasanha', 'iphone', 'vôlei']
+TEXTS = [f"{topic} parte {i}" for topic in TOPICS for i in range(3)]
+
+
+def fake_llm(inputs):
+    if 'falha' in inputs['question']:
+        raise RuntimeError("timeout do Ollama")
+    return f"{inputs['question']} -> {inputs['context'].split()[0]}"
+
+
+def test_batch_search_matches_single_searches(topic_embeddings):
+    embeddings = topic_embeddings
+    faiss_store = FAISS.from_texts(TEXTS, embeddings)
+    qdrant_store = QdrantVectorStore.from_texts(TEXTS, embeddings, location=":memory:", collection_name="docs")
+    vectors = [embeddings.embed_query(topic) for topic in TOPICS]
+
+    for store in (faiss_store, qdrant_store):
+        batched = batch_search(store, vectors, k=3)
+        single = [store.similarity_search_by_vector(v, k=3) for v in vectors]
+        assert [sorted(d.page_content for d in docs) for docs in batched] == \
+            [sorted(d.page_content for d in docs) for docs in single]
+
+
+def test_answer_batch_keeps_order_and_isolates_failures(topic_embeddings):
+    embeddings = topic_embeddings
+    vectorstore = FAISS.from_texts(TEXTS, embeddings)
+    embeddings.document_calls = 0
+    questions = ["iphone?", "futebol?", "lasanha falha?", "vôlei?"] * 5
+
+    result = answer_batch(questions, embeddings, vectorstore, RunnableLambda(fake_llm),
+                          lambda docs: "\n".join(d.page_content for d in docs), k=2, max_concurrency=4)
+
+    assert embeddings.document_calls == 0 and sorted(embeddings.queries) == sorted(questions)
+    answers = [r['answer'] for r in result['results']]
+    assert answers[:4] == ["iphone? -> iphone", "futebol? -> futebol", None, "vôlei? -> vôlei"]
+    assert 'timeout' in result['results'][2]['error']
+    assert all(len(r['sources']) == 2 for r in result['results'])
+    timings = result['timings']
+    assert timings['questions'] == 20
+    assert timings['total_ms'] >= timings['embed_ms'] + timings['search_ms']
+
+
+def test_embedding_failure_only_affects_its_question(topic_embeddings):
+    embeddings = topic_embeddings
+    vectorstore = FAISS.from_texts(TEXTS, embeddings)
+    embeddings.failing_queries.add("lasanha")
+    generated = []
+
+    def llm(inputs):
+        generated.append(inputs['question'])
+        return fake_llm(inputs)
+
+    result = answer_batch(["futebol", "lasanha", "iphone"], embeddings, vectorstore, RunnableLambda(llm),
+                          lambda docs: docs[0].page_content, embed_concurrency=2)
+    assert [r['answer'] for r in result['results']] == ["futebol -> futebol", None, "iphone -> iphone"]
+    assert 'embedding indisponível' in result['results'][1]['error'] and result['results'][1]['sources'] == []
+    assert sorted(generated) == ["futebol", "iphone"]
@@ -0,0 +1,47 @@
+import csv
+
+import pytest
+
+from benchmark_ollama_embeddings import CSV_COLUMNS, main, run_benchmark, write_results
+from fake_ollama_server import fake_embedding, start_fake_ollama
+
+
+@pytest.fixture
+def fake_ollama():
+    server, _ = start_fake_ollama(port=0, load_delay_s=0.05, base_latency_ms=1.0)
+    yield server
+    server.shutdown()
+
+
+def test_fake_server_is_deterministic():
+    assert fake_embedding('all-minilm', 'texto', 384) == fake_embedding('all-minilm', 'texto', 384)
+    assert fake_embedding('all-minilm', 'texto', 384) != fake_embedding('all-minilm', 'outro', 384)
+
+
+def test_benchmark_sweeps_every_combination(fake_ollama, tmp_path):
+    url = f"http://127.0.0.1:{fake_ollama.server_port}"
+    rows = run_benchmark(
+        url, ['all-minilm', 'nomic-embed-text'], batch_sizes=(1, 8), concurrencies=(1, 4),
+        text_lengths=(4,), n_texts=16, repeats=1, verbose=False,
+    )
+
+    assert len(rows) == 2 * 2 * 2
+    row = rows[0]
+    assert row['dimensions'] == 384
+    assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms']
+    assert row['load_duration_ms'] == pytest.approx(50, abs=1)
+    assert row['cold_request_ms'] > row['warm_request_ms']
+
+    path = write_results(rows, tmp_path / 'results.csv')
+    with open(path, encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    assert header == CSV_COLUMNS
+    assert header[:6] == ['model', 'dimensions', 'avg_response_time_ms',
+                          'sim_12_similar', 'sim_13_different', 'discrimination']
+
+
+def test_cli_runs_offline_against_bundled_server(tmp_path):
+    output = tmp_path / 'bench.csv'
+    assert main(['--fake', '--models', 'all-minilm', '--batch-sizes', '4', '--concurrency', '2',
+                 '--text-lengths', '4', '--n-texts', '8', '--repeats', '1', '--output', str(output)]) == 0
+    assert output.exists()
@@ -0,0 +1,99 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils_chat_memory import ChatSessionStore, approx_tokens, format_chat_history
+
+
+def talk(history, turns, prefix="pergunta"):
+    for i in range(turns):
+        history.add_user_message(f"{prefix} {i}? Detalhes extras da pergunta.")
+        history.add_ai_message(f"resposta {i}. Explicação longa da resposta {i}.")
+
+
+def test_window_summary_and_recent(tmp_path):
+    store = ChatSessionStore(tmp_path / "chat.sqlite", recent_turns=2, summary_token_budget=40)
+    history = store.get_session_history("user_123")
+    other = store.get_session_history("user_456")
+    for i in range(10):  # sessões intercaladas: ids do SQLite não são contíguos por sessão
+        talk(history, 1, prefix=f"futebol {i}")
+        talk(other, 1, prefix=f"vôlei {i}")
+
+    messages = history.messages
+    assert isinstance(messages[0], SystemMessage)
+    assert [m.content for m in messages[1:]][0].startswith("futebol 8")
+    assert len(messages) == 5 and len(history) == 20
+    assert approx_tokens(history.summary) <= 40
+    assert "vôlei" not in history.summary and "futebol 7" in history.summary
+
+    assert history.recent(1)[0].content.startswith("futebol 9")
+    assert [m.content for m in history.recent(5)] == [m.content for m in history.all_messages()[-10:]]
+
+    text = format_chat_history(history.messages)
+    assert text.startswith("📝 Resumo") and text.count("👤 Usuário") == 2
+
+
+def test_persists_across_restarts(tmp_path):
+    path = tmp_path / "chat.sqlite"
+    store = ChatSessionStore(path, recent_turns=2)
+    talk(store.get_session_history("s"), 5)
+    before = store.get_session_history("s").messages
+    store.close()
+
+    reloaded = ChatSessionStore(path, recent_turns=2).get_session_history("s")
+    assert [m.content for m in reloaded.messages] == [m.content for m in before]
+    assert len(reloaded) == 10
+    talk(reloaded, 1, prefix="depois")
+    assert reloaded.recent(1)[0].content.startswith("depois")
+
+
+def test_lru_and_ttl_keep_memory_bounded(clock):
+    store = ChatSessionStore(max_sessions=2, ttl_seconds=60, clock=clock)
+    talk(store.get_session_history("a"), 1)
+    store.get_session_history("b")
+    store.get_session_history("a")
+    store.get_session_history("c")  # descarta "b" (menos recente)
+    assert len(store) == 2 and store.stats['evictions'] == 1
+
+    clock.now += 61
+    history = store.get_session_history("a")  # "a" e "c" expiraram; "a" volta do disco
+    assert store.stats['expirations'] == 2 and len(store) == 1
+    assert len(history) == 2 and history.messages[0].content.startswith("pergunta 0")
+
+    history.clear()
+    assert history.messages == [] and store.session_ids() == []
+
+
+def test_format_chat_history_matches_lab_output():
+    assert format_chat_history([]) == "Nenhuma conversa anterior."
+    messages = [HumanMessage("Olá"), AIMessage("Oi! Como posso ajudar?")] * 5
+    assert format_chat_history(messages).splitlines() == ["👤 Usuário: Olá", "🤖 Assistente: Oi! Como posso ajudar?"] * 3
+
+
+def test_evicted_history_held_by_caller_is_reused(clock):
+    store = ChatSessionStore(max_sessions=1, ttl_seconds=60, recent_turns=1, clock=clock)
+    chatbot_history = store.get_session_history("a")
+    talk(chatbot_history, 2)
+    store.get_session_history("b")  # "a" sai do LRU, mas o chatbot ainda guarda o objeto
+    clock.now += 61
+
+    assert store.get_session_history("a") is chatbot_history
+    talk(chatbot_history, 3, prefix="depois")
+    assert "depois" in store.get_session_history("a").summary and store.stats['loads'] == 2
+
+
+def test_message_leaving_the_window_goes_straight_to_the_summary():
+    calls = []
+
+    def summarize(previous, messages, budget):
+        calls.append(len(messages))
+        return "\n".join(filter(None, [previous] + [m.content for m in messages]))
+
+    store = ChatSessionStore(recent_turns=3, summarize=summarize)
+    history = store.get_session_history("s")
+    talk(history, 3)
+    assert calls == [] and history.summary == ""
+
+    history.add_messages([HumanMessage("pergunta 3?"), AIMessage("resposta 3.")])
+    assert calls == [2]  # uma chamada ao resumidor por troca
+    text = format_chat_history(history.messages)
+    assert "pergunta 0" in text and "resposta 0" in text  # no resumo
+    assert text.count("👤 Usuário") == 3
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_docstore import (
+    SQLiteDocstore, docstore_matches_index, docstore_path, load_local_sqlite, save_local_sqlite,
+)
+from utils_retriever_service import RetrieverService
+
+TEXTS = [f"{topic} trecho {i}" for topic in ("futebol", "lasanha", "iphone") for i in range(20)]
+METADATAS = [
+    {
+        'source': f"{text.split()[0]}.pdf",
+        'source_path': f"/data/pdfs/{text.split()[0]}.pdf",
+        'doc_type': 'manual',
+        'year': 2024,
+        'ingestion_date': "2024-05-01T10:00:00",
+        'page': i % 5,
+        'chunk_id': f"{i:064x}",
+    }
+    for i, text in enumerate(TEXTS)
+]
+
+
+def build_store():
+    return FAISS.from_texts(TEXTS, DeterministicFakeEmbedding(size=16), metadatas=METADATAS)
+
+
+def test_roundtrip_matches_pickled_store(tmp_path):
+    original = build_store()
+    save_local_sqlite(original, tmp_path / "idx")
+    assert not (tmp_path / "idx" / "index.pkl").exists()
+
+    loaded = load_local_sqlite(tmp_path / "idx", DeterministicFakeEmbedding(size=16))
+    assert loaded.index_to_docstore_id == original.index_to_docstore_id
+    for query in ("futebol trecho 3", "lasanha", "iphone trecho 19"):
+        expected = original.similarity_search_with_score(query, k=4)
+        got = loaded.similarity_search_with_score(query, k=4)
+        assert [(d.page_content, d.metadata, s) for d, s in got] == \
+            [(d.page_content, d.metadata, s) for d, s in expected]
+
+
+def test_repeated_metadata_is_dictionary_encoded(tmp_path):
+    save_local_sqlite(build_store(), tmp_path / "idx")
+    docstore = SQLiteDocstore(docstore_path(tmp_path / "idx"), read_only=True)
+
+    stats = docstore.stats()
+    # 3 sources + 3 paths + doc_type + year + ingestion_date + 5 páginas; chunk_id fica inline
+    assert stats['documents'] == len(TEXTS) and stats['metadata_values'] == 14
+    assert stats['cached_values'] == 0  # nada é lido antes de uma busca
+
+    first, second = docstore.mget([docstore.read_positions()[0], docstore.read_positions()[1]])
+    assert first.metadata['source_path'] is second.metadata['source_path']
+    assert docstore.stats()['cached_values'] <= 7
+
+
+def test_loaded_store_is_copy_on_write(tmp_path):
+    save_local_sqlite(build_store(), tmp_path / "idx")
+    path = docstore_path(tmp_path / "idx")
+    writer = load_local_sqlite(tmp_path / "idx", DeterministicFakeEmbedding(size=16))
+
+    new_ids = writer.add_texts(["vôlei trecho 0"], metadatas=[{'source': 'volei.pdf', 'doc_type': 'manual'}])
+    writer.delete([writer.index_to_docstore_id[0]])
+    on_disk = sqlite3.connect(path).execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    assert on_disk == len(TEXTS)  # alterações não salvas não vazam para o arquivo
+
+    save_local_sqlite(writer, tmp_path / "idx")
+    reloaded = load_local_sqlite(tmp_path / "idx", DeterministicFakeEmbedding(size=16))
+    assert len(reloaded.index_to_docstore_id) == reloaded.index.ntotal == len(TEXTS)
+    doc = reloaded.docstore.search(new_ids[0])
+    assert doc.page_content == "vôlei trecho 0" and doc.metadata == {'source': 'volei.pdf', 'doc_type': 'manual'}
+
+
+def test_resave_closes_own_read_only_docstore_before_replace(tmp_path, monkeypatch):
+    save_local_sqlite(build_store(), tmp_path / "idx")
+    embeddings = DeterministicFakeEmbedding(size=16)
+    loaded = load_local_sqlite(tmp_path / "idx", embeddings)
+    open_conn = loaded.docstore.conn
+    replace = os.replace
+
+    def windows_replace(src, dst):
+        # No Windows, trocar um arquivo ainda aberto levanta PermissionError
+        if str(dst) == loaded.docstore.path:
+            with pytest.raises(sqlite3.ProgrammingError):
+                open_conn.execute("SELECT 1")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', windows_replace)
+    save_local_sqlite(loaded, tmp_path / "idx")
+    assert loaded.docstore.read_only
+    assert loaded.similarity_search("lasanha trecho 4", k=1)[0].page_content == "lasanha trecho 4"
+    assert load_local_sqlite(tmp_path / "idx", embeddings).index.ntotal == len(TEXTS)
+
+
+def test_docstore_interface_matches_in_memory():
+    docstore = SQLiteDocstore()
+    docstore.add({'a': Document(page_content="x", metadata={'tags': ['a', 'b'], 'page': 1})})
+    assert docstore.search('a').metadata == {'tags': ['a', 'b'], 'page': 1}
+    assert docstore.search('zzz') == "ID zzz not found."
+    with pytest.raises(ValueError):
+        docstore.add({'a': Document(page_content="y")})
+    with pytest.raises(ValueError):
+        docstore.delete(['zzz'])
+    docstore.delete(['a'])
+    assert len(docstore) == 0
+
+
+def test_retriever_service_loads_and_hot_swaps_sqlite_docstore(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    save_local_sqlite(FAISS.from_texts(["iPhone 15", "bolo"], embeddings), tmp_path / "idx")
+    service = RetrieverService(tmp_path / "idx", embeddings, check_interval=0)
+    assert isinstance(service.vectorstore.docstore, SQLiteDocstore)
+    assert service.search("iPhone 15", k=1)[0].page_content == "iPhone 15"
+
+    save_local_sqlite(FAISS.from_texts(["iPhone 15", "bolo", "gol"], embeddings), tmp_path / "idx")
+    os.utime(docstore_path(tmp_path / "idx"), ns=(1, 1))
+    assert service.health()['vectors'] == 3 and service.reloads == 1
+
+
+def test_plain_save_local_makes_sqlite_docstore_stale(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    save_local_sqlite(FAISS.from_texts(["iPhone 15", "bolo"], embeddings), tmp_path / "idx")
+    assert docstore_matches_index(tmp_path / "idx")
+    service = RetrieverService(tmp_path / "idx", embeddings, check_interval=0)
+
+    FAISS.from_texts(["gol", "pênalti", "escanteio"], embeddings).save_local(str(tmp_path / "idx"))
+    assert not docstore_matches_index(tmp_path / "idx")
+    with pytest.raises(ValueError):
+        load_local_sqlite(tmp_path / "idx", embeddings)
+    assert service.search("gol", k=1)[0].page_content == "gol"
+    assert not isinstance(service.vectorstore.docstore, SQLiteDocstore)
+
+
+def test_interrupted_save_is_detected(tmp_path, monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    save_local_sqlite(FAISS.from_texts(["iPhone 15", "bolo"], embeddings), tmp_path / "idx")
+
+    replace = os.replace
+    calls = []
+
+    def crash_on_second(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError("processo interrompido")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', crash_on_second)
+    with pytest.raises(OSError):
+        save_local_sqlite(FAISS.from_texts(["gol", "pênalti", "escanteio"], embeddings), tmp_path / "idx")
+    with pytest.raises(ValueError):
+        load_local_sqlite(tmp_path / "idx", embeddings)
+
+
+def test_hot_swap_closes_old_docstore_after_inflight_searches(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    save_local_sqlite(FAISS.from_texts(["iPhone 15", "bolo"], embeddings), tmp_path / "idx")
+    service = RetrieverService(tmp_path / "idx", embeddings, check_interval=3600)
+    first = service.vectorstore.docstore
+
+    with service._acquire() as inflight:
+        save_local_sqlite(FAISS.from_texts(["gol", "pênalti", "escanteio"], embeddings), tmp_path / "idx")
+        os.utime(docstore_path(tmp_path / "idx"), ns=(1, 1))
+        assert service.reload()
+        assert inflight.similarity_search("bolo", k=1)[0].page_content == "bolo"
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.search(inflight.index_to_docstore_id[0])
+
+    second = service.vectorstore.docstore
+    save_local_sqlite(FAISS.from_texts(["lasanha"], embeddings), tmp_path / "idx")
+    os.utime(docstore_path(tmp_path / "idx"), ns=(2, 2))
+    assert service.reload()
+    with pytest.raises(sqlite3.ProgrammingError):
+        len(second)
+    assert service.search("lasanha", k=1)[0].page_content == "lasanha"
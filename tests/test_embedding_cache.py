@@ -0,0 +1,67 @@
+from langchain_core.embeddings import Embeddings
+
+from utils_embedding_cache import CachedEmbeddings, content_hash
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeddings determinísticos que contam quantos textos foram embedados."""
+
+    model = "fake-embed"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(sum(map(ord, t)) % 97), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_only_misses_are_sent_to_model(tmp_path):
+    base = CountingEmbeddings()
+    cache = CachedEmbeddings(base, tmp_path / "cache.sqlite")
+
+    first = cache.embed_documents(["a", "bb", "a"])
+    assert base.calls == [["a", "bb"]]
+
+    second = cache.embed_documents(["bb", "ccc", "a"])
+    assert base.calls[-1] == ["ccc"]
+    assert second[0] == first[1] and second[2] == first[0]
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["entries"] == 3
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    CachedEmbeddings(CountingEmbeddings(), path).embed_documents(["texto"])
+
+    base = CountingEmbeddings()
+    vectors = CachedEmbeddings(base, path).embed_documents([" texto \n"])
+    assert base.calls == []
+    assert vectors == [[5.0, float(sum(map(ord, "texto")) % 97), 1.0]]
+
+
+def test_lru_eviction_respects_max_entries(tmp_path):
+    cache = CachedEmbeddings(CountingEmbeddings(), tmp_path / "c.sqlite", max_entries=2)
+    cache.embed_documents(["x"])
+    cache.embed_documents(["y"])
+    cache.embed_documents(["x"])  # x passa a ser o mais recente
+    cache.embed_documents(["z"])
+
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache._lookup({content_hash("y")}) == {}
+
+
+def test_model_name_is_part_of_the_key(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    CachedEmbeddings(CountingEmbeddings(), path, model_name="m1").embed_documents(["t"])
+
+    base = CountingEmbeddings()
+    CachedEmbeddings(base, path, model_name="m2").embed_documents(["t"])
+    assert base.calls == [["t"]]
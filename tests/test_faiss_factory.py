@@ -0,0 +1,46 @@
+import faiss
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_faiss_factory import ApproximateFAISS, resolve_factory
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=32)
+DOCS = [Document(page_content=f"chunk {i}", metadata={'page': i % 5}) for i in range(2000)]
+
+
+def test_presets_scale_down_for_small_corpora():
+    assert resolve_factory('ivf4096', 2000) == ('IVF51,Flat', {'nprobe': 32})
+    assert resolve_factory('ivf_pq', 2000, dim=48) == ('IVF51,PQ24x5', {'nprobe': 32})
+    assert resolve_factory('auto', 1000)[0] == 'Flat'
+    assert resolve_factory('HNSW16,Flat', 10) == ('HNSW16,Flat', {})
+
+
+@pytest.mark.parametrize('preset', ['hnsw32', 'ivf4096', 'ivf_pq'])
+def test_drop_in_for_from_documents(preset):
+    store = ApproximateFAISS.from_documents(DOCS, EMBEDDINGS, index_factory=preset)
+
+    assert not isinstance(faiss.downcast_index(store.index), faiss.IndexFlat)
+    doc = store.similarity_search("chunk 42", k=1)[0]
+    assert doc.page_content == "chunk 42"
+    retriever = store.as_retriever(search_kwargs={'k': 3, 'filter': {'page': 2}})
+    assert all(d.metadata['page'] == 2 for d in retriever.invoke("chunk 42"))
+
+
+def test_search_params_persist_and_can_be_overridden(tmp_path):
+    store = ApproximateFAISS.from_documents(DOCS, EMBEDDINGS, index_factory='ivf4096')
+    store.save_local(str(tmp_path))
+
+    loaded = ApproximateFAISS.load_local(str(tmp_path), EMBEDDINGS, allow_dangerous_deserialization=True)
+    assert loaded.search_params == {'nprobe': 32}
+    assert faiss.extract_index_ivf(loaded.index).nprobe == 32
+
+    # nprobe=1 visita uma única lista; nprobe=nlist equivale à busca exata
+    exact = loaded.similarity_search_with_score("chunk 7", k=5, nprobe=51)
+    assert [d.page_content for d, _ in exact][0] == "chunk 7"
+    assert faiss.extract_index_ivf(loaded.index).nprobe == 32
+
+    # O FAISS comum continua conseguindo abrir o diretório
+    plain = FAISS.load_local(str(tmp_path), EMBEDDINGS, allow_dangerous_deserialization=True)
+    assert plain.index.ntotal == len(DOCS)
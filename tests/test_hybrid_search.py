@@ -0,0 +1,82 @@
+from langchain_core.documents import Document
+
+from utils_hybrid_search import (
+    BM25Index,
+    HybridRetriever,
+    is_identifier_query,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+DOCS = [
+    Document(page_content="O iPhone 17 Pro usa o chip A17 Pro com GPU de 6 núcleos.", metadata={'chunk_id': 'iphone'}),
+    Document(page_content="A API retorna erro 422 quando o payload é inválido.", metadata={'chunk_id': 'api-422'}),
+    Document(page_content="A API retorna erro 401 quando o token expira.", metadata={'chunk_id': 'api-401'}),
+    Document(page_content="O Real Metrópolis venceu o campeonato de futebol de 2023.", metadata={'chunk_id': 'futebol'}),
+]
+
+
+class CountingVectorStore:
+    """Vectorstore falso que conta as buscas densas."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.calls += 1
+        return self.results[:k]
+
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    tokens = tokenize("Versão 4.422 do SKU-17, Atualização")
+    assert {'versao', '4.422', '4', '422', 'sku-17', 'sku', '17', 'atualizacao'} <= set(tokens)
+    assert 'do' not in tokens
+
+
+def test_identifier_query_detection():
+    assert is_identifier_query("A17 Pro")
+    assert is_identifier_query("erro 422")
+    assert is_identifier_query('"Real Metrópolis"')
+    assert not is_identifier_query("como configurar a autenticação da API?")
+    assert not is_identifier_query("quais times venceram campeonatos depois de 2020 no brasil?")
+    assert not is_identifier_query("Como foi o campeonato de 2023?")
+    assert is_identifier_query("SKU-1234") and is_identifier_query("2023")
+
+
+def test_bm25_ranks_exact_tokens_and_skips_duplicates(tmp_path):
+    index = BM25Index()
+    assert index.add_documents(DOCS) == 4
+    assert index.add_documents(DOCS[:2]) == 0
+
+    results = index.search("erro 422", k=2)
+    assert [d.metadata['chunk_id'] for d, _ in results] == ['api-422', 'api-401']
+    assert results[0][1] > results[1][1]
+    assert index.search("palavra inexistente") == []
+
+    index.save(tmp_path / "bm25.pkl")
+    loaded = BM25Index.load(tmp_path / "bm25.pkl")
+    assert loaded.search("A17", k=1)[0][0].metadata['chunk_id'] == 'iphone'
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = DOCS[:3]
+    fused = reciprocal_rank_fusion([[a, b], [c, b]])
+    assert fused[0][0] is b
+    assert {d.metadata['chunk_id'] for d, _ in fused} == {'iphone', 'api-422', 'api-401'}
+
+
+def test_identifier_queries_skip_dense_search():
+    index = BM25Index()
+    index.add_documents(DOCS)
+    dense = CountingVectorStore([DOCS[3], DOCS[1]])
+    retriever = HybridRetriever(vectorstore=dense, lexical_index=index, k=2)
+
+    docs = retriever.invoke("A17 Pro")
+    assert docs[0].metadata['chunk_id'] == 'iphone'
+    assert dense.calls == 0
+
+    fused = retriever.search("payload inválido na API")
+    assert dense.calls == 1
+    assert fused[0][0].metadata['chunk_id'] == 'api-422'
+    assert retriever.stats == {'lexical_only': 1, 'hybrid': 1}
@@ -0,0 +1,93 @@
+import hashlib
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_incremental_index import IncrementalFAISSIndex, read_current_version
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def load_chunks(path):
+    """Um chunk por linha do arquivo, com chunk_id como no lab 3.6."""
+    chunks = []
+    for page, line in enumerate(path.read_text().splitlines()):
+        chunk_id = hashlib.sha256(f"{line}|{path.name}|{page}".encode()).hexdigest()
+        chunks.append(Document(page_content=line, metadata={'source': path.name, 'page': page, 'chunk_id': chunk_id}))
+    return chunks
+
+
+def test_sync_only_embeds_changes(tmp_path):
+    docs = tmp_path / "pdfs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("futebol\ntática 4-4-2")
+    (docs / "b.txt").write_text("receita de bolo")
+    embeddings = CountingEmbeddings(size=8)
+
+    index = IncrementalFAISSIndex(embeddings, tmp_path / "index", compaction_ratio=1.0)
+    result = index.sync(sorted(docs.glob("*.txt")), load_chunks)
+    assert result['embedded'] == 3 and index.version == 1
+
+    # Altera uma linha de a.txt e remove b.txt
+    (docs / "a.txt").write_text("futebol\ntática 4-3-3")
+    (docs / "b.txt").unlink()
+    result = index.sync(sorted(docs.glob("*.txt")), load_chunks)
+
+    assert result['plan']['changed'] == [str(docs / "a.txt")]
+    assert result['plan']['deleted'] == [str(docs / "b.txt")]
+    assert result['embedded'] == 1 and result['kept'] == 1 and result['removed'] == 2
+    assert embeddings.embedded == 4
+    assert index.live_count == 2
+
+    found = [d.page_content for d in index.similarity_search("receita de bolo", k=5)]
+    assert "receita de bolo" not in found and "tática 4-4-2" not in found
+
+
+def test_compaction_and_reload(tmp_path):
+    docs = tmp_path / "pdfs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("um\ndois\ntrês\nquatro")
+    embeddings = DeterministicFakeEmbedding(size=8)
+
+    index = IncrementalFAISSIndex(embeddings, tmp_path / "index", compaction_ratio=0.5)
+    index.sync([docs / "a.txt"], load_chunks)
+    (docs / "a.txt").write_text("um\ndois")
+    index.sync([docs / "a.txt"], load_chunks)
+
+    assert index.tombstones == set()
+    assert index.vectorstore.index.ntotal == 2
+
+    reloaded = IncrementalFAISSIndex(embeddings, tmp_path / "index")
+    assert reloaded.version == 2
+    assert read_current_version(tmp_path / "index").name == "v000002"
+    assert reloaded.plan([docs / "a.txt"])['unchanged'] == [str(docs / "a.txt")]
+
+
+def test_removing_every_file_persists_an_empty_version(tmp_path):
+    docs = tmp_path / "pdfs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("um\ndois")
+    embeddings = DeterministicFakeEmbedding(size=8)
+
+    index = IncrementalFAISSIndex(embeddings, tmp_path / "index", compaction_ratio=0.5)
+    index.sync([docs / "a.txt"], load_chunks)
+    (tmp_path / "index" / "v000002").mkdir()  # versão órfã de uma execução interrompida
+    result = index.sync([], load_chunks)
+
+    assert result['removed'] == 2 and index.vectorstore is None
+    assert read_current_version(tmp_path / "index").name == "v000003"
+
+    reloaded = IncrementalFAISSIndex(embeddings, tmp_path / "index")
+    assert reloaded.vectorstore is None and reloaded.manifest == {}
+    assert reloaded.similarity_search("um") == []
+
+    from utils_retriever_service import RetrieverService
+
+    service = RetrieverService(tmp_path / "index", embeddings)
+    assert service.search("um") == [] and service.health()['status'] == 'empty'
@@ -0,0 +1,101 @@
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils_hybrid_search import BM25Index
+from utils_instrumentation import Metrics
+from utils_near_duplicates import NearDuplicateDetector
+from utils_ingestion_pipeline import PageCache, iter_pdf_pages, run_ingestion_pipeline
+
+PDF_DIR = Path(__file__).parent.parent / "data" / "pdfs"
+
+
+def test_pipeline_indexes_pdfs_and_reuses_page_cache(tmp_path):
+    pdf_paths = sorted(PDF_DIR.glob("manual_futebol_*.pdf"))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1800, chunk_overlap=300)
+    embeddings = DeterministicFakeEmbedding(size=16)
+    cache = PageCache(tmp_path / "pages")
+    lexical_index = BM25Index()
+    metrics = Metrics()
+
+    def metadata_fn(path):
+        return {'source': path.name, 'doc_type': 'manual'}
+
+    vectorstore, stats = run_ingestion_pipeline(
+        pdf_paths, splitter, embeddings,
+        metadata_fn=metadata_fn, page_cache=cache,
+        embed_batch_size=8, queue_size=1, max_workers=2, verbose=False,
+        lexical_index=lexical_index, near_duplicates=NearDuplicateDetector(threshold=0.8),
+        metrics=metrics,
+    )
+    assert stats['pdfs'] == len(pdf_paths) and stats['pdfs_from_cache'] == 0
+    assert stats['embedded'] == vectorstore.index.ntotal == len(lexical_index)
+    assert stats['embedded'] + stats['duplicates'] == stats['chunks']
+    # manual_futebol_2025_com_dup.pdf repete páginas: dedup cross-page
+    assert stats['duplicates_crosspage'] > 0
+    # manual_futebol_2023_copia.pdf é uma cópia reformatada: quase-duplicatas
+    assert stats['near_duplicates_crosspage'] > 0
+
+    summary = metrics.summary()
+    assert summary['pdf_load']['calls'] == len(pdf_paths)
+    assert summary['pdf_load']['count'] == stats['pages']
+    assert summary['dedup']['count'] == stats['chunks']
+    assert summary['embed']['count'] == summary['index_add']['count'] == stats['embedded']
+    assert summary['embed']['calls'] == stats['batches'] and summary['embed']['bytes'] > 0
+
+    doc = next(iter(vectorstore.docstore._dict.values()))
+    assert doc.metadata['doc_type'] == 'manual'
+    assert len(doc.metadata['chunk_id']) == 64
+
+    _, cached_stats = run_ingestion_pipeline(
+        pdf_paths, splitter, embeddings,
+        metadata_fn=metadata_fn, page_cache=cache, verbose=False,
+        near_duplicates=NearDuplicateDetector(threshold=0.8),
+    )
+    assert cached_stats['pdfs_from_cache'] == len(pdf_paths)
+    assert cached_stats['embedded'] == stats['embedded']
+
+
+def test_page_cache_keeps_the_path_of_identical_files(tmp_path):
+    original = PDF_DIR / "manual_futebol_2025.pdf"
+    pdf_paths = [tmp_path / "a" / "manual.pdf", tmp_path / "b" / "manual_copia.pdf"]
+    for path in pdf_paths:
+        path.parent.mkdir()
+        shutil.copy(original, path)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1800, chunk_overlap=300)
+    cache = PageCache(tmp_path / "pages")
+
+    def ingest():
+        _, stats = run_ingestion_pipeline(
+            pdf_paths, splitter, DeterministicFakeEmbedding(size=16),
+            page_cache=cache, max_workers=1, verbose=False,
+        )
+        return stats
+
+    cold, warm = ingest(), ingest()
+    assert warm['pdfs_from_cache'] == 2
+    for key in ('chunks', 'embedded', 'duplicates_samepage', 'duplicates_crosspage'):
+        assert warm[key] == cold[key]
+    # A cópia repete todos os chunks do original, mas em outro arquivo
+    assert warm['duplicates_samepage'] == 0 and warm['duplicates_crosspage'] == warm['embedded']
+
+    for path, pages in iter_pdf_pages(pdf_paths, page_cache=cache, max_workers=1):
+        assert {p['metadata']['source'] for p in pages} == {str(path)}
+
+def test_embedding_failure_stops_the_producer():
+    class FailingEmbeddings(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            raise RuntimeError("Ollama fora do ar")
+
+    threads_before = threading.active_count()
+    with pytest.raises(RuntimeError, match="fora do ar"):
+        run_ingestion_pipeline(
+            sorted(PDF_DIR.glob("*.pdf")), RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=0),
+            FailingEmbeddings(size=8), embed_batch_size=2, queue_size=1, max_workers=1, verbose=False,
+        )
+    assert threading.active_count() == threads_before
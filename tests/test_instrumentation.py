@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from utils_instrumentation import (
+    JSONLinesSink, Metrics, PostgresSink, PrometheusTextSink, SQLiteSink, record_timings,
+)
+
+
+class ListSink:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, records):
+        self.writes.append(list(records))
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.cursors_closed += 1
+
+    def executemany(self, sql, rows):
+        if self.conn.fail:
+            raise RuntimeError("conexão perdida")
+        self.conn.pending.extend((sql, row) for row in rows)
+
+
+class FakePgConnection:
+    """Conexão DB-API no estilo do psycopg2: sem `executemany`, transação via `with`."""
+
+    def __init__(self):
+        self.pending, self.committed = [], []
+        self.cursors_closed = 0
+        self.fail = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.committed.extend(self.pending)
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def test_stage_records_duration_status_and_summary():
+    metrics = Metrics()
+    with metrics.stage('split', count=3) as m:
+        m['bytes'] = 100
+    with pytest.raises(ValueError):
+        with metrics.stage('split', count=2):
+            raise ValueError("pdf corrompido")
+
+    @metrics.timed('pdf_load', count=len)
+    def load(n):
+        return list(range(n))
+
+    assert load(5) == [0, 1, 2, 3, 4]
+
+    summary = metrics.summary()
+    assert summary['split']['calls'] == 2 and summary['split']['errors'] == 1
+    assert summary['split']['count'] == 5 and summary['split']['bytes'] == 100
+    assert summary['split']['mean_ms'] == summary['split']['total_ms'] / 2
+    assert summary['pdf_load']['count'] == 5
+    assert summary['pdf_load']['max_rss_mb'] > 0
+
+
+def test_records_are_buffered_and_flushed_in_batches():
+    sink = ListSink()
+    metrics = Metrics(sink=sink, flush_every=4, flush_interval=3600)
+    for i in range(10):
+        metrics.record('embed', 1.0, count=i)
+    assert [len(w) for w in sink.writes] == [4, 4]
+
+    metrics.close()
+    assert [len(w) for w in sink.writes] == [4, 4, 2]
+    record = sink.writes[0][1]
+    assert record['operation_type'] == 'embed' and record['status'] == 'success'
+    assert record['details']['count'] == 1 and record['details']['duration_ms'] == 1.0
+
+
+def test_sqlite_jsonl_and_prometheus_sinks(tmp_path):
+    sqlite_sink = SQLiteSink(tmp_path / "metrics.sqlite")
+    prom_path = tmp_path / "rag.prom"
+    metrics = Metrics(sink=[sqlite_sink, JSONLinesSink(tmp_path / "metrics.jsonl"), PrometheusTextSink(prom_path)])
+    metrics.record('embed', 250.0, count=64, bytes=1024)
+    metrics.record('embed', 750.0, count=32, bytes=512)
+    metrics.record('retrieve', 3.0, status='error', error='timeout')
+    metrics.close()
+
+    rows = sqlite3.connect(tmp_path / "metrics.sqlite").execute(
+        "SELECT operation_type, status, details FROM operation_logs ORDER BY id").fetchall()
+    assert [(r[0], r[1]) for r in rows] == [('embed', 'success'), ('embed', 'success'), ('retrieve', 'error')]
+    assert json.loads(rows[2][2])['error'] == 'timeout'
+
+    lines = (tmp_path / "metrics.jsonl").read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 3 and json.loads(lines[0])['details']['bytes'] == 1024
+
+    prom = prom_path.read_text(encoding='utf-8')
+    assert 'rag_stage_calls_total{stage="embed",status="success"} 2' in prom
+    assert 'rag_stage_duration_seconds_total{stage="embed",status="success"} 1.0' in prom
+    assert 'rag_stage_items_total{stage="embed",status="success"} 96' in prom
+    assert 'rag_stage_calls_total{stage="retrieve",status="error"} 1' in prom
+
+
+def test_postgres_sink_inserts_through_a_cursor():
+    conn = FakePgConnection()
+    metrics = Metrics(sink=PostgresSink(connection=conn))
+    metrics.record('embed', 250.0, count=64)
+    metrics.record('retrieve', 3.0, status='error', error='timeout')
+    metrics.flush()
+
+    assert [row[:2] for _, row in conn.committed] == [('embed', 'success'), ('retrieve', 'error')]
+    assert all('%s' in sql for sql, _ in conn.committed) and conn.cursors_closed == 1
+
+    conn.fail = True
+    with pytest.raises(RuntimeError):
+        PostgresSink(connection=conn).write([{'operation_type': 'embed', 'status': 'success',
+                                             'details': {}, 'created_at': 0.0}])
+    assert len(conn.committed) == 2 and conn.cursors_closed == 2
+
+
+def test_record_timings_and_disabled_metrics():
+    metrics = Metrics()
+    record_timings(metrics, {'embed_ms': 5.0, 'search_ms': 0.0, 'questions': 3})
+    assert list(metrics.summary()) == ['embed']
+
+    record_timings(metrics, {'search_ms': 2.0}, {'search_ms': 'retrieve'})
+    assert metrics.summary()['retrieve']['total_ms'] == 2.0
+
+    disabled = Metrics(sink=ListSink(), enabled=False)
+    with disabled.stage('embed', count=1):
+        pass
+    assert disabled.summary() == {} and disabled.flush() == 0
+
+
+def test_stage_overhead_is_small():
+    metrics = Metrics(sink=ListSink(), flush_every=1024)
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.stage('retrieve', count=4):
+            pass
+    per_stage_us = (time.perf_counter() - start) / n * 1e6
+    assert per_stage_us < 100
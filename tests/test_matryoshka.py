@@ -0,0 +1,38 @@
+import numpy as np
+
+from utils_matryoshka import MatryoshkaIndex, evaluate_truncation_levels
+
+
+def _matryoshka_like(n, dim=256, seed=0):
+    """Vetores cuja variância decai com a dimensão (sinal concentrado no prefixo)."""
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(np.arange(1, dim + 1))
+    return (rng.normal(size=(n, dim)) * scale).astype(np.float32)
+
+
+def test_rescoring_recovers_exact_neighbours(tmp_path):
+    corpus = _matryoshka_like(2000)
+    queries = corpus[:20] + 0.01 * _matryoshka_like(20, seed=1)
+
+    index = MatryoshkaIndex(coarse_dim=64, oversample=8, store_dir=tmp_path).build(corpus)
+    scores, ids = index.search(queries, k=5)
+
+    assert isinstance(index.full_vectors, np.memmap)
+    assert (ids[:, 0] == np.arange(20)).all()
+    assert (np.diff(scores, axis=1) <= 1e-6).all()
+
+    index.save(tmp_path)
+    reloaded = MatryoshkaIndex.load(tmp_path)
+    np.testing.assert_array_equal(reloaded.search(queries, k=5)[1], ids)
+
+
+def test_evaluate_truncation_levels_reports_each_level():
+    corpus = _matryoshka_like(1000)
+    queries = _matryoshka_like(10, seed=2)
+
+    results = evaluate_truncation_levels(corpus, queries, dims=(32, 128, 512), k=5)
+
+    assert [r['dim'] for r in results] == [256, 32, 128]
+    for r in results[1:]:
+        assert r['recall_rescored'] >= r['recall_coarse']
+        assert r['memory_ratio'] == 256 / r['dim']
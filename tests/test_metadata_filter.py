@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_metadata_filter import MetadataIndex, PrefilteredFAISS
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=32)
+DOC_TYPES = ['manual', 'relatorio', 'artigo']
+DOCS = [
+    Document(
+        page_content=f"chunk {i}",
+        metadata={'doc_type': DOC_TYPES[i % 3], 'year': 2023 + i % 3 if i % 7 else 2020, 'source': f"f{i % 10}.pdf"},
+    )
+    for i in range(3000)
+]
+
+
+def test_candidates_resolve_langchain_filters():
+    index = MetadataIndex()
+    for i, doc in enumerate(DOCS[:30]):
+        index.add(i, doc.metadata)
+
+    manual = index.candidates({'doc_type': 'manual'})
+    assert manual.tolist() == list(range(0, 30, 3))
+    both = index.candidates({'doc_type': {'$in': ['manual', 'artigo']}, 'year': 2020})
+    assert both.tolist() == [0, 14, 21]
+    assert len(index.candidates({'doc_type': 'receita'})) == 0
+    assert index.candidates({'page': 1}) is None
+    assert index.candidates({'year': {'$gt': 2023}}) is None
+
+
+@pytest.mark.parametrize('index_factory', ['flat', 'hnsw32'])
+def test_prefilter_matches_exhaustive_search(index_factory):
+    store = PrefilteredFAISS.from_documents(DOCS, EMBEDDINGS, index_factory=index_factory, brute_force_threshold=500)
+    exact = FAISS.from_documents(DOCS, EMBEDDINGS)
+    query = EMBEDDINGS.embed_query("chunk 42")
+
+    # Seletivo (força bruta) e amplo (IDSelector)
+    for filter in [{'year': 2020}, {'doc_type': 'manual'}]:
+        results = store.similarity_search_with_score_by_vector(query, k=5, filter=filter)
+        expected = exact.similarity_search_with_score_by_vector(query, k=5, filter=filter, fetch_k=len(DOCS))
+        assert len(results) == 5
+        assert all(doc.metadata[key] == value for doc, _ in results for key, value in filter.items())
+        if index_factory == 'flat':
+            assert [d.page_content for d, _ in results] == [d.page_content for d, _ in expected]
+            np.testing.assert_allclose([s for _, s in results], [s for _, s in expected], rtol=1e-5)
+
+    assert store.filter_stats['brute_force'] >= 1
+    assert store.filter_stats['brute_force'] + store.filter_stats['id_selector'] == 2
+
+
+def test_wraps_existing_store_and_tracks_new_vectors():
+    base = FAISS.from_documents(DOCS[:100], EMBEDDINGS)
+    store = PrefilteredFAISS.from_faiss(base)
+    assert len(store.metadata_index) == 100
+
+    store.add_documents([Document(page_content="receita de bolo", metadata={'doc_type': 'receita', 'year': 2025})])
+    docs = store.similarity_search("bolo", k=4, filter={'doc_type': 'receita'})
+    assert [d.page_content for d in docs] == ["receita de bolo"]
+
+    # Filtros não indexados continuam funcionando pelo pós-filtro
+    docs = store.similarity_search("chunk 3", k=2, filter=lambda m: m['source'] == 'f3.pdf')
+    assert docs and all(d.metadata['source'] == 'f3.pdf' for d in docs)
+    assert store.filter_stats['post_filter'] == 1
+
+
+def test_delete_then_add_rebuilds_the_metadata_index():
+    base = FAISS.from_documents(DOCS[:30], EMBEDDINGS, ids=[str(i) for i in range(30)])
+    store = PrefilteredFAISS.from_faiss(base)
+
+    store.delete(['0'])
+    store.add_documents([Document(page_content="novo artigo", metadata={'doc_type': 'artigo'})])
+    assert store.index.ntotal == 30  # mesmo tamanho, posições renumeradas
+
+    docs = store.similarity_search("chunk", k=20, filter={'doc_type': 'manual'})
+    assert len(docs) == 9 and all(d.metadata['doc_type'] == 'manual' for d in docs)
+
+
+def test_concurrent_syncs_index_each_position_once():
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = FAISS.from_documents(DOCS[:2000], EMBEDDINGS)
+    index = MetadataIndex()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: index.sync(store), range(8)))
+
+    assert sum(index.values('doc_type').values()) == 2000
+    assert index.candidates({'doc_type': 'manual', 'year': 2020}) is not None
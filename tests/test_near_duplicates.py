@@ -0,0 +1,44 @@
+import random
+
+from utils_near_duplicates import NearDuplicateDetector, optimal_lsh_params
+
+WORDS = ("futebol tática formação defesa ataque meio campo goleiro lateral zagueiro volante "
+         "pressão posse bola contra-ataque escanteio falta pênalti árbitro regra impedimento").split()
+
+
+def make_text(seed: int, n: int = 200) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def test_lsh_params_follow_threshold():
+    strict_bands, strict_rows = optimal_lsh_params(0.9, 128)
+    loose_bands, loose_rows = optimal_lsh_params(0.5, 128)
+    assert strict_bands * strict_rows <= 128
+    assert strict_rows > loose_rows
+
+
+def test_reformatted_copies_are_near_duplicates():
+    detector = NearDuplicateDetector(threshold=0.8)
+    original = make_text(1)
+    reformatted = original.upper().replace(" ", "  \n", 10) + "."
+    edited = original.replace(original.split()[100], "substituída", 1)
+
+    assert detector.add(original, key='a', location=('m2023.pdf', 0)) is None
+    assert detector.add(make_text(2), key='b', location=('m2023.pdf', 1)) is None
+    assert detector.add(reformatted, key='c', location=('m2025.pdf', 0)) == ('a', 'crosspage')
+    assert detector.add(edited, key='d', location=('m2023.pdf', 0)) == ('a', 'samepage')
+
+    assert detector.query(make_text(3)) is None
+    assert detector.stats == {'unique': 2, 'samepage': 1, 'crosspage': 1}
+    assert detector.clusters() == [
+        {'original': 'a', 'location': ('m2023.pdf', 0), 'duplicates': ['c', 'd'], 'size': 3},
+    ]
+
+
+def test_scales_beyond_initial_capacity():
+    detector = NearDuplicateDetector(threshold=0.8, num_perm=64)
+    for i in range(1500):
+        detector.add(make_text(i, n=40))
+    assert detector.stats['unique'] == 1500
+    assert detector.memory_bytes() > 1500 * 64 * 4
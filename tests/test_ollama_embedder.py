@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from utils_ollama_embedder import OllamaEmbedder
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Simula o `/api/embed`: o vetor de cada texto é [len(texto)]."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json, timeout):
+        with self.lock:
+            self.requests.append(json['input'])
+        inputs = json['input'] if isinstance(json['input'], list) else [json['input']]
+        return FakeResponse({'embeddings': [[float(len(t))] for t in inputs]})
+
+    def close(self):
+        pass
+
+
+def make_embedder(**kwargs):
+    embedder = OllamaEmbedder('http://fake:11434', **kwargs)
+    embedder.session = FakeSession()
+    return embedder
+
+
+def test_embed_batch_sends_lists_and_keeps_order():
+    embedder = make_embedder(batch_size=3, max_workers=2, adaptive=False)
+    texts = ['x' * n for n in range(1, 11)]
+
+    embeddings, meta = embedder.embed_batch(texts, return_metadata=True)
+
+    assert embeddings == [[float(n)] for n in range(1, 11)]
+    assert all(isinstance(r, list) for r in embedder.session.requests)
+    assert [m['texts_in_batch'] for m in meta] == [3, 3, 3, 1]
+    assert all(m['texts_per_sec'] > 0 for m in meta)
+
+
+def test_adaptive_batch_grows_when_latency_is_low():
+    embedder = make_embedder(batch_size=2, max_workers=1, max_batch_size=8, target_latency_ms=10_000)
+    embedder.embed_batch(['t'] * 40)
+    assert embedder.batch_size == 8
+
+
+def test_adaptive_batch_shrinks_when_latency_is_high():
+    embedder = make_embedder(batch_size=16, max_workers=1, min_batch_size=4, target_latency_ms=0.0)
+    embedder.embed_batch(['t'] * 40)
+    assert embedder.batch_size == 4
+
+
+def test_api_error_raises():
+    embedder = make_embedder()
+    embedder.session.post = lambda url, json, timeout: FakeResponse({'error': 'x'}, 500)
+    with pytest.raises(RuntimeError):
+        embedder.embed_batch(['a'])
+
+
+def test_throughput_summary():
+    meta = [
+        {'texts_in_batch': 4, 'latency_ms': 100.0},
+        {'texts_in_batch': 2, 'latency_ms': 50.0},
+    ]
+    summary = OllamaEmbedder.throughput_summary(meta, wall_time_s=0.1)
+    assert summary['texts'] == 6
+    assert summary['avg_batch_size'] == 3
+    assert summary['texts_per_sec'] == pytest.approx(60.0)
@@ -0,0 +1,32 @@
+import json
+
+from pypdf import PdfReader
+
+from utils_pdf_generator import gerar_corpus_sintetico
+
+
+def read_ground_truth(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_synthetic_corpus_is_reproducible_and_matches_ground_truth(tmp_path):
+    params = dict(paginas=(3, 6), taxa_duplicacao=0.5, taxa_copias=0.5, seed=7, max_workers=2)
+    gt_a = read_ground_truth(gerar_corpus_sintetico(6, tmp_path / "a", **params))
+    gt_b = read_ground_truth(gerar_corpus_sintetico(6, tmp_path / "b", **params))
+    assert gt_a == gt_b
+
+    manifest = json.loads((tmp_path / "a" / "corpus_manifest.json").read_text(encoding="utf-8"))
+    assert manifest["total_pdfs"] == 6 + 3
+    assert manifest["total_consultas"] == len(gt_a)
+
+    pages = {}
+    for pdf in (tmp_path / "a").glob("*.pdf"):
+        for number, page in enumerate(PdfReader(pdf).pages):
+            pages[(pdf.name, number)] = page.extract_text()
+
+    for record in gt_a:
+        code = record["query"].rsplit(" ", 1)[-1].rstrip("?")
+        relevant = {(r["source"], r["page"]) for r in record["relevant"]}
+        # Gabarito completo: inclui duplicatas de duplicatas e as cópias do documento
+        assert relevant == {key for key, text in pages.items() if code in text}
+        assert record["doc_type"] in {"manual", "relatorio", "artigo", "receita"}
@@ -0,0 +1,95 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+
+from utils_ingestion_pipeline import generate_chunk_id
+from utils_qdrant_ingestion import QdrantBulkLoader, chunk_point_id, point_id
+
+
+class HashEmbeddings(Embeddings):
+    """Embeddings determinísticos; opcionalmente falham após N batches."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.batches = 0
+
+    def _embed(self, text):
+        return [float((hash(text) >> s) % 7 + 1) for s in range(0, 32, 4)]
+
+    def embed_documents(self, texts):
+        self.batches += 1
+        if self.fail_after is not None and self.batches > self.fail_after:
+            raise RuntimeError("Ollama caiu")
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class RecordingClient(QdrantClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thresholds = []
+
+    def update_collection(self, collection_name, optimizers_config=None, **kwargs):
+        self.thresholds.append(optimizers_config.indexing_threshold)
+        return super().update_collection(collection_name, optimizers_config=optimizers_config, **kwargs)
+
+
+def make_chunks(n):
+    return [Document(page_content=f"chunk {i} sobre futebol", metadata={'source': 'a.pdf', 'page': i // 10})
+            for i in range(n)]
+
+
+def test_point_ids_are_deterministic():
+    chunk = make_chunks(1)[0]
+    chunk_id = generate_chunk_id(chunk.page_content, chunk.metadata)
+    assert chunk_point_id(chunk) == point_id(chunk_id) == chunk_point_id(make_chunks(1)[0])
+    assert chunk_point_id(Document(page_content="x", metadata={'chunk_id': chunk_id})) == point_id(chunk_id)
+
+
+def test_resumes_after_crash_without_duplicates(tmp_path):
+    client = RecordingClient(path=str(tmp_path / "qdrant"))
+    chunks = make_chunks(100)
+    checkpoint = tmp_path / "ingest.ckpt"
+
+    crashing = QdrantBulkLoader(client, "docs", HashEmbeddings(fail_after=3), batch_size=10,
+                                parallel=1, checkpoint_path=checkpoint)
+    with pytest.raises(RuntimeError):
+        crashing.load(chunks)
+    assert client.count("docs").count == 30
+    assert client.thresholds == [0, 20000]  # indexação reativada mesmo com erro
+
+    resumed = QdrantBulkLoader(client, "docs", HashEmbeddings(), batch_size=10, parallel=3,
+                               checkpoint_path=checkpoint)
+    stats = resumed.load(chunks + chunks[:5])
+    assert (stats['points'], stats['skipped'], stats['batches']) == (70, 35, 7)
+    assert client.count("docs").count == 100
+
+    again = QdrantBulkLoader(client, "docs", HashEmbeddings(), checkpoint_path=checkpoint).load(chunks)
+    assert again['points'] == 0 and not again['indexing_deferred']
+
+
+def test_vectorstore_reads_loaded_points():
+    client = QdrantClient(":memory:")
+    loader = QdrantBulkLoader(client, "docs", HashEmbeddings(), batch_size=16)
+    loader.load(make_chunks(40))
+    docs = loader.as_vectorstore().similarity_search("chunk 7 sobre futebol", k=1)
+    assert docs[0].page_content == "chunk 7 sobre futebol"
+    assert docs[0].metadata['source'] == 'a.pdf'
+
+
+def test_stale_checkpoint_is_discarded_when_collection_is_gone(tmp_path):
+    client = QdrantClient(":memory:")
+    checkpoint = tmp_path / "ingest.ckpt"
+    QdrantBulkLoader(client, "docs", HashEmbeddings(), checkpoint_path=checkpoint).load(make_chunks(20))
+
+    client.delete_collection("docs")  # ex: docker compose down -v
+    stats = QdrantBulkLoader(client, "docs", HashEmbeddings(), checkpoint_path=checkpoint).load(make_chunks(20))
+    assert (stats['points'], stats['skipped'], stats['checkpoint_reset']) == (20, 0, True)
+    assert client.count("docs").count == 20
+
+    client.delete("docs", points_selector=[chunk_point_id(c) for c in make_chunks(5)])
+    stats = QdrantBulkLoader(client, "docs", HashEmbeddings(), checkpoint_path=checkpoint).load(make_chunks(20))
+    assert stats['checkpoint_reset'] and client.count("docs").count == 20
@@ -0,0 +1,105 @@
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from utils_qdrant_ingestion import QdrantBulkLoader
+from utils_qdrant_profile import (
+    PROFILES, QdrantBatchRetriever, apply_profile, describe_collection, diff_profile, latency_report,
+)
+
+TOPICS = ['futebol', 'lasanha', 'iphone', 'vôlei']
+
+
+@pytest.fixture
+def loaded(topic_embeddings):
+    client = QdrantClient(":memory:")
+    embeddings = topic_embeddings
+    apply_profile(client, "docs", "balanced", vector_size=len(TOPICS) + 1)
+    chunks = [
+        Document(page_content=f"{topic} parte {i}", metadata={'source': f"{topic}.pdf", 'page': i})
+        for topic in TOPICS for i in range(5)
+    ]
+    QdrantBulkLoader(client, "docs", embeddings, batch_size=8).load(chunks)
+    embeddings.document_calls = 0
+    return client, embeddings
+
+
+def test_diff_is_empty_when_collection_matches_profile():
+    target = PROFILES['low_memory']
+    current = {key: target[key] for key in ('payload_indexes', 'hnsw', 'quantization', 'on_disk')}
+    assert diff_profile(current, target) == []
+
+    current = {**current, 'payload_indexes': {}, 'hnsw': {'m': 16, 'ef_construct': 100}, 'quantization': None}
+    actions = dict(diff_profile(current, target))
+    assert actions['hnsw'] == {'ef_construct': 128}
+    assert actions['quantization']['type'] == 'scalar'
+    assert len([a for a, _ in diff_profile(current, target) if a == 'payload_index']) == 2
+
+
+def test_apply_profile_creates_and_migrates():
+    client = QdrantClient(":memory:")
+    with pytest.raises(ValueError):
+        apply_profile(client, "docs", "balanced")
+    created = apply_profile(client, "docs", "balanced", vector_size=5)
+    assert created[0] == ('create_collection', 5)
+
+    current = describe_collection(client.get_collection("docs"))
+    assert current['hnsw']['m'] == 16
+    migration = [action for action, _ in apply_profile(client, "docs", "binary")]
+    assert 'hnsw' in migration and 'quantization' in migration
+
+
+def test_lab_payload_indexes_match_loaded_metadata(loaded):
+    client, _ = loaded
+    point = client.scroll("docs", limit=1, with_payload=True)[0][0]
+    for field, schema in PROFILES['balanced']['payload_indexes'].items():
+        value = point.payload['metadata'][field.split('.', 1)[1]]
+        assert isinstance(value, {'keyword': str, 'integer': int}[schema])
+
+
+def test_batch_retriever_embeds_queries_and_searches_once(loaded, monkeypatch):
+    client, embeddings = loaded
+    retriever = QdrantBatchRetriever(client=client, collection_name="docs", embeddings=embeddings, k=2,
+                                     search=PROFILES['balanced']['search'])
+    batches = []
+    query_batch_points = client.query_batch_points
+
+    def spy(collection_name, requests):
+        batches.append(requests)
+        return query_batch_points(collection_name, requests=requests)
+
+    monkeypatch.setattr(client, 'query_batch_points', spy)
+
+    results = retriever.batch(["futebol", "iphone", "lasanha"], {'max_concurrency': 2})
+    assert embeddings.document_calls == 0 and sorted(embeddings.queries) == ["futebol", "iphone", "lasanha"]
+    assert len(batches) == 1 and len(batches[0]) == 3
+    assert [docs[0].page_content.split()[0] for docs in results] == ["futebol", "iphone", "lasanha"]
+    assert all(len(docs) == 2 for docs in results)
+
+    filtered = retriever.search_batch(["vôlei"], k=5, filters={'source': 'vôlei.pdf', 'page': [1, 3]})[0]
+    assert sorted(d.page_content for d in filtered) == ["vôlei parte 1", "vôlei parte 3"]
+    assert retriever.invoke("futebol")[0].page_content.startswith("futebol")
+    assert len(retriever.invoke("vôlei", k=1)) == 1
+
+
+def test_batch_retriever_return_exceptions(loaded):
+    client, embeddings = loaded
+    embeddings.failing_queries.add("falha")
+    retriever = QdrantBatchRetriever(client=client, collection_name="docs", embeddings=embeddings, k=1)
+    with pytest.raises(RuntimeError):
+        retriever.batch(["futebol", "falha"])
+
+    results = retriever.batch(["futebol", "falha"], return_exceptions=True)
+    assert results[0][0].page_content.startswith("futebol")
+    assert isinstance(results[1], RuntimeError)
+
+    missing = QdrantBatchRetriever(client=client, collection_name="inexistente", embeddings=embeddings)
+    assert all(isinstance(r, Exception) for r in missing.batch(["futebol", "iphone"], return_exceptions=True))
+
+
+def test_latency_report(loaded):
+    client, embeddings = loaded
+    report = latency_report(client, "docs", embeddings.embed_documents(TOPICS * 5), k=3,
+                            search=PROFILES['balanced']['search'])
+    assert report['queries'] == 20
+    assert report['p95_ms'] >= report['p50_ms'] > 0 and report['batch_total_ms'] > 0
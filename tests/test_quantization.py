@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_quantization import QuantizedIndex, compare_quantization, quantize_vectorstore
+
+
+def _clustered(n, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+@pytest.mark.parametrize('method', ['int8', 'binary', 'pq'])
+def test_rescoring_returns_exact_scores(method, tmp_path):
+    corpus = _clustered(1000)
+    index = QuantizedIndex(method, rescore=True, oversample=10, store_dir=tmp_path).build(corpus)
+
+    scores, ids = index.search(corpus[:5], k=3)
+
+    assert (ids[:, 0] == np.arange(5)).all()
+    np.testing.assert_allclose(scores[:, 0], 1.0, atol=1e-5)
+    assert index.memory_bytes() < QuantizedIndex('flat').build(corpus).memory_bytes()
+
+
+def test_compare_quantization_report():
+    report = compare_quantization(_clustered(1000), _clustered(10, seed=1), k=5)
+
+    by_key = {(r['method'], r['rescore']): r for r in report}
+    assert by_key[('flat', False)]['recall'] == 1.0
+    assert by_key[('binary', False)]['compression'] > 16
+    assert by_key[('int8', True)]['recall'] >= by_key[('int8', False)]['recall']
+
+
+def test_quantize_vectorstore_keeps_langchain_api(tmp_path):
+    texts = [f"documento {i}" for i in range(300)]
+    store = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=32))
+
+    quantize_vectorstore(store, 'int8')
+    store.save_local(str(tmp_path))
+    loaded = FAISS.load_local(str(tmp_path), store.embeddings, allow_dangerous_deserialization=True)
+
+    assert loaded.similarity_search("documento 7", k=1)[0].page_content == "documento 7"
+
+
+def test_in_memory_rescore_vectors_count_towards_memory(tmp_path):
+    corpus, queries = _clustered(1000), _clustered(5, seed=1)
+    in_ram = {(r['method'], r['rescore']): r for r in compare_quantization(corpus, queries, k=5)}
+    on_disk = {(r['method'], r['rescore']): r for r in compare_quantization(corpus, queries, k=5, store_dir=tmp_path)}
+
+    assert in_ram[('int8', True)]['rescore_mb'] == pytest.approx(1000 * 64 * 4 / 1024 ** 2)
+    assert in_ram[('int8', True)]['compression'] < 1 < on_disk[('int8', True)]['compression']
+    assert on_disk[('int8', True)]['rescore_mb'] == 0
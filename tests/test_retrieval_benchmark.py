@@ -0,0 +1,45 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_retrieval_benchmark import benchmark_models, default_variants, run_retrieval_benchmark
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+    query_calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+
+def test_every_variant_and_search_param_is_reported():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    queries = rng.normal(size=(20, 16)).astype(np.float32)
+
+    rows = run_retrieval_benchmark(vectors, queries, k=5)
+
+    expected = sum(len(v['values']) for v in default_variants(2000)) * 2
+    assert len(rows) == expected
+    flat = [r for r in rows if r['index'] == 'Flat']
+    assert all(r['recall@5'] == 1.0 for r in flat)
+    ivf = [r for r in rows if r['index'].startswith('IVF') and r['metric'] == 'l2']
+    # Mais listas visitadas → recall não diminui
+    first = [r for r in ivf if r['index'] == ivf[0]['index']]
+    assert first[-1]['recall@5'] >= first[0]['recall@5']
+
+
+def test_corpus_is_embedded_once_per_model(tmp_path):
+    texts = [f"texto {i}" for i in range(100)]
+    model = CountingEmbedding(size=8)
+
+    benchmark_models(texts, ["texto 1"], {'fake': model}, k=3, cache_dir=tmp_path, verbose=False)
+    benchmark_models(texts, ["texto 1"], {'fake': model}, k=3, cache_dir=tmp_path, verbose=False)
+
+    # 1 passe do corpus; a 2ª execução usa o cache. Consultas vão por embed_query
+    assert model.calls == 1 and model.query_calls == 2
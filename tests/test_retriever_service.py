@@ -0,0 +1,126 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils_retriever_service import RetrieverService, get_retriever_service, start_http_server
+
+
+class EchoLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return "resposta"
+
+
+def save_index(path, texts, embeddings):
+    FAISS.from_texts(texts, embeddings).save_local(str(path))
+
+
+def test_index_is_loaded_once_and_hot_swapped(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15", "bolo de cenoura"], embeddings)
+
+    service = RetrieverService(tmp_path / "idx", embeddings, llm=EchoLLM(), check_interval=0)
+    first = service.vectorstore
+    assert service.vectorstore is first
+    assert service.health()['vectors'] == 2
+
+    save_index(tmp_path / "idx", ["iPhone 15", "bolo de cenoura", "gol de placa"], embeddings)
+    os.utime(tmp_path / "idx" / "index.faiss", ns=(1, 1))  # garante mtime diferente
+
+    assert service.vectorstore is not first
+    assert service.health()['vectors'] == 3 and service.reloads == 1
+
+
+def test_query_reuses_llm_and_singleton(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15"], embeddings)
+    llm = EchoLLM()
+
+    service = get_retriever_service(tmp_path / "idx", embeddings, llm=llm)
+    assert get_retriever_service(tmp_path / "idx", embeddings) is service
+
+    resposta, docs = service.query("celular", k=1)
+    assert resposta == "resposta"
+    assert docs[0].page_content == "iPhone 15"
+    assert "- iPhone 15" in llm.prompts[0]
+
+
+def test_http_endpoints(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15", "bolo"], embeddings)
+    service = RetrieverService(tmp_path / "idx", embeddings, llm=EchoLLM())
+    server, _ = start_http_server(service, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        health = json.load(urllib.request.urlopen(f"{base}/health"))
+        assert health['status'] == 'ok' and health['vectors'] == 2
+
+        request = urllib.request.Request(
+            f"{base}/query",
+            data=json.dumps({'question': 'bolo', 'k': 1}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        result = json.load(urllib.request.urlopen(request))
+        assert result['answer'] == 'resposta'
+        assert len(result['sources']) == 1
+    finally:
+        server.shutdown()
+
+
+def test_http_errors_return_json_500(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15"], embeddings)
+    service = RetrieverService(tmp_path / "idx", embeddings)  # sem LLM
+    server, _ = start_http_server(service, port=0)
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}/query",
+        data=json.dumps({'question': 'celular'}).encode(),
+    )
+    try:
+        urllib.request.urlopen(request)
+        raise AssertionError("esperava HTTP 500")
+    except urllib.error.HTTPError as e:
+        assert e.code == 500 and 'LLM' in json.load(e)['error']
+    finally:
+        server.shutdown()
+
+
+def test_http_invalid_payload_returns_400(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15"], embeddings)
+    server, _ = start_http_server(RetrieverService(tmp_path / "idx", embeddings), port=0)
+    try:
+        for body in (b'[1]', b'"x"', b'{"pergunta": "celular"}', b'{"question": "celular", "k": [1]}', b'{'):
+            request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/search", data=body)
+            try:
+                urllib.request.urlopen(request)
+                raise AssertionError(f"esperava HTTP 400 para {body!r}")
+            except urllib.error.HTTPError as e:
+                assert e.code == 400 and 'payload inválido' in json.load(e)['error']
+    finally:
+        server.shutdown()
+
+
+def test_half_written_save_local_keeps_current_index(tmp_path, monkeypatch):
+    import utils_retriever_service
+
+    monkeypatch.setattr(utils_retriever_service, 'LOAD_RETRY_DELAY', 0)
+    embeddings = DeterministicFakeEmbedding(size=8)
+    save_index(tmp_path / "idx", ["iPhone 15", "bolo"], embeddings)
+    service = RetrieverService(tmp_path / "idx", embeddings, check_interval=0)
+    first = service.vectorstore
+
+    # Só o index.faiss novo chegou ao disco: o index.pkl ainda é da versão anterior
+    save_index(tmp_path / "new", ["iPhone 15", "bolo", "gol"], embeddings)
+    os.replace(tmp_path / "new" / "index.faiss", tmp_path / "idx" / "index.faiss")
+    assert service.vectorstore is first and service.reloads == 0
+
+    os.replace(tmp_path / "new" / "index.pkl", tmp_path / "idx" / "index.pkl")
+    assert service.vectorstore is not first and service.health()['vectors'] == 3
@@ -0,0 +1,69 @@
+import pytest
+
+from utils_self_query import MetadataFilterExtractor, doc_type_from_filename, extract_filters_by_rules
+
+LAB_DOC_TYPES = ('manual', 'relatorio', 'artigo')
+
+
+@pytest.mark.parametrize('query, expected_filters', [
+    ("Me mostre manuais de 2025 sobre futebol", {'doc_type': 'manual', 'year': 2025}),
+    ("Relatórios de 2023", {'doc_type': 'relatorio', 'year': 2023}),
+    ("Manual do iPhone", {'doc_type': 'manual'}),
+    ("Guia de instalação", {'doc_type': 'manual'}),
+    ("Quais são as formações do futebol?", {}),
+    ("Diferença entre 4-4-2 e 4-3-3", {}),
+    ("Quais documentos falam sobre receitas?", {}),  # 'receita' fora dos tipos do lab
+])
+def test_rules_extract_filters(query, expected_filters):
+    semantic_query, filters = extract_filters_by_rules(query, LAB_DOC_TYPES)
+    assert filters == expected_filters
+    assert semantic_query
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ("manual_futebol_2025.pdf", 'manual'),
+    ("guia_instalacao_2024.pdf", 'manual'),
+    ("Tutorial_iPhone.pdf", 'manual'),
+    ("relatorio_supercopa_2023.pdf", 'relatorio'),
+    ("livro_receitas_2025.pdf", 'documento'),  # 'receita' fora dos tipos do lab
+    ("api_documentation_2023.pdf", 'documento'),
+])
+def test_filename_doc_type_matches_query_rules(filename, expected):
+    assert doc_type_from_filename(filename, LAB_DOC_TYPES) == expected
+    if expected != 'documento':
+        _, filters = extract_filters_by_rules(f"{filename.split('_')[0]} sobre futebol", LAB_DOC_TYPES)
+        assert filters == {'doc_type': expected}
+
+
+def test_rules_strip_filter_terms_from_semantic_query():
+    semantic_query, _ = extract_filters_by_rules("Me mostre manuais de 2025 sobre futebol")
+    assert semantic_query == "Me mostre sobre futebol"
+
+
+@pytest.mark.parametrize('query', [
+    "Relatórios entre 2023 e 2025",
+    "Último relatório da supercopa",
+    "Artigos e manuais de futebol",
+    "Manuais do ano passado",
+])
+def test_ambiguous_queries_are_left_to_the_llm(query):
+    assert extract_filters_by_rules(query) is None
+
+
+def test_extractor_reports_path_and_caches_llm_answers():
+    calls = []
+
+    def fake_llm(query):
+        calls.append(query)
+        return "supercopa", {'doc_type': 'relatorio', 'year': 2023}
+
+    extractor = MetadataFilterExtractor(fake_llm, LAB_DOC_TYPES, cache_size=1)
+
+    assert extractor.extract("Manuais de 2025") == ("Manuais de 2025", {'doc_type': 'manual', 'year': 2025}, 'rules')
+    assert extractor.extract("Último relatório da supercopa")[2] == 'llm'
+    assert extractor.extract("  último RELATÓRIO da supercopa? ")[2] == 'cache'
+    assert extractor("Artigos e manuais") == ("supercopa", {'doc_type': 'relatorio', 'year': 2023})
+    # cache_size=1: a primeira pergunta ambígua foi descartada
+    assert extractor.extract("Último relatório da supercopa")[2] == 'llm'
+    assert len(calls) == 3
+    assert extractor.stats == {'rules': 1, 'cache': 1, 'llm': 3}
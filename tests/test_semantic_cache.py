@@ -0,0 +1,112 @@
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from utils_semantic_cache import IndexVersion, SemanticCache, build_cached_rag_chain, cached_version
+
+VOCAB = ['futebol', 'formações', 'táticas', 'lasanha', 'receita', 'iphone', 'bateria', 'quais', 'são', 'as']
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Embedding por contagem de palavras: perguntas parecidas ficam próximas."""
+
+    def __init__(self):
+        self.query_calls = 0
+
+    def _embed(self, text):
+        words = text.lower().replace('?', '').split()
+        return [float(words.count(w)) for w in VOCAB] + [0.01]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return self._embed(text)
+
+
+def test_hits_similar_questions_only():
+    cache = SemanticCache(BagOfWordsEmbeddings(), threshold=0.9)
+    assert cache.lookup("Quais são as formações táticas do futebol?") is None
+
+    cache.store("Quais são as formações táticas do futebol?", "4-4-2 e 4-3-3")
+    hit = cache.lookup("quais são as formações táticas no futebol")
+    assert hit['answer'] == "4-4-2 e 4-3-3" and hit['similarity'] > 0.9
+    assert cache.lookup("receita de lasanha") is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+    assert abs(stats['hit_rate'] - 1 / 3) < 1e-9
+
+
+def test_ttl_lru_and_index_version_invalidation(clock):
+    version = {'value': 1}
+    cache = SemanticCache(
+        BagOfWordsEmbeddings(), threshold=0.9, max_entries=2, ttl_seconds=60,
+        version_fn=lambda: version['value'], clock=clock,
+    )
+    cache.store("futebol", "a")
+    cache.store("lasanha", "b")
+    assert cache.lookup("futebol")['answer'] == "a"   # futebol passa a ser o mais recente
+    cache.store("iphone", "c")                         # descarta lasanha (LRU)
+    assert cache.lookup("lasanha") is None
+    assert cache.stats()['evictions'] == 1
+
+    clock.now += 61
+    assert cache.lookup("futebol") is None
+    assert cache.stats()['expirations'] == 2 and len(cache) == 0
+
+    cache.store("futebol", "a")
+    version['value'] = 2
+    assert cache.lookup("futebol") is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cached_chain_skips_retrieval_and_generation_on_hit():
+    embeddings = BagOfWordsEmbeddings()
+    vectorstore = FAISS.from_texts(["As formações táticas do futebol", "Receita de lasanha"], embeddings)
+    generations = []
+    answer_chain = RunnableLambda(lambda inputs: generations.append(inputs) or f"resposta {len(generations)}")
+    cache = SemanticCache(embeddings, threshold=0.9, version_fn=lambda: vectorstore.index.ntotal)
+    chain = build_cached_rag_chain(
+        vectorstore.as_retriever(search_kwargs={'k': 1}), answer_chain, cache,
+        lambda docs: "\n".join(d.page_content for d in docs),
+    )
+
+    first = chain.invoke("Quais são as formações táticas do futebol?")
+    assert not first['cached'] and first['sources'][0].page_content.startswith("As formações")
+    assert embeddings.query_calls == 1  # o retrieval reaproveitou o embedding do cache
+
+    second = chain.invoke("quais são as formações táticas do futebol")
+    assert second['cached'] and second['answer'] == "resposta 1"
+    assert second['sources'] == first['sources']
+    assert len(generations) == 1
+
+    vectorstore.add_texts(["Bateria do iPhone"])
+    assert not chain.invoke("Quais são as formações táticas do futebol?")['cached']
+    assert np.isclose(cache.stats()['hit_rate'], 1 / 3)
+
+
+def test_index_version_counts_every_mutation():
+    embeddings = BagOfWordsEmbeddings()
+    store = FAISS.from_texts(["futebol", "lasanha"], embeddings, ids=['a', 'b'])
+    version = IndexVersion(store)
+    cache = SemanticCache(embeddings, version_fn=version)
+    cache.store("futebol?", "resposta")
+
+    # delete + add mantém o ntotal, mas muda a versão
+    store.delete(['a'])
+    store.add_texts(["iphone"])
+    assert store.index.ntotal == 2 and version() >= 2
+    assert cache.lookup("futebol?") is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cached_version_reads_remote_once_per_ttl(clock):
+    calls = []
+    version = cached_version(lambda: calls.append(1) or len(calls), ttl_seconds=30, clock=clock)
+
+    assert [version() for _ in range(5)] == [1] * 5
+    clock.now += 31
+    assert version() == 2 and len(calls) == 2
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils_similaridade import EmbeddingMatrix, cosine_similarity, pairwise_scores
+
+
+def _brute_force(corpus, queries, metric, k):
+    scores = pairwise_scores(queries, corpus, metric)
+    order = np.argsort(scores, axis=1)
+    if metric != 'l2':
+        order = order[:, ::-1]
+    return order[:, :k]
+
+
+def test_cosine_similarity_matches_pairwise_formula():
+    a, b = [1.0, 2.0, 3.0], [2.0, 0.5, 1.0]
+    expected = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    assert cosine_similarity(a, b) == pytest.approx(expected, rel=1e-6)
+    assert cosine_similarity(np.array([a, b]), np.array([a, b])).shape == (2, 2)
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'dot', 'l2'])
+def test_blocked_top_k_matches_brute_force(metric):
+    rng = np.random.default_rng(0)
+    corpus = rng.normal(size=(1000, 32))
+    queries = rng.normal(size=(7, 32))
+    matrix = EmbeddingMatrix(corpus, metric=metric)
+
+    scores, idx = matrix.top_k(queries, k=5, block_size=97, n_threads=4)
+
+    assert matrix.matrix.dtype == np.float32 and matrix.matrix.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(idx, _brute_force(corpus, queries, metric, 5))
+    np.testing.assert_allclose(scores, np.take_along_axis(matrix.scores(queries), idx, axis=1), rtol=1e-5)
+
+
+def test_search_returns_labels_and_rejects_wrong_dimension():
+    matrix = EmbeddingMatrix([[1, 0], [0, 1], [1, 1]])
+    results = matrix.search([1, 0.1], k=2, labels=['a', 'b', 'c'])
+    assert [label for label, _ in results] == ['a', 'c']
+    with pytest.raises(ValueError):
+        matrix.top_k([1, 0, 0])
@@ -0,0 +1,73 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.prompts import ChatPromptTemplate
+
+from utils_streaming import STAGES, consume_stream, format_timings, stream_rag
+
+TOPICS = ['futebol', 'lasanha', 'iphone']
+TEXTS = [f"{topic} parte {i}" for topic in TOPICS for i in range(3)]
+METADATAS = [{'source': f"{topic}.pdf", 'page': i} for topic in TOPICS for i in range(3)]
+
+
+PROMPT = ChatPromptTemplate.from_template("{chat_history}\n{context}\n{question}")
+
+
+@pytest.fixture
+def store(topic_embeddings):
+    return FAISS.from_texts(TEXTS, topic_embeddings, metadatas=METADATAS)
+
+
+def test_sources_come_before_tokens_and_answer_is_complete(store):
+    llm = FakeStreamingListLLM(responses=["Gol de placa"])
+    events = list(stream_rag("futebol?", store, PROMPT, llm, k=2, prompt_inputs={'chat_history': ''}))
+
+    assert [e['type'] for e in events[:2]] == ['sources', 'token']
+    assert all(d.metadata['source'] == 'futebol.pdf' for d in events[0]['documents'])
+    assert "".join(e['text'] for e in events if e['type'] == 'token') == "Gol de placa"
+    done = events[-1]
+    assert done['type'] == 'done' and done['answer'] == "Gol de placa"
+    assert set(done['timings']) == set(STAGES)
+    assert done['timings']['ttft_ms'] <= done['timings']['total_ms']
+
+
+def test_filters_and_rerank_are_applied_and_timed(store):
+    llm = FakeStreamingListLLM(responses=["ok"])
+    reranked = []
+
+    def rerank(query, docs):
+        reranked.append(query)
+        return docs[::-1]
+
+    done = consume_stream(stream_rag(
+        "me fale de lasanha na página 1", store, PROMPT, llm, k=3,
+        extract_filters=lambda q: ("lasanha", {'page': 1}),
+        rerank=rerank, prompt_inputs={'chat_history': ''},
+    ))
+
+    assert reranked == ["lasanha"]
+    assert done['documents'][-1].metadata == {'source': 'lasanha.pdf', 'page': 1}  # rerank inverteu
+    assert all(d.metadata['page'] == 1 for d in done['documents'])
+    assert done['timings']['filter_ms'] > 0 and done['timings']['rerank_ms'] > 0
+
+
+def test_consume_stream_forwards_tokens_and_format_timings(store):
+    llm = FakeStreamingListLLM(responses=["abc"])
+    received = []
+    done = consume_stream(stream_rag("iphone", store, PROMPT, llm, prompt_inputs={'chat_history': ''}),
+                          on_token=received.append)
+
+    assert received == ['a', 'b', 'c'] and done['answer'] == "abc"
+    line = format_timings(done['timings'])
+    assert 'TTFT' in line and 'total' in line and 'filtros' not in line
+
+
+def test_stream_timings_are_recorded_as_metrics(store):
+    from utils_instrumentation import Metrics
+
+    metrics = Metrics()
+    consume_stream(stream_rag("futebol", store, PROMPT, FakeStreamingListLLM(responses=["ok"]),
+                              prompt_inputs={'chat_history': ''}, metrics=metrics))
+
+    assert {'embed_query', 'retrieve', 'prompt_build', 'ttft', 'generate'} <= set(metrics.summary())
+    assert 'filter' not in metrics.summary()
@@ -0,0 +1,80 @@
+import pytest
+from langchain_core.documents import Document
+
+tiktoken = pytest.importorskip("tiktoken")
+
+from utils_token_chunker import TokenChunker, _get_or_load, count_tokens  # noqa: E402
+
+TEXT = (
+    "O futebol é jogado por duas equipes de onze jogadores. A formação 4-4-2 é clássica.\n\n"
+    "Na formação 4-3-3 os pontas abrem o campo. O volante protege a defesa!\n"
+    "A pressão alta recupera a bola perto do gol adversário."
+)
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    # Encoding byte a byte: não depende de download dos arquivos BPE
+    return tiktoken.Encoding(
+        "bytes",
+        pat_str=r""" ?\w+| ?[^\s\w]+|\s+""",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+
+
+def test_chunks_respect_budget_and_report_token_counts(encoding):
+    chunker = TokenChunker(encoding, chunk_size=80, chunk_overlap=16)
+    chunks = chunker.split_documents([Document(page_content=TEXT, metadata={'source': 'a.pdf'})])
+
+    assert len(chunks) > 2
+    for i, chunk in enumerate(chunks):
+        assert chunk.metadata['source'] == 'a.pdf' and chunk.metadata['chunk_index'] == i
+        assert chunk.metadata['token_count'] <= 80
+        assert len(encoding.encode_ordinary(chunk.page_content)) <= chunk.metadata['token_count']
+        assert chunk.page_content in TEXT
+    # Corta em limites naturais, não no meio das palavras
+    assert all(c.page_content.split()[-1] in TEXT.split() for c in chunks)
+    assert chunker.stats['tokens'] == len(encoding.encode_ordinary(TEXT))
+
+
+def test_batches_many_documents(encoding):
+    chunker = TokenChunker(encoding, chunk_size=64, chunk_overlap=0, batch_size=3)
+    texts = [f"Documento {i}. " + TEXT for i in range(10)] + [""]
+    split = chunker.split_texts(texts)
+
+    assert len(split) == 11 and split[-1] == []
+    assert [content for content, _ in split[0]] == chunker.split_text(texts[0])
+    assert chunker.stats['documents'] == 12
+    assert count_tokens(texts[:2], encoding) == [len(encoding.encode_ordinary(t)) for t in texts[:2]]
+
+
+def test_registry_loads_once():
+    loads = []
+    first = _get_or_load('test', 'model', lambda: loads.append(1) or object())
+    assert _get_or_load('test', 'model', lambda: loads.append(1) or object()) is first
+    assert loads == [1]
+
+
+def test_overlap_must_be_smaller_than_chunk_size(encoding):
+    with pytest.raises(ValueError):
+        TokenChunker(encoding, chunk_size=32, chunk_overlap=32)
+
+
+def test_hard_cuts_never_split_multibyte_characters(encoding):
+    text = "ãé😀ç" * 40  # sem espaços: todo corte é "no token", e cada caractere ocupa 2 a 4 tokens
+    chunker = TokenChunker(encoding, chunk_size=15, chunk_overlap=0)
+    chunks = chunker.split_documents([Document(page_content=text)])
+
+    assert "".join(c.page_content for c in chunks) == text
+    for chunk in chunks:
+        assert chunk.metadata['token_count'] == len(encoding.encode_ordinary(chunk.page_content)) <= 15
+
+    overlapping = TokenChunker(encoding, chunk_size=15, chunk_overlap=5).split_text(text)
+    assert all(chunk in text for chunk in overlapping)
+
+
+def test_token_count_is_of_the_stripped_text(encoding):
+    chunker = TokenChunker(encoding, chunk_size=40, chunk_overlap=0)
+    for chunk in chunker.split_documents([Document(page_content=TEXT)]):
+        assert chunk.metadata['token_count'] == len(encoding.encode_ordinary(chunk.page_content))